@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """Batches audit log inserts off the request path.
+
+    `submit` enqueues into a bounded queue and only waits when the queue is
+    full, so a slow database pushes back on callers instead of dropping
+    entries. A background task flushes with `insert_many` once `batch_size`
+    entries are queued or `flush_interval` seconds have passed. `close`
+    drains whatever is left.
+    """
+
+    def __init__(self, collection, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 0.5):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._restart_if_crashed)
+
+    def _restart_if_crashed(self, task: asyncio.Task):
+        # A dead writer would leave the bounded queue to fill and block every audited request
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Audit writer stopped unexpectedly, restarting", exc_info=task.exception())
+        self._task = None
+        if not self._closing:
+            self.start()
+
+    async def submit(self, doc: dict):
+        await self.queue.put(doc)
+
+    async def _next_batch(self) -> list:
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self.queue.get(), timeout=self.flush_interval))
+        except asyncio.TimeoutError:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closing:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+        return batch
+
+    async def _flush(self, batch: list):
+        delay = 0.5
+        while True:
+            start = time.perf_counter()
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+                break
+            except BulkWriteError as e:
+                # Individual bad documents will never succeed, retrying would loop forever
+                self.failures += 1
+                self.written += e.details.get("nInserted", 0)
+                logger.error("Audit batch partially failed: %s", e.details.get("writeErrors", [])[:1])
+                break
+            except PyMongoError as e:
+                self.failures += 1
+                if self._closing:
+                    logger.error("Dropping %d audit entries at shutdown: %s", len(batch), e)
+                    break
+                logger.warning("Audit flush failed, retrying in %.1fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            except Exception:
+                # e.g. a document BSON cannot encode; retrying the same batch cannot succeed
+                self.failures += 1
+                logger.exception("Dropping %d audit entries that could not be written", len(batch))
+                break
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._total_flush_ms += elapsed
+        for _ in batch:
+            self.queue.task_done()
+
+    async def _run(self):
+        while not (self._closing and self.queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def close(self):
+        self._closing = True
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+        }
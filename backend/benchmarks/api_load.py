@@ -0,0 +1,463 @@
+"""Mixed-role API load test against seeded hospital data.
+
+Seeds patients, appointments, encounters, prescriptions, orders and invoices
+at the requested scale, then runs concurrent virtual users that behave like
+reception, doctors, lab technicians and accountants for --duration seconds.
+Reports requests/sec and p50/p95/p99 per endpoint, and can save the results
+as a JSON baseline and compare a later run against it.
+
+By default the app runs in this process on the in-memory backend
+(DB_BACKEND=memory) and is driven through httpx's ASGI transport, so no
+MongoDB or server is needed. --backend mongo seeds a scratch database
+(BENCH_DB_NAME, default <DB_NAME>_bench) instead; use it past ~1M patients.
+--base-url drives a running server that was started on an already seeded
+database.
+
+    cd backend && python -m benchmarks.api_load --patients 10000 --duration 30 --output baseline.json
+    cd backend && python -m benchmarks.api_load --patients 10000 --duration 30 --compare baseline.json
+    cd backend && python -m benchmarks.api_load --backend mongo --patients 2000000 --seed-only
+    cd backend && python -m benchmarks.api_load --base-url http://localhost:8001 --skip-seed
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+from benchmarks.login_throughput import login, percentile
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+PASSWORD = "Bench@123"
+EMAIL_DOMAIN = "bench.gangoshrihis.com"
+ROLES = {"reception": "RECEPTIONIST", "doctor": "DOCTOR", "lab": "LAB_TECHNICIAN", "accountant": "ACCOUNTANT"}
+DEFAULT_USERS = "reception=8,doctor=16,lab=4,accountant=2"
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Ishaan", "Ananya", "Diya", "Priya", "Kavya",
+               "Meera", "Rohan", "Rahul", "Sneha", "Pooja", "Amit", "Neha", "Vikram", "Lakshmi", "Suresh"]
+LAST_NAMES = ["Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Iyer", "Das",
+              "Joshi", "Mehta", "Rao", "Chopra", "Bose", "Pillai", "Yadav", "Mishra", "Agarwal", "Shetty"]
+SPECIALIZATIONS = ["General Medicine", "Cardiology", "Orthopedics", "Pediatrics", "Dermatology"]
+LAB_TESTS = [("lab", "CBC"), ("lab", "Lipid Profile"), ("lab", "HbA1c"), ("radiology", "Chest X-Ray"), ("radiology", "MRI Brain")]
+ITEM_TYPES = [("consultation", 500), ("lab", 800), ("pharmacy", 350), ("radiology", 2500)]
+PRIORITIES = {"stat": 0, "urgent": 1, "routine": 2}
+
+
+# ==================== SEEDING ====================
+
+def _times(day_start: int = 8, day_end: int = 20, slot_minutes: int = 15):
+    return [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(day_start * 60, day_end * 60, slot_minutes)]
+
+
+def _timestamp(rng, now, days):
+    return now - timedelta(days=rng.random() * days)
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+async def _insert(collection, docs, batch_size):
+    for start in range(0, len(docs), batch_size):
+        await collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+
+async def seed(db, args) -> dict:
+    """Writes benchmark users and clinical data straight to the database."""
+    from indexes import ensure_indexes
+    from passwords import PasswordHasher
+    from patient_search import search_fields
+    from sequences import SEQUENCES, format_id
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    await ensure_indexes(db)
+
+    hasher = PasswordHasher(rounds=4, workers=1)
+    password_hash = await hasher.hash(PASSWORD)
+    hasher.shutdown()
+    staff = {"reception": 4, "doctor": args.doctors, "lab": 4, "accountant": 2}
+    users = []
+    for role, count in staff.items():
+        for n in range(count):
+            users.append({
+                "id": str(uuid.uuid4()), "email": f"{role}{n}@{EMAIL_DOMAIN}", "full_name": f"{role.title()} {n}",
+                "role": ROLES[role], "specialization": SPECIALIZATIONS[n % len(SPECIALIZATIONS)] if role == "doctor" else None,
+                "phone": None, "employee_id": f"B{role[:3].upper()}{n:04d}", "is_active": True,
+                "created_at": now, "password_hash": password_hash,
+            })
+    await db.users.insert_many(users)
+    doctors = [user for user in users if user["role"] == "DOCTOR"]
+    creator = users[0]["id"]
+
+    def prefixed(kind, n):
+        return format_id(SEQUENCES[kind][0], n + 1)
+
+    patients = []
+    for start in range(0, args.patients, args.batch_size):
+        batch = []
+        for n in range(start, min(start + args.batch_size, args.patients)):
+            full_name, phone = _name(rng), f"9{rng.randrange(10 ** 9):09d}"
+            batch.append({
+                "id": str(uuid.uuid4()), "patient_id": prefixed("patient", n), "full_name": full_name,
+                "date_of_birth": f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "gender": rng.choice(["Male", "Female"]), "phone": phone, "email": None, "address": "Bench Street",
+                "blood_group": rng.choice(["A+", "B+", "O+", "AB+"]), "emergency_contact": None, "insurance_info": None,
+                "medical_history": None, "allergies": None, "created_at": _timestamp(rng, now, args.days),
+                "created_by": creator, **search_fields(full_name, phone),
+            })
+        await db.patients.insert_many(batch, ordered=False)
+        patients.extend((doc["id"], doc["full_name"]) for doc in batch)
+        print(f"\rseeded {len(patients)}/{args.patients} patients", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    times = _times()
+
+    def clinical(kind, ratio, build):
+        docs = []
+        for n in range(int(args.patients * ratio)):
+            patient_id, patient_name = rng.choice(patients)
+            doctor = rng.choice(doctors)
+            created_at = _timestamp(rng, now, args.days)
+            docs.append({
+                "id": str(uuid.uuid4()), f"{kind}_id": prefixed(kind, n), "patient_id": patient_id,
+                "patient_name": patient_name, "doctor_id": doctor["id"], "doctor_name": doctor["full_name"],
+                "created_at": created_at, "created_by": doctor["id"], **build(created_at),
+            })
+        return docs
+
+    def appointment(created_at):
+        day = (now + timedelta(days=rng.randint(-args.days, 30))).date().isoformat()
+        slot = rng.choice(times)
+        return {
+            "appointment_date": day, "appointment_time": slot, "reason": "Follow-up", "notes": None,
+            "status": rng.choice(["scheduled", "completed", "cancelled"]),
+            "appointment_at": datetime.fromisoformat(f"{day}T{slot}").replace(tzinfo=timezone.utc),
+        }
+
+    def order(created_at):
+        order_type, test_name = rng.choice(LAB_TESTS)
+        priority = rng.choices(list(PRIORITIES), weights=[1, 3, 16])[0]
+        return {
+            "order_type": order_type, "test_name": test_name, "priority": priority, "priority_rank": PRIORITIES[priority],
+            "status": "pending" if created_at > now - timedelta(days=2) else "completed", "notes": None,
+        }
+
+    def invoice(created_at):
+        items = [{"description": item_type.title(), "amount": float(amount), "item_type": item_type}
+                 for item_type, amount in rng.sample(ITEM_TYPES, rng.randint(1, 3))]
+        subtotal = sum(item["amount"] for item in items)
+        method = rng.choice(["cash", "card", "upi", None])
+        return {
+            "items": items, "subtotal": subtotal, "tax": 0.0, "total": subtotal, "notes": None,
+            "payment_method": method, "payment_status": "paid" if method else "pending",
+        }
+
+    plan = [
+        ("appointment", "appointments", args.appointments, appointment),
+        ("encounter", "encounters", args.encounters, lambda created_at: {
+            "chief_complaint": "Fever", "diagnosis": "Viral fever", "vitals": {"bp": "120/80", "pulse": 72},
+            "clinical_notes": None, "treatment_plan": None, "follow_up": None, "appointment_id": None}),
+        ("prescription", "prescriptions", args.prescriptions, lambda created_at: {
+            "medications": [{"name": "Paracetamol", "dosage": "500mg", "frequency": "TDS"}], "instructions": None, "encounter_id": None}),
+        ("order", "orders", args.orders, order),
+        ("invoice", "invoices", args.invoices, invoice),
+    ]
+    counts = {"patients": len(patients), "users": len(users)}
+    for kind, collection, ratio, build in plan:
+        docs = clinical(kind, ratio, build)
+        await _insert(db[collection], docs, args.batch_size)
+        counts[collection] = len(docs)
+        print(f"seeded {len(docs)} {collection}", file=sys.stderr)
+    return counts
+
+
+# ==================== SCENARIOS ====================
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    async def call(self, client, label, method, url, token, expected=(), **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.recording:
+            self.latencies.setdefault(label, []).append(elapsed)
+            if response.status_code >= 400 and response.status_code not in expected:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+
+def _today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+async def reception(ctx, user, rng):
+    call, client, token = ctx["recorder"].call, ctx["client"], user["token"]
+    action = rng.choices(["list", "search", "register", "book", "schedule"], weights=[30, 25, 10, 15, 20])[0]
+    if action == "list":
+        await call(client, "GET /api/patients", "GET", "/api/patients", token, params={"limit": 50, "summary": "true"})
+    elif action == "search":
+        term = rng.choice(LAST_NAMES) if rng.random() < 0.7 else f"9{rng.randrange(1000):03d}"
+        await call(client, "GET /api/patients?search", "GET", "/api/patients", token, params={"search": term, "limit": 20})
+    elif action == "register":
+        await call(client, "POST /api/patients", "POST", "/api/patients", token, json={
+            "full_name": _name(rng), "date_of_birth": "1990-05-17", "gender": "Female", "phone": f"8{rng.randrange(10 ** 9):09d}"})
+    elif action == "book":
+        doctor_id = rng.choice(ctx["doctor_ids"])
+        day = (datetime.now(timezone.utc) + timedelta(days=rng.randint(1, 30))).date().isoformat()
+        response = await call(client, "GET /api/appointments/availability", "GET", "/api/appointments/availability", token,
+                              params={"doctor_id": doctor_id, "date": day, "count": 3})
+        slots = response.json() if response.status_code == 200 else []
+        if slots:
+            slot = rng.choice(slots)
+            # Another receptionist may take the slot first
+            await call(client, "POST /api/appointments", "POST", "/api/appointments", token, expected=(409,), json={
+                "patient_id": rng.choice(ctx["patient_ids"]), "doctor_id": slot["doctor_id"],
+                "appointment_date": slot["appointment_date"], "appointment_time": slot["appointment_time"], "reason": "Consultation"})
+    else:
+        await call(client, "GET /api/appointments?date", "GET", "/api/appointments", token, params={"date": _today(), "limit": 100})
+
+
+async def doctor(ctx, user, rng):
+    call, client, token = ctx["recorder"].call, ctx["client"], user["token"]
+    action = rng.choices(["schedule", "summary", "encounter", "prescribe", "order"], weights=[25, 30, 20, 10, 15])[0]
+    patient_id = rng.choice(ctx["patient_ids"])
+    if action == "schedule":
+        await call(client, "GET /api/appointments?doctor_id", "GET", "/api/appointments", token,
+                   params={"doctor_id": user["id"], "limit": 50, "summary": "true"})
+    elif action == "summary":
+        await call(client, "GET /api/patients/{id}/summary", "GET", f"/api/patients/{patient_id}/summary", token)
+    elif action == "encounter":
+        await call(client, "POST /api/encounters", "POST", "/api/encounters", token, json={
+            "patient_id": patient_id, "chief_complaint": "Headache", "diagnosis": "Migraine", "vitals": {"bp": "130/85"}})
+    elif action == "prescribe":
+        await call(client, "POST /api/prescriptions", "POST", "/api/prescriptions", token, json={
+            "patient_id": patient_id, "medications": [{"name": "Ibuprofen", "dosage": "400mg", "frequency": "BD"}]})
+    else:
+        order_type, test_name = rng.choice(LAB_TESTS)
+        await call(client, "POST /api/orders", "POST", "/api/orders", token, json={
+            "patient_id": patient_id, "order_type": order_type, "test_name": test_name,
+            "priority": rng.choices(list(PRIORITIES), weights=[1, 3, 16])[0]})
+
+
+async def lab(ctx, user, rng):
+    call, client, token = ctx["recorder"].call, ctx["client"], user["token"]
+    action = rng.choices(["worklist", "claim", "orders"], weights=[40, 30, 30])[0]
+    if action == "worklist":
+        await call(client, "GET /api/worklist", "GET", "/api/worklist", token, params={"limit": 50})
+    elif action == "claim":
+        response = await call(client, "POST /api/worklist/claim", "POST", "/api/worklist/claim", token, expected=(404,))
+        if response.status_code == 200:
+            await call(client, "PATCH /api/orders/{id}/status", "PATCH", f"/api/orders/{response.json()['id']}/status", token,
+                       params={"status": "completed"})
+    else:
+        await call(client, "GET /api/orders?status", "GET", "/api/orders", token, params={"status": "pending", "limit": 50, "summary": "true"})
+
+
+async def accountant(ctx, user, rng):
+    call, client, token = ctx["recorder"].call, ctx["client"], user["token"]
+    action = rng.choices(["invoices", "revenue", "bill", "dashboard"], weights=[35, 25, 25, 15])[0]
+    if action == "invoices":
+        await call(client, "GET /api/invoices", "GET", "/api/invoices", token, params={"limit": 50, "summary": "true"})
+    elif action == "revenue":
+        await call(client, "GET /api/billing/revenue", "GET", "/api/billing/revenue", token,
+                   params={"group_by": rng.choice(["day", "doctor", "payment_method"])})
+    elif action == "bill":
+        item_type, amount = rng.choice(ITEM_TYPES)
+        await call(client, "POST /api/invoices", "POST", "/api/invoices", token, json={
+            "patient_id": rng.choice(ctx["patient_ids"]), "doctor_id": rng.choice(ctx["doctor_ids"]),
+            "items": [{"description": item_type.title(), "amount": amount, "item_type": item_type}],
+            "payment_method": rng.choice(["cash", "card", "upi", None])})
+    else:
+        await call(client, "GET /api/dashboard/stats", "GET", "/api/dashboard/stats", token)
+
+
+SCENARIOS = {"reception": reception, "doctor": doctor, "lab": lab, "accountant": accountant}
+
+
+def parse_users(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        role, _, count = part.partition("=")
+        if role.strip() not in SCENARIOS or not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"expected role=count with roles {', '.join(SCENARIOS)}, got {part!r}")
+        mix[role.strip()] = int(count)
+    return mix
+
+
+# ==================== RUNNER ====================
+
+async def virtual_user(ctx, role, user, seed, stop_at, think):
+    rng = random.Random(seed)
+    while time.perf_counter() < stop_at:
+        await SCENARIOS[role](ctx, user, rng)
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def drive(client, args) -> dict:
+    recorder = Recorder()
+    accounts = {}
+    for role, count in args.users.items():
+        staff = 2 if role == "accountant" else 4
+        pool = args.doctors if role == "doctor" else staff
+        accounts[role] = []
+        for n in range(count):
+            email = f"{role}{n % pool}@{EMAIL_DOMAIN}"
+            token = await login(client, email, PASSWORD)
+            me = (await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})).json()
+            accounts[role].append({"id": me["id"], "token": token})
+
+    any_token = next(iter(accounts.values()))[0]["token"]
+    headers = {"Authorization": f"Bearer {any_token}"}
+    patients = (await client.get("/api/patients", params={"limit": 1000, "summary": "true"}, headers=headers)).json()
+    doctors = (await client.get("/api/users/doctors", headers=headers)).json()
+    ctx = {"client": client, "recorder": recorder, "patient_ids": [p["id"] for p in patients], "doctor_ids": [d["id"] for d in doctors]}
+
+    async def phase(seconds, recording):
+        recorder.recording = recording
+        stop_at = time.perf_counter() + seconds
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(ctx, role, user, hash((args.seed, role, n)), stop_at, args.think / 1000)
+            for role, users in accounts.items() for n, user in enumerate(users)
+        ))
+        return time.perf_counter() - started
+
+    if args.warmup:
+        await phase(args.warmup, recording=False)
+    elapsed = await phase(args.duration, recording=True)
+
+    endpoints = {}
+    for label, samples in sorted(recorder.latencies.items()):
+        endpoints[label] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(label, 0),
+            "rps": len(samples) / elapsed,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "mean": statistics.mean(samples),
+        }
+    return endpoints
+
+
+def report(endpoints: dict, baseline: dict, threshold: float) -> int:
+    regressions = 0
+    header = f"{'endpoint':<36} {'n':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + ("   p95 vs base" if baseline else ""))
+    for label, result in endpoints.items():
+        line = (f"{label:<36} {result['count']:>7} {result['errors']:>5} {result['rps']:>8.1f} "
+                f"{result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f}")
+        before = baseline.get(label)
+        if before:
+            change = (result["p95"] - before["p95"]) / before["p95"] if before["p95"] else 0.0
+            flag = "  REGRESSION" if change > threshold else ""
+            regressions += bool(flag)
+            line += f"   {change * 100:+6.1f}%{flag}"
+        print(line)
+    total = sum(result["count"] for result in endpoints.values())
+    errors = sum(result["errors"] for result in endpoints.values())
+    print(f"total {total} requests, {errors} errors, {sum(result['rps'] for result in endpoints.values()):.1f} req/s")
+    return regressions
+
+
+async def run(args):
+    if args.base_url:
+        if not args.skip_seed:
+            raise SystemExit("--base-url drives an existing server; seed it first with --backend mongo --seed-only and pass --skip-seed")
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            return {"target": args.base_url}, await drive(client, args)
+
+    os.environ["DB_BACKEND"] = args.backend
+    if args.backend == "mongo":
+        os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", os.environ["DB_NAME"] + "_bench")
+    import server
+
+    meta = {"target": f"in-process ({args.backend})"}
+    if not args.skip_seed:
+        if args.backend == "mongo":
+            for name in await server.db.list_collection_names():
+                await server.db.drop_collection(name)
+        started = time.perf_counter()
+        meta["seeded"] = await seed(server.db, args)
+        meta["seed_seconds"] = round(time.perf_counter() - started, 1)
+        print(f"seeded in {meta['seed_seconds']}s", file=sys.stderr)
+        if args.seed_only:
+            server.client.close()
+            return meta, {}
+
+    async with server.app.router.lifespan_context(server.app):
+        # Let startup rebuilds (counters, rollups, calendars, indexes) finish before measuring
+        if server.background_tasks:
+            await asyncio.wait(list(server.background_tasks), timeout=args.startup_timeout)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return meta, await drive(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory", help="database for the in-process app")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--appointments", type=float, default=1.5, help="appointments per patient")
+    parser.add_argument("--encounters", type=float, default=2.0, help="encounters per patient")
+    parser.add_argument("--prescriptions", type=float, default=1.0, help="prescriptions per patient")
+    parser.add_argument("--orders", type=float, default=0.5, help="orders per patient")
+    parser.add_argument("--invoices", type=float, default=1.5, help="invoices per patient")
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many past days")
+    parser.add_argument("--batch-size", type=int, default=5000, help="insert_many batch size while seeding")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and user behaviour")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse data seeded by an earlier run")
+    parser.add_argument("--users", type=parse_users, default=parse_users(DEFAULT_USERS), help=f"virtual users per role (default {DEFAULT_USERS})")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between actions, ms")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--output", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 increase that counts as a regression")
+    args = parser.parse_args()
+
+    meta, endpoints = asyncio.run(run(args))
+    if args.seed_only:
+        print(json.dumps(meta))
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    regressions = report(endpoints, baseline, args.threshold)
+
+    if args.output:
+        meta.update(
+            users=args.users, duration=args.duration, python=platform.python_version(),
+            recorded_at=datetime.now(timezone.utc).isoformat(), patients=args.patients,
+        )
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "endpoints": endpoints}, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Change feed fan-out: delivery latency to many WebSocket clients.
+
+Opens --clients WebSocket connections to /api/changes/ws, creates --events
+orders one after another, and reports how long each order took to reach
+every client (p50/p95/p99 over all deliveries) plus any deliveries that
+never arrived. Needs a running backend and at least one patient.
+
+    cd backend && python -m benchmarks.change_feed --base-url http://localhost:8001 \\
+        --email admin@gangoshrihis.com --password Admin@123 --clients 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+import websockets
+
+from benchmarks.login_throughput import login, percentile
+
+
+async def listen(url, ready, sent, latencies, received):
+    async with websockets.connect(url, max_queue=None, open_timeout=60) as socket:
+        ready.release()
+        async for message in socket:
+            event = json.loads(message)
+            marker = event.get("data", {}).get("test_name")
+            if marker in sent:
+                latencies.append((time.perf_counter() - sent[marker]) * 1000)
+                received[marker] = received.get(marker, 0) + 1
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        patients = (await client.get("/api/patients", params={"limit": 1, "summary": "true"}, headers=headers)).json()
+        if not patients:
+            raise SystemExit("Create a patient first")
+
+        ws_url = f"{args.base_url.replace('http', 'ws', 1)}/api/changes/ws?token={token}&collections=orders"
+        ready = asyncio.Semaphore(0)
+        sent, received, latencies = {}, {}, []
+        start = time.perf_counter()
+        listeners = []
+        for _ in range(args.clients):
+            listeners.append(asyncio.create_task(listen(ws_url, ready, sent, latencies, received)))
+            await asyncio.sleep(0)
+        for _ in range(args.clients):
+            await ready.acquire()
+        print(f"connected {args.clients} clients in {time.perf_counter() - start:.2f}s")
+
+        run_id = uuid.uuid4().hex[:8]
+        for n in range(args.events):
+            marker = f"bench-{run_id}-{n}"
+            sent[marker] = time.perf_counter()
+            response = await client.post("/api/orders", json={"patient_id": patients[0]["id"], "order_type": "lab", "test_name": marker}, headers=headers)
+            response.raise_for_status()
+            await asyncio.sleep(args.interval)
+        await asyncio.sleep(args.settle)
+
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    expected = args.clients * args.events
+    print(f"deliveries {len(latencies)}/{expected} missing={expected - len(latencies)}")
+    if latencies:
+        print(f"latency p50={percentile(latencies, 50):8.2f}ms p95={percentile(latencies, 95):8.2f}ms "
+              f"p99={percentile(latencies, 99):8.2f}ms max={max(latencies):8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between orders")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait for late deliveries")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""Concurrency benchmark for the counters-based ID allocator.
+
+Fires rounds of parallel "creates" (allocate an ID, insert a document) against a
+scratch database and checks that no ID is ever handed out twice and that
+per-insert latency stays flat as the collection grows.
+
+    cd backend && python -m benchmarks.id_allocation --rounds 10 --concurrency 1000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from sequences import SequenceAllocator
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+async def create_one(allocator, collection, latencies):
+    start = time.perf_counter()
+    patient_id = await allocator.next_id("patient")
+    await collection.insert_one({"patient_id": patient_id})
+    latencies.append(time.perf_counter() - start)
+    return patient_id
+
+
+async def run(rounds: int, concurrency: int, block_size: int):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ.get('BENCH_DB_NAME', os.environ['DB_NAME'] + '_bench')]
+    await db.counters.delete_many({"_id": "patient"})
+    await db.patients.drop()
+
+    allocator = SequenceAllocator(db, block_size=block_size)
+    issued = []
+    print(f"block_size={block_size} concurrency={concurrency}")
+    print(f"{'round':>5} {'docs':>9} {'mean ms':>9} {'p99 ms':>9}")
+    for round_no in range(1, rounds + 1):
+        latencies = []
+        ids = await asyncio.gather(
+            *(create_one(allocator, db.patients, latencies) for _ in range(concurrency))
+        )
+        issued.extend(ids)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{round_no:>5} {len(issued):>9} {statistics.mean(latencies) * 1000:>9.2f} {p99 * 1000:>9.2f}")
+
+    duplicates = len(issued) - len(set(issued))
+    print(f"issued={len(issued)} duplicates={duplicates}")
+    await db.patients.drop()
+    client.close()
+    if duplicates:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--block-size", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds, args.concurrency, args.block_size))
@@ -0,0 +1,110 @@
+"""Query latency before and after building the declared indexes.
+
+Seeds scratch collections with synthetic documents, times the hot queries the
+API issues without indexes, builds the indexes from indexes.py, and times them again.
+The bench database is dropped afterwards unless --keep is given.
+
+    cd backend && python -m benchmarks.index_latency --documents 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import ensure_indexes
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+BATCH = 10000
+DOCTORS = [str(uuid.uuid4()) for _ in range(50)]
+STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+
+
+def _created_at(i: int) -> str:
+    return (datetime(2023, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)).isoformat()
+
+
+async def seed(db, documents: int):
+    for collection in ("patients", "appointments", "orders"):
+        await db[collection].drop()
+    for start in range(0, documents, BATCH):
+        rows = range(start, min(start + BATCH, documents))
+        await db.patients.insert_many([
+            {"id": str(uuid.uuid4()), "patient_id": f"PAT{i + 1:06d}", "full_name": f"Patient {i}",
+             "phone": f"9{i:09d}", "created_at": _created_at(i)}
+            for i in rows
+        ], ordered=False)
+        await db.appointments.insert_many([
+            {"id": str(uuid.uuid4()), "doctor_id": random.choice(DOCTORS), "patient_id": str(uuid.uuid4()),
+             "appointment_date": (datetime(2023, 1, 1) + timedelta(days=i % 730)).date().isoformat(),
+             "created_at": _created_at(i)}
+            for i in rows
+        ], ordered=False)
+        await db.orders.insert_many([
+            {"id": str(uuid.uuid4()), "status": random.choice(STATUSES), "created_at": _created_at(i)}
+            for i in rows
+        ], ordered=False)
+
+
+def queries(db, documents: int):
+    probe = f"PAT{random.randint(1, documents):06d}"
+    return {
+        "patients.find_one(patient_id)": lambda: db.patients.find_one({"patient_id": probe}),
+        "patients.sort(created_at).limit(50)": lambda: db.patients.find({}).sort([("created_at", -1), ("id", -1)]).to_list(50),
+        "appointments.find(doctor_id, date)": lambda: db.appointments.find(
+            {"doctor_id": DOCTORS[0], "appointment_date": "2024-06-01"}).to_list(100),
+        "orders.count(status=pending)": lambda: db.orders.count_documents({"status": "pending"}),
+    }
+
+
+async def measure(db, documents: int, repeat: int) -> dict:
+    results = {}
+    for name, run_query in queries(db, documents).items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await run_query()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+async def run(documents: int, repeat: int, keep: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db_name = os.environ.get('BENCH_DB_NAME', os.environ['DB_NAME'] + '_bench')
+    if db_name == os.environ['DB_NAME']:
+        raise SystemExit("BENCH_DB_NAME must not be the application database; it is dropped afterwards")
+    db = client[db_name]
+
+    try:
+        print(f"Seeding {documents} documents per collection...")
+        await seed(db, documents)
+        before = await measure(db, documents, repeat)
+        await ensure_indexes(db)
+        after = await measure(db, documents, repeat)
+
+        print(f"{'query':<40} {'before ms':>10} {'after ms':>10}")
+        for name in before:
+            print(f"{name:<40} {before[name]:>10.2f} {after[name]:>10.2f}")
+    finally:
+        if not keep:
+            await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded bench database in place")
+    args = parser.parse_args()
+    asyncio.run(run(args.documents, args.repeat, args.keep))
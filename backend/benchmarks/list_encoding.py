@@ -0,0 +1,96 @@
+"""List endpoint throughput and latency on a running backend.
+
+Hits every list endpoint with full 1000-row pages from concurrent clients and
+reports requests/sec, p50 and p99 per endpoint. Run it once against a backend
+started with FAST_JSON_RESPONSES=false and once with FAST_JSON_RESPONSES=true,
+using --output/--compare to print the before/after table.
+
+    cd backend && python -m benchmarks.list_encoding --base-url http://localhost:8001 \\
+        --email admin@gangoshrihis.com --password Admin@123 --output before.json
+    cd backend && python -m benchmarks.list_encoding ... --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.login_throughput import login, percentile
+
+ENDPOINTS = [
+    "/api/patients",
+    "/api/appointments",
+    "/api/encounters",
+    "/api/prescriptions",
+    "/api/orders",
+    "/api/reports",
+    "/api/invoices",
+    "/api/users",
+]
+
+
+async def measure(client, path, headers, limit, concurrency, duration):
+    latencies = []
+    sizes = []
+    stop = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = await client.get(path, params={"limit": limit}, headers=headers)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(response.content))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "bytes": max(sizes),
+    }
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        results = {}
+        for path in ENDPOINTS:
+            # One warm-up request so connection setup and caches are not measured
+            await client.get(path, params={"limit": args.limit}, headers=headers)
+            results[path] = await measure(client, path, headers, args.limit, args.concurrency, args.duration)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{'endpoint':<20} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'KB':>7}" + ("   rps x   p99 x" if baseline else ""))
+    for path, result in results.items():
+        line = f"{path:<20} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p99']:>8.1f} {result['bytes'] / 1024:>7.0f}"
+        before = baseline.get(path)
+        if before:
+            line += f"   {result['rps'] / before['rps']:>5.2f} {before['p99'] / result['p99']:>7.2f}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", help="write results as JSON for a later --compare")
+    parser.add_argument("--compare", help="results JSON from a previous run to compare against")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""Login throughput versus patient read latency on a running backend.
+
+Fires a burst of concurrent logins while another set of clients keeps reading
+the patient list, and reports login throughput plus read p50/p95/p99. With
+bcrypt on the event loop, read latency tracks the login burst; with the
+password thread pool it should stay close to the idle baseline.
+
+    cd backend && python -m benchmarks.login_throughput --base-url http://localhost:8001 \\
+        --email admin@gangoshrihis.com --password Admin@123
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def login(client, email, password):
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def reader(client, token, stop, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/patients", params={"limit": 20, "summary": "true"}, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def read_phase(client, token, readers, duration, logins=None):
+    stop = asyncio.Event()
+    latencies = []
+    tasks = [asyncio.create_task(reader(client, token, stop, latencies)) for _ in range(readers)]
+    login_elapsed = None
+    if logins is not None:
+        start = time.perf_counter()
+        await asyncio.gather(*logins())
+        login_elapsed = time.perf_counter() - start
+    else:
+        await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, login_elapsed
+
+
+def report(label, latencies):
+    print(f"{label:<22} n={len(latencies):>6} p50={percentile(latencies, 50):8.2f}ms "
+          f"p95={percentile(latencies, 95):8.2f}ms p99={percentile(latencies, 99):8.2f}ms "
+          f"mean={statistics.mean(latencies):8.2f}ms")
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.logins + args.readers)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+        token = await login(client, args.email, args.password)
+
+        baseline, _ = await read_phase(client, token, args.readers, args.duration)
+        report("reads (idle)", baseline)
+
+        burst, elapsed = await read_phase(
+            client, token, args.readers, args.duration,
+            logins=lambda: [login(client, args.email, args.password) for _ in range(args.logins)]
+        )
+        report("reads (login burst)", burst)
+        print(f"logins: {args.logins} in {elapsed:.2f}s = {args.logins / elapsed:.1f} logins/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
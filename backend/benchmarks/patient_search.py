@@ -0,0 +1,116 @@
+"""Patient search latency on a large synthetic registry.
+
+Seeds a scratch patients collection with --documents patients carrying the
+normalized search keys, builds the declared indexes, and times
+patient_search.search for each kind of lookup (patient number, phone prefix,
+exact name, name prefix, misspelt name). Reports p50/p95/p99 per kind against
+the single-digit millisecond target. The bench database is dropped afterwards
+unless --keep is given.
+
+    cd backend && python -m benchmarks.patient_search --documents 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.login_throughput import percentile
+from indexes import ensure_indexes
+from pagination import ListParams
+from patient_search import search, search_fields
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+BATCH = 10000
+FIRST_NAMES = ["Ramesh", "Suresh", "Priya", "Anita", "Mohammed", "Lakshmi", "Arjun", "Kavya", "Rahul", "Sunita",
+               "Vikram", "Deepa", "Imran", "Meena", "Ravi", "Geeta", "Sanjay", "Pooja", "Ajay", "Neha"]
+LAST_NAMES = ["Kumar", "Sharma", "Singh", "Patel", "Reddy", "Iyer", "Khan", "Nair", "Gupta", "Das",
+              "Verma", "Joshi", "Mehta", "Rao", "Pillai", "Bose", "Mishra", "Yadav", "Chopra", "Menon"]
+
+
+def patient(i: int) -> dict:
+    rng = random.Random(i)
+    full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}{i % 997}"
+    phone = f"+91 9{i:09d}"
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": f"PAT{i + 1:06d}",
+        "full_name": full_name,
+        "phone": phone,
+        "created_at": datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+        **search_fields(full_name, phone),
+    }
+
+
+async def seed(db, documents: int):
+    await db.patients.drop()
+    for start in range(0, documents, BATCH):
+        await db.patients.insert_many([patient(i) for i in range(start, min(start + BATCH, documents))], ordered=False)
+
+
+def lookups(documents: int) -> dict:
+    rng = random.Random(7)
+    return {
+        "patient number": lambda: f"PAT{rng.randint(1, documents):06d}",
+        "phone prefix": lambda: f"9{rng.randint(0, documents - 1):09d}"[:7],
+        "exact name": lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "name prefix": lambda: rng.choice(FIRST_NAMES)[:4],
+        "misspelt name": lambda: rng.choice(["Rames", "Sursh", "Lakshmy", "Sharmaa", "Kumaar"]),
+    }
+
+
+def params(limit: int) -> ListParams:
+    return ListParams(limit=limit, after=None, stream=False, fields=None, summary=True, created_from=None, created_to=None)
+
+
+async def measure(db, documents: int, repeat: int, limit: int) -> dict:
+    projection = {"_id": 0, "id": 1, "patient_id": 1, "full_name": 1, "phone": 1, "created_at": 1}
+    results = {}
+    for kind, make_term in lookups(documents).items():
+        samples = []
+        for _ in range(repeat):
+            term = make_term()
+            start = time.perf_counter()
+            await search(db.patients, term, projection, params(limit))
+            samples.append((time.perf_counter() - start) * 1000)
+        results[kind] = samples
+    return results
+
+
+async def run(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db_name = os.environ.get('BENCH_DB_NAME', os.environ['DB_NAME'] + '_bench')
+    if db_name == os.environ['DB_NAME']:
+        raise SystemExit("BENCH_DB_NAME must not be the application database; it is dropped afterwards")
+    db = client[db_name]
+
+    try:
+        print(f"Seeding {args.documents} patients...")
+        await seed(db, args.documents)
+        await ensure_indexes(db)
+        results = await measure(db, args.documents, args.repeat, args.limit)
+
+        print(f"{'lookup':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for kind, samples in results.items():
+            print(f"{kind:<16} {percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f} {percentile(samples, 99):>8.2f}")
+    finally:
+        if not args.keep:
+            await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20, help="page size, as the patient picker requests")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded bench database in place")
+    asyncio.run(run(parser.parse_args()))
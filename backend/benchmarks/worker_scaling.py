@@ -0,0 +1,131 @@
+"""Throughput scaling across uvicorn worker counts.
+
+Starts serve.py with each --workers count in turn, drives it from --clients
+load-generator processes (each keeping --concurrency requests in flight) with
+a read mix of the doctor list, a patient page and dashboard stats, and reports
+requests/s, speedup over the first count and per-worker efficiency. Needs
+MongoDB (MONGO_URL/DB_NAME as for the server) running as a replica set, since
+several workers need CHANGE_FEED_SOURCE=changestream, and an existing user; keep the
+load generators on cores the server is not using if you can, or they become
+the bottleneck.
+
+    cd backend && python -m benchmarks.worker_scaling --workers 1,2,4 \\
+        --email admin@gangoshrihis.com --password Admin@123
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.login_throughput import login, percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+REQUESTS = (
+    ("/api/users/doctors", {}),
+    ("/api/patients", {"limit": 20, "summary": "true"}),
+    ("/api/dashboard/stats", {}),
+)
+
+
+async def drive(base_url, token, concurrency, duration):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client, offset):
+        nonlocal errors
+        n = offset
+        while time.perf_counter() < deadline:
+            path, params = REQUESTS[n % len(REQUESTS)]
+            n += 1
+            start = time.perf_counter()
+            response = await client.get(path, params=params, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client, offset) for offset in range(concurrency)))
+    return latencies, errors
+
+
+def load_process(args):
+    return asyncio.run(drive(*args))
+
+
+def start_server(workers, port):
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={"CHANGE_FEED_SOURCE": "changestream", **os.environ},
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"serve.py exited with {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/users/doctors", timeout=1)
+            # Give every worker time to finish its startup warmup
+            time.sleep(2 + workers * 0.5)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.25)
+    process.terminate()
+    raise SystemExit("server did not start within 60s")
+
+
+def measure(args, workers):
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_server(workers, args.port)
+    try:
+        async def get_token():
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                return await login(client, args.email, args.password)
+        token = asyncio.run(get_token())
+
+        # Short warm run so every worker has its caches and connections up
+        with multiprocessing.Pool(args.clients) as pool:
+            pool.map(load_process, [(base_url, token, args.concurrency, 1.0)] * args.clients)
+            started = time.perf_counter()
+            results = pool.map(load_process, [(base_url, token, args.concurrency, args.duration)] * args.clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    latencies = [ms for samples, _ in results for ms in samples]
+    errors = sum(errors for _, errors in results)
+    return len(latencies) / elapsed, latencies, errors
+
+
+def run(args):
+    counts = [int(n) for n in args.workers.split(",")]
+    print(f"{os.cpu_count()} cores, {args.clients} load processes x {args.concurrency} in flight, {args.duration}s per run")
+    first = None
+    for workers in counts:
+        throughput, latencies, errors = measure(args, workers)
+        first = first or throughput
+        speedup = throughput / first
+        efficiency = speedup * counts[0] / workers
+        print(f"workers={workers:<3} {throughput:9.1f} req/s  speedup={speedup:5.2f}x  efficiency={efficiency:6.1%}  "
+              f"p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):7.2f}ms errors={errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to compare")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per load process")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per measurement")
+    run(parser.parse_args())
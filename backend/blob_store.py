@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional
+from urllib.parse import quote
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+CHUNK_SIZE = 256 * 1024
+
+
+class StoredBlob(NamedTuple):
+    ref: str
+    size: int
+    sha256: str
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobStore(ABC):
+    """Stores report files outside the report documents.
+
+    `put` consumes an async iterator of byte chunks so uploads never have to be
+    held in memory; `read` yields chunks of an optional byte range for
+    streaming downloads. Refs are prefixed with the backend name.
+    """
+
+    scheme = ""
+
+    @abstractmethod
+    async def put(self, chunks: AsyncIterator[bytes], filename: str, content_type: Optional[str] = None) -> StoredBlob:
+        ...
+
+    @abstractmethod
+    async def size(self, ref: str) -> int:
+        ...
+
+    @abstractmethod
+    def read(self, ref: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        ...
+
+    @abstractmethod
+    async def delete(self, ref: str):
+        ...
+
+    def _key(self, ref: str) -> str:
+        scheme, _, key = ref.partition(":")
+        if scheme != self.scheme or not key:
+            raise BlobNotFound(ref)
+        return key
+
+
+class GridFSBlobStore(BlobStore):
+    scheme = "gridfs"
+
+    def __init__(self, db, bucket_name: str = "report_files"):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+
+    async def put(self, chunks, filename, content_type=None):
+        digest = hashlib.sha256()
+        size = 0
+        grid_in = self.bucket.open_upload_stream(filename, metadata={"content_type": content_type})
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        return StoredBlob(f"{self.scheme}:{grid_in._id}", size, digest.hexdigest())
+
+    async def _open(self, ref):
+        try:
+            return await self.bucket.open_download_stream(ObjectId(self._key(ref)))
+        except (InvalidId, NoFile):
+            raise BlobNotFound(ref)
+
+    async def size(self, ref):
+        return (await self._open(ref)).length
+
+    async def read(self, ref, start=0, end=None):
+        grid_out = await self._open(ref)
+        end = grid_out.length - 1 if end is None else end
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, ref):
+        try:
+            await self.bucket.delete(ObjectId(self._key(ref)))
+        except InvalidId:
+            raise BlobNotFound(ref)
+        except NoFile:
+            # Already gone, as with a missing local file
+            pass
+
+
+class LocalBlobStore(BlobStore):
+    """Content-addressed files under `root`, named by their SHA-256 digest."""
+
+    scheme = "local"
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    async def put(self, chunks, filename, content_type=None):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await asyncio.to_thread(tmp.write, chunk)
+            path = self._path(digest.hexdigest())
+            path.parent.mkdir(exist_ok=True)
+            # Identical content is already stored under the same name
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return StoredBlob(f"{self.scheme}:{digest.hexdigest()}", size, digest.hexdigest())
+
+    async def size(self, ref):
+        try:
+            return self._path(self._key(ref)).stat().st_size
+        except FileNotFoundError:
+            raise BlobNotFound(ref)
+
+    async def read(self, ref, start=0, end=None):
+        path = self._path(self._key(ref))
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(ref)
+        with handle:
+            end = path.stat().st_size - 1 if end is None else end
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(handle.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, ref):
+        # Content-addressed files may be shared by several reports, so callers
+        # must only delete once no report references the digest any more
+        path = self._path(self._key(ref))
+        if path.exists():
+            path.unlink()
+
+
+def create_blob_store(db, root_dir: Path, default: str = 'gridfs') -> BlobStore:
+    backend = os.environ.get('BLOB_STORE', default)
+    if backend == 'local':
+        return LocalBlobStore(Path(os.environ.get('BLOB_STORE_PATH', root_dir / 'uploads')))
+    return GridFSBlobStore(db)
+
+
+async def upload_chunks(upload, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    # Starlette spools UploadFile to disk past 1 MB, so this never holds the whole file
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def content_disposition(filename: str) -> str:
+    # Quoted ASCII fallback for old clients, RFC 5987 filename* for the real name
+    fallback = "".join(c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    # Single "bytes=start-end" / "bytes=start-" / "bytes=-suffix" ranges only
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    else:
+        start = size - int(last)
+        end = size - 1
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise ValueError(header)
+    return start, end
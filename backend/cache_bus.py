@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBus:
+    """Broadcasts cache invalidations to every worker through a capped collection.
+
+    `publish` applies the invalidation to this process right away, then
+    inserts it into `cache_invalidations`; each worker tails that collection
+    with a tailable cursor and applies messages from other workers to the
+    handlers registered under the same cache name. Missing a message only
+    leaves an entry cached until its TTL, so the bus is best effort: write
+    errors are logged, and after a dropped cursor tailing resumes from the
+    last message seen. With `shared` off (single process, in-memory
+    backend) it only runs the local handlers.
+    """
+
+    def __init__(self, db, shared: bool = True, collection: str = "cache_invalidations", size_bytes: int = 1024 * 1024):
+        self.db = db
+        self.shared = shared
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.failures = 0
+
+    def register(self, cache: str, handler: Callable[[Optional[str]], None]):
+        self._handlers.setdefault(cache, []).append(handler)
+
+    def _apply(self, cache: str, key: Optional[str]):
+        for handler in self._handlers.get(cache, ()):
+            handler(key)
+
+    async def publish(self, cache: str, key: Optional[str] = None):
+        self._apply(cache, key)
+        self.published += 1
+        if not self.shared:
+            return
+        try:
+            await self.db[self.collection_name].insert_one({
+                "cache": cache,
+                "key": key,
+                "origin": self.worker_id,
+                "at": datetime.now(timezone.utc),
+            })
+        except PyMongoError as e:
+            self.failures += 1
+            logger.error("Could not broadcast %s invalidation: %s", cache, e)
+
+    async def start(self):
+        if not self.shared or self._task is not None:
+            return
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        # Anything older than this worker's caches is irrelevant; a little overlap only costs a refetch
+        since = datetime.now(timezone.utc) - timedelta(seconds=1)
+        while True:
+            try:
+                cursor = self.db[self.collection_name].find({"at": {"$gte": since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                # An empty capped collection kills tailable cursors straight away; retry after a pause
+                while cursor.alive:
+                    async for message in cursor:
+                        since = message["at"]
+                        if message.get("origin") != self.worker_id:
+                            self.received += 1
+                            self._apply(message["cache"], message.get("key"))
+            except PyMongoError as e:
+                self.failures += 1
+                logger.error("Cache invalidation feed interrupted: %s", e)
+            await asyncio.sleep(1.0)
+
+    def stats(self) -> dict:
+        return {
+            "shared": self.shared,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "received": self.received,
+            "failures": self.failures,
+        }
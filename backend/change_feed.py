@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+import orjson
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Fields a client needs to patch its list view in place; everything else means a refetch
+FEED_FIELDS = {
+    "appointments": (
+        "id", "appointment_id", "patient_id", "patient_name", "doctor_id", "doctor_name",
+        "appointment_date", "appointment_time", "status",
+    ),
+    "orders": (
+        "id", "order_id", "patient_id", "patient_name", "doctor_id", "doctor_name", "order_type",
+        "test_name", "priority", "status", "assigned_name", "lease_expires_at", "created_at",
+    ),
+}
+
+# Claiming sets these on an order and releasing it to the queue removes them (see worklist.LEASE_FIELDS)
+_LEASE_HOLDER = "assigned_to"
+
+# Change streams raise this on a standalone server
+_NOT_REPLICA_SET = 40573
+
+
+def update_op(collection: str, updated: dict, removed: Iterable[str], doc: dict) -> str:
+    """The op routes publish for an update, worked out from what the update changed.
+
+    Lets the change stream source send the worklist's "claimed" and
+    "released" events, which it cannot see being published.
+    """
+    if collection == "orders":
+        if _LEASE_HOLDER in updated and doc.get("status") == "in_progress":
+            return "claimed"
+        if _LEASE_HOLDER in removed and doc.get("status") == "pending":
+            return "released"
+    return "updated"
+
+
+def encode_event(event: dict) -> str:
+    return orjson.dumps(event).decode("utf-8")
+
+
+class Subscription:
+    def __init__(self, collections: Set[str], doctor_ids: Optional[Set[str]], order_type: Optional[str], max_queue: int):
+        self.collections = collections
+        self.doctor_ids = doctor_ids
+        self.order_type = order_type
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.closed = False
+
+    def matches(self, event: dict) -> bool:
+        if event["collection"] not in self.collections:
+            return False
+        if self.order_type and event["data"].get("order_type") not in (None, self.order_type):
+            return False
+        return True
+
+    async def events(self, keepalive: float) -> AsyncIterator[Optional[dict]]:
+        # Yields None after `keepalive` idle seconds so transports can send a heartbeat
+        while not self.closed:
+            try:
+                yield await asyncio.wait_for(self.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class ChangeFeed:
+    """In-process pub/sub for appointment and order changes.
+
+    Routes call `publish` after a write. Subscribers that follow specific
+    doctors are indexed by doctor id, so an event is only matched against the
+    clients that can want it. Every subscriber has a bounded queue; a client
+    that falls behind is closed and expected to reconnect and refetch.
+
+    When a `ChangeStreamSource` is running, MongoDB is the source instead and
+    `publish` becomes a no-op, which also makes events reach clients on every
+    worker.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self.source = "local"
+        self._everyone: Set[Subscription] = set()
+        self._by_doctor: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, collections: Iterable[str], doctor_ids: Optional[Iterable[str]] = None, order_type: Optional[str] = None) -> Subscription:
+        subscription = Subscription(set(collections), set(doctor_ids) if doctor_ids is not None else None, order_type, self.max_queue)
+        if subscription.doctor_ids is None:
+            self._everyone.add(subscription)
+        for doctor_id in subscription.doctor_ids or ():
+            self._by_doctor.setdefault(doctor_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        self._everyone.discard(subscription)
+        for doctor_id in subscription.doctor_ids or ():
+            followers = self._by_doctor.get(doctor_id)
+            if followers:
+                followers.discard(subscription)
+                if not followers:
+                    del self._by_doctor[doctor_id]
+
+    def publish(self, collection: str, op: str, doc: dict):
+        if self.source == "local":
+            self.dispatch(collection, op, doc)
+
+    def dispatch(self, collection: str, op: str, doc: dict):
+        fields = FEED_FIELDS.get(collection)
+        if fields is None:
+            return
+        data = {name: doc[name] for name in fields if name in doc}
+        event = {"collection": collection, "op": op, "id": doc.get("id"), "data": data, "at": datetime.now(timezone.utc)}
+        self.published += 1
+
+        candidates = self._everyone | self._by_doctor.get(doc.get("doctor_id"), set())
+        for subscription in candidates:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        followed = set().union(*self._by_doctor.values()) if self._by_doctor else set()
+        return {
+            "source": self.source,
+            "subscribers": len(self._everyone | followed),
+            "followed_doctors": len(self._by_doctor),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+async def sse_events(feed: ChangeFeed, subscription: Subscription, keepalive: float = 15.0) -> AsyncIterator[str]:
+    # Comment lines keep proxies from closing idle connections
+    try:
+        yield "retry: 3000\n\n"
+        async for event in subscription.events(keepalive):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['op']}\ndata: {encode_event(event)}\n\n"
+    finally:
+        feed.unsubscribe(subscription)
+
+
+class ChangeStreamSource:
+    """Feeds a ChangeFeed from a MongoDB change stream (replica sets only).
+
+    Falls back to route-published events if the deployment does not support
+    change streams, and resumes from the last seen token after errors.
+    """
+
+    def __init__(self, db, feed: ChangeFeed):
+        self.db = db
+        self.feed = feed
+
+    async def run(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(FEED_FIELDS)},
+            "operationType": {"$in": ["insert", "update", "replace"]},
+        }}]
+        resume_token = None
+        delay = 1.0
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.feed.source = "changestream"
+                    delay = 1.0
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self._dispatch(change)
+            except OperationFailure as e:
+                self.feed.source = "local"
+                if e.code == _NOT_REPLICA_SET:
+                    logger.warning("Change streams need a replica set; publishing change events from routes")
+                    return
+                logger.error("Change stream failed: %s", e)
+                resume_token = None if e.code == 286 else resume_token  # ChangeStreamHistoryLost
+            except PyMongoError as e:
+                self.feed.source = "local"
+                logger.error("Change stream interrupted: %s", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _dispatch(self, change: dict):
+        doc = change.get("fullDocument")
+        if not doc:
+            return
+        if change["operationType"] == "insert":
+            self.feed.dispatch(change["ns"]["coll"], "created", doc)
+            return
+        # Only ship the fields that changed (removed ones as None), plus what subscribers filter on
+        collection = change["ns"]["coll"]
+        description = change.get("updateDescription", {})
+        updated = description.get("updatedFields", doc)
+        removed = description.get("removedFields", [])
+        delta = {name: doc.get(name) for name in ("id", "doctor_id", "order_type")}
+        delta.update({name: value for name, value in updated.items() if name in FEED_FIELDS[collection]})
+        delta.update({name: None for name in removed if name in FEED_FIELDS[collection]})
+        self.feed.dispatch(collection, update_op(collection, updated, removed, doc), delta)
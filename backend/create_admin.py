@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 from pathlib import Path
 from passlib.context import CryptContext
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -39,7 +39,7 @@ async def create_admin_user():
         "role": "ADMIN",
         "phone": "+919876543210",
         "is_active": True,
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "password_hash": hash_password("Admin@123")
     }
     
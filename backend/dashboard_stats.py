@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Optional
+
+from pymongo import UpdateOne
+
+PATIENTS = "patients"
+PENDING_ORDERS = "orders:pending"
+PENDING_INVOICES = "invoices:pending"
+SEEDED = "_seeded"
+
+
+def appointments_on(date: str) -> str:
+    return f"appointments:{date}"
+
+
+class DashboardCounters:
+    """Running dashboard counts kept in the `dashboard_counters` collection.
+
+    Create and status-change routes adjust the counters as they write, so a
+    dashboard load is a single `$in` lookup instead of four collection counts.
+    Snapshots are cached in-process for `ttl` seconds and shared by all users.
+    """
+
+    def __init__(self, db, ttl: float = 5.0):
+        self.db = db
+        self.ttl = ttl
+        self._snapshot: Optional[dict] = None
+        self._snapshot_key: Optional[str] = None
+        self._expires_at = 0.0
+
+    async def incr(self, name: str, amount: int = 1):
+        await self.db.dashboard_counters.update_one({"_id": name}, {"$inc": {"value": amount}}, upsert=True)
+
+    async def order_status_changed(self, previous: Optional[str], current: str):
+        if previous == current:
+            return
+        if previous == "pending":
+            await self.incr(PENDING_ORDERS, -1)
+        elif current == "pending" and previous is not None:
+            await self.incr(PENDING_ORDERS, 1)
+
+    async def reconcile(self):
+        # Full recount; only needed on first start or to repair drift
+        patients, pending_orders, pending_invoices, by_date = await asyncio.gather(
+            self.db.patients.count_documents({}),
+            self.db.orders.count_documents({"status": "pending"}),
+            self.db.invoices.count_documents({"payment_status": "pending"}),
+            self.db.appointments.aggregate([
+                {"$group": {"_id": "$appointment_date", "count": {"$sum": 1}}}
+            ]).to_list(None),
+        )
+        writes = [
+            UpdateOne({"_id": PATIENTS}, {"$set": {"value": patients}}, upsert=True),
+            UpdateOne({"_id": PENDING_ORDERS}, {"$set": {"value": pending_orders}}, upsert=True),
+            UpdateOne({"_id": PENDING_INVOICES}, {"$set": {"value": pending_invoices}}, upsert=True),
+            UpdateOne({"_id": SEEDED}, {"$set": {"value": 1}}, upsert=True),
+        ]
+        writes.extend(
+            UpdateOne({"_id": appointments_on(row["_id"])}, {"$set": {"value": row["count"]}}, upsert=True)
+            for row in by_date if row["_id"]
+        )
+        await self.db.dashboard_counters.bulk_write(writes, ordered=False)
+        self._snapshot = None
+
+    async def seed_if_missing(self):
+        if not await self.db.dashboard_counters.find_one({"_id": SEEDED}):
+            await self.reconcile()
+
+    async def snapshot(self, today: str) -> dict:
+        now = time.monotonic()
+        if self._snapshot is not None and self._snapshot_key == today and now < self._expires_at:
+            return self._snapshot
+
+        names = {
+            PATIENTS: "total_patients",
+            appointments_on(today): "today_appointments",
+            PENDING_ORDERS: "pending_orders",
+            PENDING_INVOICES: "pending_invoices",
+        }
+        stats = {key: 0 for key in names.values()}
+        async for doc in self.db.dashboard_counters.find({"_id": {"$in": list(names)}}):
+            stats[names[doc["_id"]]] = doc["value"]
+
+        self._snapshot, self._snapshot_key, self._expires_at = stats, today, now + self.ttl
+        return stats
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from exports import EXPORTS, FORMATS, MAX_BATCH_SIZE, export_batch_size, export_filename, parquet_available, stream_export
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+def parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+async def export_data(collection: str, fmt: str, start, end, batch_size: int, output: str):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    written = 0
+    started = time.perf_counter()
+    target = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        async for chunk in stream_export(db[collection], EXPORTS[collection], fmt, start, end, batch_size):
+            target.write(chunk)
+            written += len(chunk)
+    finally:
+        if target is not sys.stdout.buffer:
+            target.close()
+
+    if output != "-":
+        print(f"Wrote {written / 1024 / 1024:.1f} MB to {output} in {time.perf_counter() - started:.1f}s")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a collection to CSV, NDJSON or Parquet")
+    parser.add_argument("collection", choices=sorted(EXPORTS))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--from", dest="start", type=parse_date, help="inclusive start (ISO date or timestamp, UTC if no offset)")
+    parser.add_argument("--to", dest="end", type=parse_date, help="exclusive end")
+    parser.add_argument("--batch-size", type=int, default=export_batch_size(), help=f"cursor batch size (max {MAX_BATCH_SIZE})")
+    parser.add_argument("--output", help="file to write, '-' for stdout; defaults to <collection>_<from>_<to>.<ext>")
+    args = parser.parse_args()
+    if args.format == "parquet" and not parquet_available():
+        parser.error("Parquet export requires pyarrow")
+    if not 1 <= args.batch_size <= MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {MAX_BATCH_SIZE}")
+    output = args.output or export_filename(args.collection, args.format, args.start, args.end)
+    asyncio.run(export_data(args.collection, args.format, args.start, args.end, args.batch_size, output))
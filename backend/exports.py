@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import os
+import typing
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+
+from models import AuditLog, Encounter, Invoice, Order, Patient, Prescription
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+
+class ExportSpec:
+    def __init__(self, collection: str, model, timestamp_field: str = "created_at"):
+        self.collection = collection
+        self.model = model
+        self.timestamp_field = timestamp_field
+        self.columns: List[str] = list(model.model_fields)
+
+    @property
+    def projection(self) -> dict:
+        # Only declared fields leave the database, so search keys and secrets never export
+        return {"_id": 0, **{name: 1 for name in self.columns}}
+
+    def query(self, start: Optional[datetime], end: Optional[datetime]) -> dict:
+        bounds = {}
+        if start:
+            bounds["$gte"] = start
+        if end:
+            bounds["$lt"] = end
+        return {self.timestamp_field: bounds} if bounds else {}
+
+
+EXPORTS = {
+    "patients": ExportSpec("patients", Patient),
+    "encounters": ExportSpec("encounters", Encounter),
+    "prescriptions": ExportSpec("prescriptions", Prescription),
+    "orders": ExportSpec("orders", Order),
+    "invoices": ExportSpec("invoices", Invoice),
+    "audit_logs": ExportSpec("audit_logs", AuditLog, timestamp_field="timestamp"),
+}
+
+
+def export_batch_size() -> int:
+    # Read when called, so command-line tools can load .env first
+    return int(os.environ.get('EXPORT_BATCH_SIZE', str(DEFAULT_BATCH_SIZE)))
+
+
+async def _batches(cursor, batch_size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _flat(value):
+    # CSV/Parquet cells are scalars; nested vitals, medications and items become JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _string_cell(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = _flat(value)
+    return value if isinstance(value, str) else str(value)
+
+
+def _typed_cell(pa, value, arrow_type):
+    # Legacy rows can hold ISO strings or numbers as text; a cell that cannot be
+    # coerced becomes null rather than failing the export after the 200 was sent
+    if value is None:
+        return None
+    try:
+        if pa.types.is_timestamp(arrow_type):
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            if not isinstance(value, datetime):
+                return None
+            return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        if pa.types.is_boolean(arrow_type):
+            return value if isinstance(value, bool) else None
+        if pa.types.is_integer(arrow_type):
+            return int(value)
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value
+
+
+def _take(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_type(pa, annotation):
+    # Optional[X] -> X; anything that is not a plain scalar is exported as JSON text
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+    return {
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        datetime: pa.timestamp("us", tz="UTC"),
+    }.get(annotation, pa.string())
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def stream_export(collection, spec: ExportSpec, fmt: str, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Yields the encoded export one cursor batch at a time.
+
+    Documents are read through an unsorted server-side cursor with the given
+    batch size (date ranges walk the timestamp index), and each batch is
+    encoded and released before the next is fetched. Parquet writes one row
+    group per batch, coercing each cell to its column type first.
+    """
+    cursor = collection.find(spec.query(start, end), spec.projection)
+
+    if fmt == "ndjson":
+        async for batch in _batches(cursor, batch_size):
+            yield b"".join(orjson.dumps(doc, default=str) + b"\n" for doc in batch)
+
+    elif fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(spec.columns)
+        yield _take(buffer)
+        async for batch in _batches(cursor, batch_size):
+            for doc in batch:
+                writer.writerow(["" if doc.get(name) is None else _flat(doc.get(name)) for name in spec.columns])
+            yield _take(buffer)
+
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, _arrow_type(pa, field.annotation)) for name, field in spec.model.model_fields.items()])
+        types = {name: schema.field(name).type for name in spec.columns}
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        async for batch in _batches(cursor, batch_size):
+            columns = {
+                name: [_string_cell(doc.get(name)) if pa.types.is_string(arrow_type) else _typed_cell(pa, doc.get(name), arrow_type) for doc in batch]
+                for name, arrow_type in types.items()
+            }
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def export_filename(collection: str, fmt: str, start: Optional[datetime], end: Optional[datetime]) -> str:
+    parts: Tuple[str, ...] = (collection,)
+    if start:
+        parts += (start.date().isoformat(),)
+    if end:
+        parts += (end.date().isoformat(),)
+    return f"{'_'.join(parts)}.{FORMATS[fmt][1]}"
+
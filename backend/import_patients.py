@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from dashboard_stats import DashboardCounters, PATIENTS
+from models import AuditLog, PatientCreate
+from patient_import import DEFAULT_CHUNK_SIZE, FORMATS, PatientImporter, detect_format, read_rows
+from sequences import SequenceAllocator
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def import_patients(path: str, fmt: str, created_by: str, chunk_size: int, errors_path: str):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    sequences = SequenceAllocator(db)
+    await sequences.seed_from_existing()
+
+    importer = PatientImporter(db, sequences, PatientCreate, chunk_size=chunk_size)
+    started = time.perf_counter()
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = await importer.run(read_rows(stream, fmt), created_by)
+    elapsed = time.perf_counter() - started
+
+    await DashboardCounters(db).incr(PATIENTS, report.imported)
+    audit = AuditLog(
+        user_id=created_by,
+        user_email="",
+        action="IMPORT",
+        resource_type="patient",
+        resource_id=os.path.basename(path),
+        details={"total": report.total, "imported": report.imported, "failed": len(report.errors)}
+    )
+    await db.audit_logs.insert_one(audit.model_dump())
+
+    print(f"{report.imported}/{report.total} patients imported in {elapsed:.1f}s ({report.total / max(elapsed, 1e-9):.0f} rows/s)")
+    if report.errors:
+        with open(errors_path, "w") as f:
+            for error in report.errors:
+                f.write(json.dumps(error) + "\n")
+        print(f"{len(report.errors)} rows failed; see {errors_path}")
+
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import patients from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--created-by", default="import", help="user id recorded as created_by")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--errors", default="import_errors.ndjson", help="where to write the per-row error report")
+    args = parser.parse_args()
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+    asyncio.run(import_patients(args.path, fmt, args.created_by, args.chunk_size, args.errors))
@@ -0,0 +1,134 @@
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _by_patient(name: str) -> IndexModel:
+    return IndexModel([("patient_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name=f"{name}_patient_created")
+
+
+def _by_doctor(name: str) -> IndexModel:
+    # Lets name propagation find a renamed doctor's records without a collection scan
+    return IndexModel([("doctor_id", ASCENDING)], name=f"{name}_doctor")
+
+
+def _recent() -> IndexModel:
+    return IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id")
+
+
+def _uuid() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True)
+
+
+# Human-readable IDs (PAT000001, ...) are not declared unique: rows created under the
+# old count_documents() scheme may already collide, and a failed unique build would
+# leave the field unindexed. New IDs come from the counters collection.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _uuid(),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING), ("is_active", ASCENDING)], name="role_active"),
+        _recent(),
+    ],
+    "patients": [
+        _uuid(),
+        IndexModel([("patient_id", ASCENDING)], name="patient_id"),
+        # Search clauses run newest-first, so exact key matches come back in index order
+        IndexModel([("name_tokens", ASCENDING), ("created_at", DESCENDING)], name="name_tokens_created"),
+        IndexModel([("name_phonetic", ASCENDING), ("created_at", DESCENDING)], name="name_phonetic_created"),
+        IndexModel([("phone_keys", ASCENDING), ("created_at", DESCENDING)], name="phone_keys_created"),
+        _recent(),
+    ],
+    "appointments": [
+        _uuid(),
+        IndexModel([("appointment_id", ASCENDING)], name="appointment_id"),
+        IndexModel([("doctor_id", ASCENDING), ("appointment_date", DESCENDING), ("id", DESCENDING)], name="doctor_date"),
+        IndexModel([("patient_id", ASCENDING), ("appointment_date", DESCENDING), ("id", DESCENDING)], name="patient_date"),
+        IndexModel([("appointment_date", DESCENDING), ("id", DESCENDING)], name="date_id"),
+        IndexModel([("doctor_id", ASCENDING), ("appointment_at", ASCENDING)], name="doctor_appointment_at"),
+    ],
+    "encounters": [
+        _uuid(),
+        IndexModel([("encounter_id", ASCENDING)], name="encounter_id"),
+        _by_patient("encounters"),
+        _by_doctor("encounters"),
+        _recent(),
+    ],
+    "prescriptions": [
+        _uuid(),
+        IndexModel([("prescription_id", ASCENDING)], name="prescription_id"),
+        _by_patient("prescriptions"),
+        _by_doctor("prescriptions"),
+        _recent(),
+    ],
+    "orders": [
+        _uuid(),
+        IndexModel([("order_id", ASCENDING)], name="order_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created"),
+        IndexModel([("status", ASCENDING), ("priority_rank", ASCENDING), ("created_at", ASCENDING)], name="status_priority_created"),
+        _by_patient("orders"),
+        _by_doctor("orders"),
+        IndexModel([("assigned_to", ASCENDING)], name="assigned_to", sparse=True),
+        _recent(),
+    ],
+    "reports": [
+        _uuid(),
+        IndexModel([("report_id", ASCENDING)], name="report_id"),
+        _by_patient("reports"),
+        _recent(),
+    ],
+    "invoices": [
+        _uuid(),
+        IndexModel([("invoice_id", ASCENDING)], name="invoice_id"),
+        IndexModel([("payment_status", ASCENDING)], name="payment_status"),
+        _by_patient("invoices"),
+        _by_doctor("invoices"),
+        _recent(),
+    ],
+    "name_propagation": [
+        IndexModel([("status", ASCENDING), ("queued_at", ASCENDING)], name="status_queued"),
+    ],
+    "audit_logs": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp"),
+    ],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    # createIndexes is a no-op for indexes that already exist with the same spec
+    failed: Dict[str, List[str]] = {}
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                name = model.document["name"]
+                failed.setdefault(collection, []).append(name)
+                logger.error("Failed to build index %s.%s: %s", collection, name, e)
+    return failed
+
+
+async def verify_indexes(db) -> Dict[str, dict]:
+    report: Dict[str, dict] = {}
+    for collection, models in INDEXES.items():
+        declared = [model.document["name"] for model in models]
+        existing = await db[collection].index_information()
+        usage = {}
+        try:
+            async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except OperationFailure:
+            # $indexStats needs clusterMonitor on some hosted deployments
+            pass
+        report[collection] = {
+            "missing": [name for name in declared if name not in existing],
+            "undeclared": [name for name in existing if name != "_id_" and name not in declared],
+            "unused": [name for name, ops in usage.items() if name != "_id_" and ops == 0],
+            "usage": usage,
+        }
+    return report
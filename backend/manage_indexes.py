@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import ensure_indexes, verify_indexes
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def manage_indexes(verify_only: bool):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    if not verify_only:
+        failed = await ensure_indexes(db)
+        if failed:
+            print("Some indexes could not be built:")
+            print(json.dumps(failed, indent=2))
+        else:
+            print("All declared indexes are in place.")
+
+    report = await verify_indexes(db)
+    print(json.dumps(report, indent=2))
+
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and verify MongoDB indexes")
+    parser.add_argument("--verify", action="store_true", help="only report missing/unused indexes")
+    args = parser.parse_args()
+    asyncio.run(manage_indexes(args.verify))
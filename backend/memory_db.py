@@ -0,0 +1,1088 @@
+import bisect
+import functools
+import heapq
+import itertools
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+from bson.errors import InvalidDocument
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+# Cross-type ordering used by MongoDB sorts and comparisons
+_TYPE_ORDER = {type(None): 0, int: 1, float: 1, str: 2, dict: 3, list: 4, ObjectId: 6, bool: 7, datetime: 8}
+
+_TYPE_ALIASES = {
+    "double": float, "string": str, "object": dict, "array": list, "objectId": ObjectId,
+    "bool": bool, "date": datetime, "null": type(None), "int": int, "long": int,
+}
+
+
+# ==================== DOCUMENT HELPERS ====================
+
+def _copy(value):
+    # Documents are plain BSON-like trees; this is several times faster than deepcopy
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, datetime):
+        # BSON dates are UTC; with tz_aware=True Motor hands them back aware
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    if isinstance(value, date):
+        raise InvalidDocument(f"cannot encode object: {value!r}, of type: {type(value)}")
+    return value
+
+
+def _get(doc, path: str):
+    """Values at a dotted path, fanning out over arrays like MongoDB does."""
+    if "." not in path:
+        return [doc[path]] if path in doc else []
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+
+def _first(doc, path: str):
+    values = _get(doc, path)
+    return values[0] if values else None
+
+
+def _set_path(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset_path(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _sort_key(value):
+    kind = type(value)
+    if kind is str or kind is int or kind is float:
+        return _TYPE_ORDER[kind], value
+    if kind is datetime and value.tzinfo is not None:
+        return 8, value
+    if isinstance(value, list):
+        value = min(value, key=_sort_key) if value else None
+    rank = _TYPE_ORDER.get(type(value), 5)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    elif isinstance(value, dict):
+        value = sorted(value.items(), key=lambda item: item[0])
+    return rank, value
+
+
+def _compare(a, b) -> int:
+    ka, kb = _sort_key(a), _sort_key(b)
+    if ka[0] != kb[0]:
+        return -1 if ka[0] < kb[0] else 1
+    try:
+        return (ka[1] > kb[1]) - (ka[1] < kb[1])
+    except TypeError:
+        return 0
+
+
+def _sort_spec(key, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key, str):
+        return [(key, direction or 1)]
+    if isinstance(key, dict):
+        return list(key.items())
+    return list(key)
+
+
+class _SortKey:
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values: list, directions: list):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other: "_SortKey") -> bool:
+        for a, b, direction in zip(self.values, other.values, self.directions):
+            order = _compare(a, b)
+            if order:
+                return order < 0 if direction == 1 else order > 0
+        return False
+
+
+def _sorter(spec: List[Tuple[str, int]]):
+    # Field values are pulled out once per document rather than once per comparison
+    directions = [direction for _, direction in spec]
+    return lambda doc: _SortKey([_first(doc, field) for field, _ in spec], directions)
+
+
+def _sorted(docs, spec: List[Tuple[str, int]], wanted: Optional[int] = None) -> list:
+    directions = {direction for _, direction in spec}
+    if len(directions) == 1:
+        # Single direction: plain tuples compare natively, far faster than _SortKey
+        key = lambda doc: tuple(_sort_key(_first(doc, field)) for field, _ in spec)  # noqa: E731
+        descending = directions == {-1}
+        try:
+            if wanted:
+                return (heapq.nlargest if descending else heapq.nsmallest)(wanted, docs, key=key)
+            return sorted(docs, key=key, reverse=descending)
+        except TypeError:
+            pass
+    key = _sorter(spec)
+    return heapq.nsmallest(wanted, docs, key=key) if wanted else sorted(docs, key=key)
+
+
+# ==================== QUERY MATCHING ====================
+
+def _regex(pattern, options: str = ""):
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = (re.IGNORECASE if "i" in options else 0) | (re.MULTILINE if "m" in options else 0) | (re.DOTALL if "s" in options else 0)
+    return _compiled(pattern, flags)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compiled(pattern: str, flags: int):
+    return re.compile(pattern, flags)
+
+
+_RANGE_TESTS = {"$gt": lambda c: c > 0, "$gte": lambda c: c >= 0, "$lt": lambda c: c < 0, "$lte": lambda c: c <= 0}
+
+
+def _comparable(value, arg) -> bool:
+    return value is not None and _TYPE_ORDER.get(type(value), 5) == _TYPE_ORDER.get(type(arg), 5)
+
+
+def _candidates(values: list) -> list:
+    # A field matches if the field itself or any array element matches
+    if not any(isinstance(value, list) for value in values):
+        return values
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _equals(values: list, arg) -> bool:
+    if arg is None and not values:
+        return True
+    return any(value == arg for value in _candidates(values))
+
+
+def _match_operators(values: list, ops: dict) -> bool:
+    for op, arg in ops.items():
+        if op == "$eq":
+            ok = _equals(values, arg)
+        elif op == "$ne":
+            ok = not _equals(values, arg)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            test = _RANGE_TESTS[op]
+            ok = False
+            for value in _candidates(values):
+                if type(value) is type(arg) and type(arg) is not dict:
+                    try:
+                        order = (value > arg) - (value < arg)
+                    except TypeError:
+                        order = _compare(value, arg)
+                elif _comparable(value, arg):
+                    order = _compare(value, arg)
+                else:
+                    continue
+                if test(order):
+                    ok = True
+                    break
+        elif op == "$in":
+            ok = any(_equals(values, item) for item in arg)
+        elif op == "$nin":
+            ok = not any(_equals(values, item) for item in arg)
+        elif op == "$exists":
+            ok = bool(values) == bool(arg)
+        elif op == "$regex":
+            pattern = _regex(arg, ops.get("$options", ""))
+            ok = any(isinstance(value, str) and pattern.search(value) for value in _candidates(values))
+        elif op == "$options":
+            ok = True
+        elif op == "$type":
+            kinds = arg if isinstance(arg, list) else [arg]
+            types = tuple(_TYPE_ALIASES[kind] for kind in kinds)
+            ok = any(isinstance(value, types) and not (isinstance(value, bool) and bool not in types) for value in _candidates(values))
+        elif op == "$size":
+            ok = any(isinstance(value, list) and len(value) == arg for value in values)
+        elif op == "$all":
+            ok = all(_equals(values, item) for item in arg)
+        elif op == "$elemMatch":
+            ok = any(isinstance(value, list) and any(_element_matches(item, arg) for item in value) for value in values)
+        elif op == "$not":
+            ok = not _match_operators(values, arg if isinstance(arg, dict) else {"$regex": arg})
+        else:
+            raise OperationFailure(f"unknown operator: {op}", code=2)
+        if not ok:
+            return False
+    return True
+
+
+def _element_matches(item, query: dict) -> bool:
+    if any(key.startswith("$") for key in query):
+        return _match_operators([item], query)
+    return isinstance(item, dict) and matches(item, query)
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            ok = all(matches(doc, part) for part in condition)
+        elif key == "$or":
+            ok = any(matches(doc, part) for part in condition)
+        elif key == "$nor":
+            ok = not any(matches(doc, part) for part in condition)
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}", code=2)
+        elif isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            ok = _match_operators(_get(doc, key), condition)
+        elif isinstance(condition, re.Pattern):
+            ok = _match_operators(_get(doc, key), {"$regex": condition})
+        else:
+            ok = _equals(_get(doc, key), condition)
+        if not ok:
+            return False
+    return True
+
+
+def _equality_constraints(query: dict) -> Dict[str, list]:
+    """Top-level field -> allowed values, for picking an index."""
+    found: Dict[str, list] = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for part in condition:
+                found.update(_equality_constraints(part))
+        elif key.startswith("$") or "." in key:
+            continue
+        elif isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            if "$eq" in condition:
+                found[key] = [condition["$eq"]]
+            elif isinstance(condition.get("$in"), list) and not any(isinstance(item, (dict, re.Pattern)) for item in condition["$in"]):
+                found[key] = list(condition["$in"])
+        elif not isinstance(condition, (dict, list, re.Pattern)):
+            found[key] = [condition]
+    return found
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return _copy(doc)
+    include = [key for key, value in projection.items() if key != "_id" and value]
+    if include or all(projection.values()):
+        result = {"_id": doc["_id"]} if projection.get("_id", 1) and "_id" in doc else {}
+        for path in include:
+            values = _get(doc, path)
+            if values:
+                _set_path(result, path, _copy(values[0]))
+        return result
+    result = _copy(doc)
+    for path, value in projection.items():
+        if not value:
+            _unset_path(result, path)
+    return result
+
+
+# ==================== UPDATES ====================
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, arg in fields.items():
+            current = _first(doc, path) if _get(doc, path) else _MISSING
+            if op in ("$set", "$setOnInsert"):
+                _set_path(doc, path, _copy(arg))
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                _set_path(doc, path, (0 if current is _MISSING else current) + arg)
+            elif op == "$mul":
+                _set_path(doc, path, (0 if current is _MISSING else current) * arg)
+            elif op == "$max":
+                if current is _MISSING or _compare(arg, current) > 0:
+                    _set_path(doc, path, _copy(arg))
+            elif op == "$min":
+                if current is _MISSING or _compare(arg, current) < 0:
+                    _set_path(doc, path, _copy(arg))
+            elif op == "$currentDate":
+                _set_path(doc, path, datetime.now(timezone.utc))
+            elif op in ("$push", "$addToSet"):
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                target = [] if current is _MISSING else current
+                if not isinstance(target, list):
+                    raise OperationFailure(f"The field '{path}' must be an array", code=2)
+                for item in items:
+                    if op == "$push" or item not in target:
+                        target.append(_copy(item))
+                _set_path(doc, path, target)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    if isinstance(arg, dict):
+                        kept = [item for item in current if not _element_matches(item, arg)]
+                    else:
+                        kept = [item for item in current if item != arg]
+                    _set_path(doc, path, kept)
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}", code=9)
+
+
+def _is_replacement(update: dict) -> bool:
+    return not any(key.startswith("$") for key in update)
+
+
+def _upsert_seed(query: dict) -> dict:
+    seed: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for part in condition:
+                seed.update(_upsert_seed(part))
+        elif key.startswith("$"):
+            continue
+        elif isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            if "$eq" in condition:
+                _set_path(seed, key, _copy(condition["$eq"]))
+        else:
+            _set_path(seed, key, _copy(condition))
+    return seed
+
+
+# ==================== AGGREGATION ====================
+
+def _evaluate(doc: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        values = _get(doc, expression[1:])
+        return values[0] if values else None
+    if isinstance(expression, list):
+        return [_evaluate(doc, item) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if not expression or not next(iter(expression)).startswith("$"):
+        return {key: _evaluate(doc, value) for key, value in expression.items()}
+
+    op, arg = next(iter(expression.items()))
+    if op == "$literal":
+        return arg
+    if op == "$dateToString":
+        value = _evaluate(doc, arg["date"])
+        if value is None:
+            return None
+        if not isinstance(value, datetime):
+            raise OperationFailure("can't convert from BSON type string to Date", code=16006)
+        if arg.get("timezone"):
+            value = value.astimezone(ZoneInfo(arg["timezone"]))
+        return value.strftime(arg.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace("%L", f"{value.microsecond // 1000:03d}"))
+    args = [_evaluate(doc, item) for item in (arg if isinstance(arg, list) else [arg])]
+    if op == "$ifNull":
+        return next((value for value in args if value is not None), None)
+    if op == "$add":
+        return sum(value or 0 for value in args)
+    if op == "$subtract":
+        return (args[0] or 0) - (args[1] or 0)
+    if op == "$multiply":
+        return functools.reduce(lambda a, b: a * (b or 0), args, 1)
+    if op == "$divide":
+        return args[0] / args[1] if args[1] else None
+    if op == "$cond":
+        branches = arg if isinstance(arg, list) else [arg["if"], arg["then"], arg["else"]]
+        return _evaluate(doc, branches[1] if _evaluate(doc, branches[0]) else branches[2])
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        order = _compare(args[0], args[1])
+        return {"$eq": order == 0, "$ne": order != 0, "$gt": order > 0, "$gte": order >= 0, "$lt": order < 0, "$lte": order <= 0}[op]
+    if op == "$toLower":
+        return (args[0] or "").lower()
+    if op == "$toUpper":
+        return (args[0] or "").upper()
+    if op == "$size":
+        return len(args[0] or [])
+    if op == "$substrCP":
+        return (args[0] or "")[args[1]:args[1] + args[2]]
+    if op in ("$toInt", "$toLong"):
+        if args[0] is None:
+            return None
+        try:
+            return int(args[0])
+        except (TypeError, ValueError):
+            raise OperationFailure(f"Failed to parse number '{args[0]}' in {op}", code=241)
+    raise OperationFailure(f"Unrecognized expression '{op}'", code=168)
+
+
+def _accumulate(rows: List[dict], spec: dict):
+    op, arg = next(iter(spec.items()))
+    values = [_evaluate(row, arg) for row in rows]
+    numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    if op == "$sum":
+        return sum(numbers)
+    if op == "$avg":
+        return sum(numbers) / len(numbers) if numbers else None
+    if op in ("$min", "$max"):
+        present = [value for value in values if value is not None]
+        if not present:
+            return None
+        return functools.reduce(lambda a, b: b if (_compare(b, a) < 0) == (op == "$min") else a, present)
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$push":
+        return values
+    if op == "$addToSet":
+        unique = []
+        for value in values:
+            if value not in unique:
+                unique.append(value)
+        return unique
+    if op == "$count":
+        return len(rows)
+    raise OperationFailure(f"unknown group operator '{op}'", code=15952)
+
+
+def _group(rows: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, List[dict]] = {}
+    keys: Dict[Any, Any] = {}
+    for row in rows:
+        key = _evaluate(row, spec["_id"])
+        marker = repr(key)
+        groups.setdefault(marker, []).append(row)
+        keys[marker] = key
+    return [
+        {"_id": keys[marker], **{name: _accumulate(members, acc) for name, acc in spec.items() if name != "_id"}}
+        for marker, members in groups.items()
+    ]
+
+
+def _unwind(rows: List[dict], spec) -> List[dict]:
+    path = (spec if isinstance(spec, str) else spec["path"])[1:]
+    keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+    unwound = []
+    for row in rows:
+        value = _first(row, path)
+        if isinstance(value, list) and value:
+            for item in value:
+                copy = _copy(row)
+                _set_path(copy, path, item)
+                unwound.append(copy)
+        elif value not in (None, []) and not isinstance(value, list):
+            unwound.append(row)
+        elif keep_empty:
+            unwound.append(row)
+    return unwound
+
+
+def _project_stage(row: dict, spec: dict) -> dict:
+    if all(value in (0, False) for value in spec.values()):
+        return _project(row, spec)
+    result = {"_id": row.get("_id")} if spec.get("_id", 1) not in (0, False) else {}
+    for key, value in spec.items():
+        if key == "_id" and value in (0, 1, True, False):
+            continue
+        if value in (1, True):
+            values = _get(row, key)
+            if values:
+                _set_path(result, key, values[0])
+        else:
+            _set_path(result, key, _evaluate(row, value))
+    return result
+
+
+# ==================== COLLECTIONS ====================
+
+class MemoryCursor:
+    """Lazy find() cursor with the chainable subset of Motor's cursor API."""
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: Optional[List[Tuple[str, int]]] = None
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key, direction=None):
+        self._sort = _sort_spec(key, direction)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def hint(self, index):
+        return self
+
+    def max_time_ms(self, ms: int):
+        return self
+
+    def _execute(self) -> List[dict]:
+        if self._results is None:
+            wanted = self._skip + self._limit if self._limit else None
+            if self._sort:
+                docs = self._collection._scan_sorted(self._query, self._sort, wanted)
+            else:
+                docs = self._collection._scan(self._query, wanted)
+            docs = docs[self._skip:wanted]
+            self._results = [_project(doc, self._projection) for doc in docs]
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._execute()
+        return results[:length] if length else list(results)
+
+    def __aiter__(self):
+        self._iterator = iter(self._execute())
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def next(self) -> dict:
+        if not hasattr(self, "_iterator"):
+            self.__aiter__()
+        return await self.__anext__()
+
+
+class MemoryCommandCursor(MemoryCursor):
+    def __init__(self, rows: List[dict]):
+        self._results = rows
+
+
+class MemoryCollection:
+    """One collection held in process, with hash indexes on declared keys.
+
+    Documents are stored by `_id` in insertion order and copied on the way
+    in and out, so callers can mutate what they get back just as they can
+    with Motor. Equality and `$in` filters on the leading field of any
+    created index are answered from the index; everything else scans.
+    Every operation completes without yielding to the event loop, so
+    `find_one_and_update` and friends are as atomic as on a real server.
+    """
+
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+        self._positions: Dict[Any, int] = {}
+        self._inserted = 0
+        self._indexes: Dict[str, dict] = {}
+        self._lookup: Dict[str, Dict[Any, Set[Any]]] = {}
+        self._ordered: Dict[str, list] = {}
+        self._index_ops: Dict[str, int] = {}
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    # ---- indexes ----
+
+    @staticmethod
+    def _hashable(value):
+        if isinstance(value, list):
+            return tuple(MemoryCollection._hashable(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(sorted((key, MemoryCollection._hashable(item)) for key, item in value.items()))
+        return value
+
+    def _index_values(self, doc: dict, field: str) -> Set[Any]:
+        values = _candidates(_get(doc, field))
+        return {self._hashable(value) for value in values} or {None}
+
+    def _add_to_indexes(self, doc: dict):
+        for field, lookup in self._lookup.items():
+            for value in self._index_values(doc, field):
+                lookup.setdefault(value, set()).add(doc["_id"])
+        for field, order in list(self._ordered.items()):
+            try:
+                bisect.insort(order, self._ordered_entry(doc, field))
+            except TypeError:
+                del self._ordered[field]
+
+    def _remove_from_indexes(self, doc: dict):
+        for field, lookup in self._lookup.items():
+            for value in self._index_values(doc, field):
+                ids = lookup.get(value)
+                if ids:
+                    ids.discard(doc["_id"])
+                    if not ids:
+                        del lookup[value]
+        for field, order in list(self._ordered.items()):
+            entry = self._ordered_entry(doc, field)
+            try:
+                position = bisect.bisect_left(order, entry)
+            except TypeError:
+                del self._ordered[field]
+                continue
+            if position < len(order) and order[position] == entry:
+                del order[position]
+
+    def _ordered_entry(self, doc: dict, field: str) -> tuple:
+        # Insertion position breaks ties, so _ids are never compared
+        return _sort_key(_first(doc, field)), self._positions[doc["_id"]], doc["_id"]
+
+    def _ordered_index(self, field: str) -> Optional[list]:
+        """Documents sorted by `field`, built on first use and kept up to date."""
+        if field not in self._ordered:
+            try:
+                self._ordered[field] = sorted(self._ordered_entry(doc, field) for doc in self._docs.values())
+            except TypeError:
+                return None
+        return self._ordered[field]
+
+    def _check_unique(self, doc: dict, ignore_id=_MISSING):
+        if doc["_id"] in self._docs and doc["_id"] != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: _id_ dup key: {{ _id: {doc['_id']!r} }}", 11000)
+        for name, info in self._indexes.items():
+            if not info.get("unique"):
+                continue
+            fields = [field for field, _ in info["key"]]
+            key = tuple(_first(doc, field) for field in fields)
+            if info.get("sparse") and all(value is None for value in key):
+                continue
+            for other_id in self._lookup[fields[0]].get(self._hashable(key[0]), ()):
+                if other_id != doc["_id"] and other_id != ignore_id and tuple(_first(self._docs[other_id], field) for field in fields) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: {name} dup key: {key!r}", 11000)
+
+    def _check_buildable(self, name: str, key: List[Tuple[str, int]], sparse: bool):
+        # Like MongoDB, a unique index cannot be built over documents that already collide
+        seen = set()
+        for doc in self._docs.values():
+            values = tuple(_first(doc, field) for field, _ in key)
+            if sparse and all(value is None for value in values):
+                continue
+            hashable = self._hashable(list(values))
+            if hashable in seen:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: {name} dup key: {values!r}", 11000)
+            seen.add(hashable)
+
+    async def create_indexes(self, models) -> List[str]:
+        names = []
+        for model in models:
+            spec = model.document
+            key = list(spec["key"].items())
+            name = spec.get("name") or "_".join(f"{field}_{direction}" for field, direction in key)
+            if spec.get("unique"):
+                self._check_buildable(name, key, spec.get("sparse", False))
+            self._indexes[name] = {"key": key, "unique": spec.get("unique", False), "sparse": spec.get("sparse", False)}
+            leading = key[0][0]
+            if leading not in self._lookup:
+                self._lookup[leading] = {}
+                for doc in self._docs.values():
+                    for value in self._index_values(doc, leading):
+                        self._lookup[leading].setdefault(value, set()).add(doc["_id"])
+            self._index_ops.setdefault(name, 0)
+            names.append(name)
+        return names
+
+    async def create_index(self, keys, **kwargs) -> str:
+        from pymongo import IndexModel
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def index_information(self) -> Dict[str, dict]:
+        info = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        for name, index in self._indexes.items():
+            info[name] = {"key": index["key"], "v": 2, **({"unique": True} if index["unique"] else {}), **({"sparse": True} if index["sparse"] else {})}
+        return info
+
+    async def drop_index(self, name: str):
+        if self._indexes.pop(name, None) is None:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        still_leading = {index["key"][0][0] for index in self._indexes.values()}
+        for field in list(self._lookup):
+            if field not in still_leading:
+                del self._lookup[field]
+                self._ordered.pop(field, None)
+        self._index_ops.pop(name, None)
+
+    # ---- reads ----
+
+    def _scan(self, query: dict, limit: Optional[int] = None) -> List[dict]:
+        if "_id" in query and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc is not None and matches(doc, query) else []
+
+        docs = self._indexed(query)
+        if docs is None:
+            docs = self._docs.values()
+        if not query:
+            return list(itertools.islice(docs, limit))
+        return list(itertools.islice((doc for doc in docs if matches(doc, query)), limit))
+
+    def _indexed(self, query: dict) -> Optional[List[dict]]:
+        best = None
+        for field, values in _equality_constraints(query).items():
+            lookup = self._lookup.get(field)
+            if lookup is None:
+                continue
+            ids = set()
+            for value in values:
+                ids |= lookup.get(self._hashable(value), set())
+            if best is None or len(ids) < len(best[1]):
+                best = (field, ids)
+        if best is not None:
+            self._count_index_use(best[0])
+            ids = best[1]
+            # Keep natural (insertion) order, as a collection scan would
+            return [self._docs[_id] for _id in sorted(ids, key=self._positions.__getitem__)]
+        return None
+
+    def _scan_sorted(self, query: dict, spec: List[Tuple[str, int]], wanted: Optional[int]) -> List[dict]:
+        """Top `wanted` documents in `spec` order.
+
+        Without a usable equality index, walks the ordered index on the first
+        sort field (if that field leads a declared index) and stops once
+        `wanted` matches and their ties are found, like an indexed sort on a
+        real server.
+        """
+        field, direction = spec[0]
+        simple_id = "_id" in query and not isinstance(query["_id"], dict)
+        order = None
+        if wanted and not simple_id and field in self._lookup and self._indexed(query) is None:
+            order = self._ordered_index(field)
+        if order is None:
+            return _sorted(self._scan(query), spec, wanted)
+
+        self._count_index_use(field)
+        found = []
+        boundary = _MISSING
+        for key, _, _id in (reversed(order) if direction == -1 else order):
+            if len(found) >= wanted and key != boundary:
+                break
+            doc = self._docs[_id]
+            if matches(doc, query):
+                found.append(doc)
+                if len(found) == wanted:
+                    boundary = key
+        # Back to natural order, so ties break exactly as a full sort would
+        found.sort(key=lambda doc: self._positions[doc["_id"]])
+        return _sorted(found, spec, wanted)
+
+    def _count_index_use(self, field: str):
+        for name, index in self._indexes.items():
+            if index["key"][0][0] == field:
+                self._index_ops[name] += 1
+                return
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        results = await self.find(filter, projection, **kwargs).limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: dict, skip: int = 0, limit: int = 0, **kwargs) -> int:
+        count = max(0, len(self._scan(filter)) - skip)
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> list:
+        values = []
+        for doc in self._scan(filter or {}):
+            for value in _candidates(_get(doc, key)):
+                if not isinstance(value, list) and value not in values:
+                    values.append(_copy(value))
+        return values
+
+    # ---- writes ----
+
+    def _insert(self, document: dict):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = _copy(document)
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        self._positions[doc["_id"]] = self._inserted
+        self._inserted += 1
+        self._add_to_indexes(doc)
+
+    def _replace_stored(self, old: dict, new: dict):
+        self._check_unique(new, ignore_id=old["_id"])
+        self._remove_from_indexes(old)
+        self._docs[old["_id"]] = new
+        self._add_to_indexes(new)
+
+    def _update_doc(self, doc: dict, update: dict) -> bool:
+        updated = _copy(doc)
+        if _is_replacement(update):
+            updated = {"_id": doc["_id"], **_copy(update)}
+        else:
+            _apply_update(updated, update)
+        if updated.get("_id") != doc["_id"]:
+            raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", code=66)
+        if updated == doc:
+            return False
+        self._replace_stored(doc, updated)
+        return True
+
+    def _upsert(self, query: dict, update: dict) -> dict:
+        if _is_replacement(update):
+            doc = {**_upsert_seed(query), **_copy(update)}
+        else:
+            doc = _upsert_seed(query)
+            _apply_update(doc, update, inserting=True)
+        self._insert(doc)
+        return self._docs[doc["_id"]]
+
+    def _update(self, filter: dict, update: dict, upsert: bool, many: bool) -> dict:
+        docs = self._scan(filter)
+        if not many:
+            docs = docs[:1]
+        modified = sum(self._update_doc(doc, update) for doc in docs)
+        result = {"n": len(docs), "nModified": modified, "ok": 1.0, "updatedExisting": bool(docs)}
+        if not docs and upsert:
+            result["upserted"] = self._upsert(filter, update)["_id"]
+            result["n"] = 1
+        return result
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        self._insert(document)
+        return InsertOneResult(document["_id"], True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        errors = []
+        inserted = 0
+        for index, document in enumerate(documents):
+            try:
+                self._insert(document)
+                inserted += 1
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": inserted, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert, many=False), True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert, many=True), True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._update(filter, replacement, upsert, many=False), True)
+
+    def _delete(self, filter: dict, many: bool) -> int:
+        docs = self._scan(filter)
+        if not many:
+            docs = docs[:1]
+        for doc in docs:
+            self._remove_from_indexes(doc)
+            del self._docs[doc["_id"]]
+            del self._positions[doc["_id"]]
+        return len(docs)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=False), "ok": 1.0}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=True), "ok": 1.0}, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None, sort=None,
+                                  upsert: bool = False, return_document: bool = False, **kwargs) -> Optional[dict]:
+        docs = self._scan(filter)
+        if sort:
+            docs = _sorted(docs, _sort_spec(sort), 1)
+        if not docs:
+            if not upsert:
+                return None
+            doc = self._upsert(filter, update)
+            return _project(doc, projection) if return_document else None
+        before = _project(docs[0], projection)
+        self._update_doc(docs[0], update)
+        return _project(self._docs[docs[0]["_id"]], projection) if return_document else before
+
+    async def find_one_and_replace(self, filter: dict, replacement: dict, projection: Optional[dict] = None, sort=None,
+                                   upsert: bool = False, return_document: bool = False, **kwargs) -> Optional[dict]:
+        return await self.find_one_and_update(filter, replacement, projection, sort, upsert, return_document)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs) -> Optional[dict]:
+        docs = self._scan(filter)
+        if sort:
+            docs = _sorted(docs, _sort_spec(sort), 1)
+        if not docs:
+            return None
+        self._remove_from_indexes(docs[0])
+        del self._docs[docs[0]["_id"]]
+        del self._positions[docs[0]["_id"]]
+        return _project(docs[0], projection)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        totals = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    totals["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    result = self._update(request._filter, request._doc, bool(request._upsert), many=isinstance(request, UpdateMany))
+                    if "upserted" in result:
+                        totals["nUpserted"] += 1
+                        totals["upserted"].append({"index": index, "_id": result["upserted"]})
+                    else:
+                        totals["nMatched"] += result["n"]
+                        totals["nModified"] += result["nModified"]
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    totals["nRemoved"] += self._delete(request._filter, many=isinstance(request, DeleteMany))
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as e:
+                totals["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if totals["writeErrors"]:
+            raise BulkWriteError(totals)
+        return BulkWriteResult(totals, True)
+
+    # ---- aggregation ----
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCommandCursor:
+        if pipeline and "$indexStats" in pipeline[0]:
+            rows = [{"name": name, "key": dict(self._indexes[name]["key"]), "accesses": {"ops": ops}} for name, ops in self._index_ops.items()]
+            pipeline = pipeline[1:]
+        else:
+            first_match = pipeline[0].get("$match") if pipeline else None
+            rows = [_copy(doc) for doc in self._scan(first_match or {})]
+            if first_match is not None:
+                pipeline = pipeline[1:]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                rows = [row for row in rows if matches(row, spec)]
+            elif name == "$group":
+                rows = _group(rows, spec)
+            elif name == "$unwind":
+                rows = _unwind(rows, spec)
+            elif name == "$sort":
+                rows = _sorted(rows, _sort_spec(spec))
+            elif name == "$skip":
+                rows = rows[spec:]
+            elif name == "$limit":
+                rows = rows[:spec]
+            elif name == "$project":
+                rows = [_project_stage(row, spec) for row in rows]
+            elif name in ("$addFields", "$set"):
+                for row in rows:
+                    for field, expression in spec.items():
+                        _set_path(row, field, _evaluate(row, expression))
+            elif name == "$count":
+                rows = [{spec: len(rows)}] if rows else []
+            else:
+                raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", code=40324)
+        return MemoryCommandCursor(rows)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    async def drop(self):
+        self._docs.clear()
+        self._positions.clear()
+        self._indexes.clear()
+        self._lookup.clear()
+        self._ordered.clear()
+        self._index_ops.clear()
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._docs or collection._indexes]
+
+    async def drop_collection(self, name: str):
+        self._collections.pop(name, None)
+
+    async def command(self, command, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{name}'", code=59)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class MemoryClient:
+    """Stand-in for AsyncIOMotorClient that keeps every database in process.
+
+    Selected with DB_BACKEND=memory. Implements the part of Motor's API the
+    backend uses (CRUD, find-and-modify, bulk writes, the aggregation
+    stages and operators in this codebase, index creation), so the app and
+    every helper that takes `db` run unchanged. Data lives only as long as
+    the process. Change streams and GridFS are not available.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = self["admin"]
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    def close(self):
+        pass
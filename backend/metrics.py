@@ -0,0 +1,225 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pymongo import monitoring
+
+# Request latency histogram buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Time spent outside the handler body rendering the response. FastAPI's own
+# response_model validation runs inside the route and is not broken out.
+PHASES = ("serialize",)
+
+_current: contextvars.ContextVar[Optional["RequestTimings"]] = contextvars.ContextVar("request_timings", default=None)
+
+# Command events arrive on Motor's executor threads
+_lock = threading.Lock()
+
+
+class RequestTimings:
+    """What one request spent on MongoDB and in each response phase."""
+
+    __slots__ = ("db_calls", "db_seconds", "phases")
+
+    def __init__(self):
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_calls} queries"']
+        parts.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items())
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] += time.perf_counter() - start
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Charges every MongoDB round-trip (including getMore) to the request that made it.
+
+    Motor copies the caller's context onto its executor threads, so the
+    listener sees the RequestTimings the middleware set for the request.
+    """
+
+    def _record(self, event):
+        timings = _current.get()
+        if timings is not None:
+            with _lock:
+                timings.db_calls += 1
+                timings.db_seconds += event.duration_micros / 1e6
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "db_calls", "db_seconds", "phases", "response_bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses: Dict[int, int] = {}
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.response_bytes = 0
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Per-route request metrics, rendered in the Prometheus text format."""
+
+    def __init__(self, prefix: str = "his"):
+        self.prefix = prefix
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        self._gauges.append((f"{self.prefix}_{name}", help_text, read))
+
+    def observe(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings, response_bytes: int):
+        stats = self._routes.get((method, route))
+        if stats is None:
+            stats = self._routes[(method, route)] = _RouteStats()
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        stats.buckets[bucket] += 1
+        stats.latency_sum += seconds
+        stats.count += 1
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.db_calls += timings.db_calls
+        stats.db_seconds += timings.db_seconds
+        for name, spent in timings.phases.items():
+            stats.phases[name] += spent
+        stats.response_bytes += response_bytes
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_http_request_duration_seconds Request latency by route.",
+            f"# TYPE {p}_http_request_duration_seconds histogram",
+        ]
+        routes = sorted(self._routes.items())
+        for (method, route), stats in routes:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{p}_http_request_duration_seconds_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+            lines.append(f"{p}_http_request_duration_seconds_sum{_labels(method=method, route=route)} {stats.latency_sum:.6f}")
+            lines.append(f"{p}_http_request_duration_seconds_count{_labels(method=method, route=route)} {stats.count}")
+
+        counters = [
+            ("http_requests_total", "Requests by route and status.",
+             lambda stats: [({"status": status}, count) for status, count in sorted(stats.statuses.items())]),
+            ("http_db_commands_total", "MongoDB round-trips made while serving the route.",
+             lambda stats: [({}, stats.db_calls)]),
+            ("http_db_seconds_total", "Time spent waiting on MongoDB.",
+             lambda stats: [({}, round(stats.db_seconds, 6))]),
+            ("http_phase_seconds_total", "Time spent serializing responses.",
+             lambda stats: [({"phase": name}, round(spent, 6)) for name, spent in stats.phases.items()]),
+            ("http_response_bytes_total", "Response body bytes sent.",
+             lambda stats: [({}, stats.response_bytes)]),
+        ]
+        for name, help_text, samples in counters:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} counter")
+            for (method, route), stats in routes:
+                for extra, value in samples(stats):
+                    lines.append(f"{p}_{name}{_labels(method=method, route=route, **extra)} {value}")
+
+        for name, help_text, read in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times each request and records it per route template.
+
+    Routes are labelled by their path template (/api/patients/{patient_id}),
+    never the raw path, so label cardinality stays bounded. With
+    `server_timing` the DB/serialize breakdown is also sent as a
+    Server-Timing header, which browser dev tools display per request.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry, server_timing: bool = False):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(time.perf_counter() - start).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.registry.observe(scope["method"], getattr(route, "path", "unmatched"), status, time.perf_counter() - start, timings, sent)
+
+
+def _timed_render(cls):
+    class Timed(cls):
+        def render(self, content) -> bytes:
+            with phase("serialize"):
+                return super().render(content)
+    Timed.__name__ = f"Timed{cls.__name__}"
+    return Timed
+
+
+TimedJSONResponse = _timed_render(JSONResponse)
+TimedORJSONResponse = _timed_render(ORJSONResponse)
+
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from scheduling import clinic_datetime, clinic_timezone
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Marks that appointment_at was recomputed from clinic time; earlier builds
+# stored the clinic wall-clock time labelled as UTC
+APPOINTMENT_AT_MARKER = "appointment_at_clinic_time"
+
+# Marks the whole migration done, so startup stops probing every collection for strings
+COMPLETED_MARKER = "native_datetimes"
+
+# collection -> timestamp field written as an ISO string before native storage
+TIMESTAMP_FIELDS = {
+    "users": "created_at",
+    "patients": "created_at",
+    "appointments": "created_at",
+    "encounters": "created_at",
+    "prescriptions": "created_at",
+    "orders": "created_at",
+    "reports": "created_at",
+    "invoices": "created_at",
+    "audit_logs": "timestamp",
+}
+
+def parse_timestamp(value: str):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Older rows (e.g. from create_admin.py) were written without an offset but in UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+async def convert(db, collection: str, query: dict, convert_doc, batch_size: int, log=print) -> int:
+    # Walks _id order so unconvertible rows are skipped instead of re-read forever;
+    # converted rows drop out of the query, so re-running resumes where it stopped
+    converted = 0
+    last_id = None
+    while True:
+        batch_query = {"$and": [query, {"_id": {"$gt": last_id}}]} if last_id is not None else query
+        batch = await db[collection].find(batch_query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return converted
+        last_id = batch[-1]["_id"]
+        writes = []
+        for doc in batch:
+            update = convert_doc(doc)
+            if update:
+                writes.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if writes:
+            await db[collection].bulk_write(writes, ordered=False)
+            converted += len(writes)
+        log(f"  {collection}: {converted} converted")
+
+async def pending(db) -> list:
+    # Conversions that still have rows to touch; keyset pages skip string timestamps until they are done.
+    # No index covers the $type probes, so once the migration is recorded as done they are not run again.
+    if await db.migrations.find_one({"_id": COMPLETED_MARKER}):
+        return []
+    todo = []
+    for collection, field in TIMESTAMP_FIELDS.items():
+        if await db[collection].find_one({field: {"$type": "string"}}, {"_id": 1}):
+            todo.append(f"{collection}.{field}")
+    if not await db.migrations.find_one({"_id": APPOINTMENT_AT_MARKER}) and await db.appointments.find_one({}, {"_id": 1}):
+        todo.append("appointments.appointment_at")
+    return todo
+
+async def migrate(db, batch_size: int, tz, log=print):
+    # Idempotent, so concurrent or interrupted runs are safe to repeat
+    for collection, field in TIMESTAMP_FIELDS.items():
+        def convert_doc(doc, field=field):
+            parsed = parse_timestamp(doc[field])
+            return {field: parsed} if parsed else None
+        total = await convert(db, collection, {field: {"$type": "string"}}, convert_doc, batch_size, log)
+        log(f"{collection}.{field}: {total} documents converted")
+
+    def appointment_at(doc):
+        parsed = clinic_datetime(doc.get('appointment_date'), doc.get('appointment_time'), tz)
+        return {"appointment_at": parsed} if parsed else None
+    recomputed = await db.migrations.find_one({"_id": APPOINTMENT_AT_MARKER})
+    query = {"appointment_at": {"$exists": False}} if recomputed else {}
+    total = await convert(db, "appointments", query, appointment_at, batch_size, log)
+    await db.migrations.update_one({"_id": APPOINTMENT_AT_MARKER}, {"$setOnInsert": {"completed_at": datetime.now(timezone.utc)}}, upsert=True)
+    log(f"appointments.appointment_at: {total} documents filled")
+    await mark_complete(db)
+
+async def mark_complete(db):
+    await db.migrations.update_one({"_id": COMPLETED_MARKER}, {"$setOnInsert": {"completed_at": datetime.now(timezone.utc)}}, upsert=True)
+
+async def migrate_datetimes(batch_size: int):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    await migrate(db, batch_size, clinic_timezone())
+
+    print("Datetime migration complete!")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to native BSON dates")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(migrate_datetimes(args.batch_size))
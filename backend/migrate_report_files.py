@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import base64
+import mimetypes
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from blob_store import CHUNK_SIZE, create_blob_store
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def _chunks(contents: bytes):
+    for offset in range(0, len(contents), CHUNK_SIZE):
+        yield contents[offset:offset + CHUNK_SIZE]
+
+async def migrate_report_files(batch_size: int):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    blob_store = create_blob_store(db, ROOT_DIR)
+
+    # Migrated reports lose file_data, so re-running simply picks up where it stopped
+    query = {"file_data": {"$nin": [None, ""]}}
+    remaining = await db.reports.count_documents(query)
+    print(f"{remaining} reports with inline file data")
+
+    migrated = 0
+    while True:
+        batch = await db.reports.find(query, {"_id": 0, "id": 1, "file_data": 1, "file_name": 1, "content_type": 1}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        for report in batch:
+            contents = base64.b64decode(report["file_data"])
+            filename = report.get("file_name") or report["id"]
+            # Reports uploaded inline never recorded a type; downloads fall back to octet-stream without one
+            content_type = report.get("content_type") or mimetypes.guess_type(filename)[0]
+            blob = await blob_store.put(_chunks(contents), filename, content_type)
+            await db.reports.update_one(
+                {"id": report["id"]},
+                {"$set": {"file_ref": blob.ref, "file_size": blob.size, "content_type": content_type}, "$unset": {"file_data": ""}}
+            )
+            migrated += 1
+        print(f"Migrated {migrated}/{remaining}")
+
+    print("Report file migration complete!")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move inline base64 report files into the blob store")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(migrate_report_files(args.batch_size))
@@ -0,0 +1,355 @@
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+from worklist import DEFAULT_PRIORITY
+
+# API and storage models, shared by the server and the command-line tools
+
+
+class UserRole(BaseModel):
+    ADMIN: str = "ADMIN"
+    DOCTOR: str = "DOCTOR"
+    NURSE: str = "NURSE"
+    RECEPTIONIST: str = "RECEPTIONIST"
+    LAB_TECHNICIAN: str = "LAB_TECHNICIAN"
+    ACCOUNTANT: str = "ACCOUNTANT"
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    email: EmailStr
+    full_name: str
+    role: str
+    employee_id: Optional[str] = None
+    specialization: Optional[str] = None
+    phone: Optional[str] = None
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class UserSummary(BaseModel):
+    id: str
+    email: str
+    full_name: str
+    role: str
+    is_active: bool = True
+    created_at: datetime
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    password: str
+    full_name: str
+    role: str
+    employee_id: Optional[str] = None
+    specialization: Optional[str] = None
+    phone: Optional[str] = None
+
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    specialization: Optional[str] = None
+    phone: Optional[str] = None
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    user: User
+
+class Patient(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    patient_id: str
+    full_name: str
+    date_of_birth: str
+    gender: str
+    phone: str
+    email: Optional[EmailStr] = None
+    address: Optional[str] = None
+    blood_group: Optional[str] = None
+    emergency_contact: Optional[str] = None
+    insurance_info: Optional[str] = None
+    medical_history: Optional[str] = None
+    allergies: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class PatientSummary(BaseModel):
+    id: str
+    patient_id: str
+    full_name: str
+    gender: Optional[str] = None
+    phone: Optional[str] = None
+    created_at: datetime
+
+class PatientCreate(BaseModel):
+    full_name: str
+    date_of_birth: str
+    gender: str
+    phone: str
+    email: Optional[EmailStr] = None
+    address: Optional[str] = None
+    blood_group: Optional[str] = None
+    emergency_contact: Optional[str] = None
+    insurance_info: Optional[str] = None
+    medical_history: Optional[str] = None
+    allergies: Optional[str] = None
+
+class Appointment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    appointment_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: str
+    doctor_name: str
+    appointment_date: str
+    appointment_time: str
+    status: str  # scheduled, completed, cancelled, no-show
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class AppointmentSummary(BaseModel):
+    id: str
+    appointment_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: str
+    doctor_name: str
+    appointment_date: str
+    appointment_time: str
+    status: str
+    created_at: datetime
+
+class AppointmentCreate(BaseModel):
+    patient_id: str
+    doctor_id: str
+    appointment_date: str
+    appointment_time: str
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+
+class Encounter(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    encounter_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: str
+    doctor_name: str
+    appointment_id: Optional[str] = None
+    chief_complaint: str
+    vitals: Optional[dict] = None
+    diagnosis: Optional[str] = None
+    clinical_notes: Optional[str] = None
+    treatment_plan: Optional[str] = None
+    follow_up: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class EncounterSummary(BaseModel):
+    id: str
+    encounter_id: str
+    patient_id: str
+    patient_name: str
+    doctor_name: str
+    chief_complaint: str
+    diagnosis: Optional[str] = None
+    created_at: datetime
+
+class EncounterCreate(BaseModel):
+    patient_id: str
+    appointment_id: Optional[str] = None
+    chief_complaint: str
+    vitals: Optional[dict] = None
+    diagnosis: Optional[str] = None
+    clinical_notes: Optional[str] = None
+    treatment_plan: Optional[str] = None
+    follow_up: Optional[str] = None
+
+class Prescription(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    prescription_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: str
+    doctor_name: str
+    encounter_id: Optional[str] = None
+    medications: List[dict]
+    instructions: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class PrescriptionSummary(BaseModel):
+    id: str
+    prescription_id: str
+    patient_id: str
+    patient_name: str
+    doctor_name: str
+    encounter_id: Optional[str] = None
+    created_at: datetime
+
+class PrescriptionCreate(BaseModel):
+    patient_id: str
+    encounter_id: Optional[str] = None
+    medications: List[dict]
+    instructions: Optional[str] = None
+
+class Order(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    order_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: str
+    doctor_name: str
+    order_type: str  # lab, radiology
+    test_name: str
+    priority: str = DEFAULT_PRIORITY  # stat, urgent, routine
+    status: str  # pending, in_progress, completed, cancelled
+    notes: Optional[str] = None
+    assigned_to: Optional[str] = None
+    assigned_name: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class OrderSummary(BaseModel):
+    id: str
+    order_id: str
+    patient_id: str
+    patient_name: str
+    doctor_name: str
+    order_type: str
+    test_name: str
+    priority: str = DEFAULT_PRIORITY
+    status: str
+    assigned_name: Optional[str] = None
+    created_at: datetime
+
+class OrderCreate(BaseModel):
+    patient_id: str
+    order_type: str
+    test_name: str
+    priority: str = DEFAULT_PRIORITY
+    notes: Optional[str] = None
+
+class Report(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    report_id: str
+    patient_id: str
+    patient_name: str
+    order_id: Optional[str] = None
+    report_type: str
+    test_name: str
+    file_data: Optional[str] = None  # legacy inline base64, moved out by migrate_report_files.py
+    file_name: Optional[str] = None
+    file_ref: Optional[str] = None
+    file_size: Optional[int] = None
+    content_type: Optional[str] = None
+    findings: Optional[str] = None
+    imaging_link: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    uploaded_by: str
+
+class ReportSummary(BaseModel):
+    id: str
+    report_id: str
+    patient_id: str
+    patient_name: str
+    report_type: str
+    test_name: str
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    created_at: datetime
+
+class ReportCreate(BaseModel):
+    patient_id: str
+    order_id: Optional[str] = None
+    report_type: str
+    test_name: str
+    findings: Optional[str] = None
+    imaging_link: Optional[str] = None
+
+class Invoice(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    invoice_id: str
+    patient_id: str
+    patient_name: str
+    doctor_id: Optional[str] = None
+    doctor_name: Optional[str] = None
+    items: List[dict]  # description, amount, optional item_type (consultation, lab, pharmacy, ...)
+    subtotal: float
+    tax: float
+    total: float
+    payment_status: str  # pending, paid, partial
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+class InvoiceSummary(BaseModel):
+    id: str
+    invoice_id: str
+    patient_id: str
+    patient_name: str
+    total: float
+    payment_status: str
+    payment_method: Optional[str] = None
+    created_at: datetime
+
+class InvoiceCreate(BaseModel):
+    patient_id: str
+    doctor_id: Optional[str] = None
+    items: List[dict]
+    tax: float = 0.0
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+
+# Sections of the patient record summary: the list summaries plus the clinical
+# detail the profile page shows, so the summary never ships whole documents
+class AppointmentRecord(AppointmentSummary):
+    reason: Optional[str] = None
+
+class EncounterRecord(EncounterSummary):
+    clinical_notes: Optional[str] = None
+    treatment_plan: Optional[str] = None
+    follow_up: Optional[str] = None
+
+class PrescriptionRecord(PrescriptionSummary):
+    medications: List[dict]
+    instructions: Optional[str] = None
+
+class ReportRecord(ReportSummary):
+    findings: Optional[str] = None
+    imaging_link: Optional[str] = None
+
+class PatientRecordSummary(BaseModel):
+    patient: Patient
+    appointments: List[AppointmentRecord]
+    encounters: List[EncounterRecord]
+    prescriptions: List[PrescriptionRecord]
+    reports: List[ReportRecord]
+    invoices: List[InvoiceSummary]
+
+class AuditLog(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    user_email: str
+    action: str
+    resource_type: str
+    resource_id: str
+    details: Optional[dict] = None
+    ip_address: Optional[str] = None
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# (collection, id field, copied name field) for every place a name is denormalized
+REFERENCES: Dict[str, Tuple[Tuple[str, str, str], ...]] = {
+    "patient": (
+        ("appointments", "patient_id", "patient_name"),
+        ("encounters", "patient_id", "patient_name"),
+        ("prescriptions", "patient_id", "patient_name"),
+        ("orders", "patient_id", "patient_name"),
+        ("reports", "patient_id", "patient_name"),
+        ("invoices", "patient_id", "patient_name"),
+    ),
+    # Users: doctor_name is whoever created the record, assigned_name whoever holds an order
+    "user": (
+        ("appointments", "doctor_id", "doctor_name"),
+        ("encounters", "doctor_id", "doctor_name"),
+        ("prescriptions", "doctor_id", "doctor_name"),
+        ("orders", "doctor_id", "doctor_name"),
+        ("orders", "assigned_to", "assigned_name"),
+        ("invoices", "doctor_id", "doctor_name"),
+    ),
+}
+SOURCES = {"patient": "patients", "user": "users"}
+
+
+class NamePropagator:
+    """Copies renamed patient and user names into every referencing collection.
+
+    `enqueue` records the new name in a `name_propagation` job document
+    keyed by entity, so renaming twice before the job runs leaves one job
+    with the latest name. A background worker claims pending jobs and
+    rewrites references in batches of `batch_size` documents (find the ids,
+    then `update_many` on just those), so no single write holds up the
+    collection. Only documents whose copy differs are touched, which makes
+    a job safe to re-run after a crash; a claimed job whose lease lapses is
+    picked up again.
+
+    Jobs run one at a time per entity: a rename while a job is running only
+    bumps its `version`, and the runner hands the job back as pending when it
+    finishes, so an older name can never be written after a newer one.
+    """
+
+    def __init__(self, db, batch_size: int = 500, lease_seconds: int = 300, poll_interval: float = 30.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.jobs_done = 0
+        self.documents_updated = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def enqueue(self, kind: str, entity_id: str, name: str):
+        job_id = f"{kind}:{entity_id}"
+        now = datetime.now(timezone.utc)
+        latest = {"kind": kind, "entity_id": entity_id, "name": name, "queued_at": now}
+        while True:
+            try:
+                # Idle (or new) jobs go back to pending with the new name
+                await self.db.name_propagation.update_one(
+                    {"_id": job_id, "status": {"$ne": "running"}},
+                    {
+                        "$set": {**latest, "status": "pending", "progress": {}},
+                        "$inc": {"version": 1},
+                        "$unset": {"lease_expires_at": "", "finished_at": "", "owner": ""},
+                    },
+                    upsert=True,
+                )
+                break
+            except DuplicateKeyError:
+                pass
+            # Running elsewhere: leave it running with the new name; its runner requeues it
+            result = await self.db.name_propagation.update_one(
+                {"_id": job_id, "status": "running"},
+                {"$set": latest, "$inc": {"version": 1}},
+            )
+            if result.matched_count:
+                break
+        self._wake.set()
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.db.name_propagation.find_one_and_update(
+            {"$or": [{"status": "pending"}, {"status": "running", "lease_expires_at": {"$lt": now}}]},
+            {"$set": {"status": "running", "lease_expires_at": now + self.lease, "owner": str(uuid.uuid4())}},
+            sort=[("queued_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _rewrite(self, job: dict, collection: str, id_field: str, name_field: str) -> Optional[int]:
+        # None when the lease was lost to another worker, which then owns the job
+        stale = {id_field: job["entity_id"], name_field: {"$ne": job["name"]}}
+        updated = 0
+        while True:
+            ids = [doc["_id"] async for doc in self.db[collection].find(stale, {"_id": 1}).limit(self.batch_size)]
+            if not ids:
+                return updated
+            result = await self.db[collection].update_many({"_id": {"$in": ids}, **stale}, {"$set": {name_field: job["name"]}})
+            updated += result.modified_count
+            renewed = await self.db.name_propagation.update_one(
+                {"_id": job["_id"], "owner": job["owner"]},
+                {
+                    "$inc": {f"progress.{collection}_{name_field}": result.modified_count},
+                    "$set": {"lease_expires_at": datetime.now(timezone.utc) + self.lease},
+                },
+            )
+            if not renewed.matched_count:
+                return None
+
+    async def process(self, job: dict) -> int:
+        updated = 0
+        for collection, id_field, name_field in REFERENCES[job["kind"]]:
+            rewritten = await self._rewrite(job, collection, id_field, name_field)
+            if rewritten is None:
+                logger.warning("Lost the lease on name propagation job %s", job["_id"])
+                return updated
+            updated += rewritten
+        finished = await self.db.name_propagation.update_one(
+            {"_id": job["_id"], "owner": job["owner"], "version": job.get("version")},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}, "$unset": {"lease_expires_at": "", "owner": ""}},
+        )
+        if not finished.matched_count:
+            # Renamed again while running: hand it back so the newer name is written next
+            await self.db.name_propagation.update_one(
+                {"_id": job["_id"], "owner": job["owner"]},
+                {"$set": {"status": "pending", "progress": {}}, "$unset": {"lease_expires_at": "", "owner": ""}},
+            )
+        self.jobs_done += 1
+        self.documents_updated += updated
+        return updated
+
+    async def drain(self) -> int:
+        jobs = 0
+        while (job := await self._claim()) is not None:
+            await self.process(job)
+            jobs += 1
+        return jobs
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.drain()
+            except Exception:
+                # Whatever went wrong, the worker has to survive; the job's lease lapses and it is retried
+                logger.exception("Name propagation failed, will retry")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def reconcile(self, kind: str) -> int:
+        """Queues a job for every entity whose name differs anywhere it is copied.
+
+        For repairing drift from before propagation existed, or from writes
+        that bypassed the API. The distinct (id, name) pairs are streamed and
+        checked against the source names `batch_size` ids at a time.
+        """
+        stale: Dict[str, str] = {}
+        for collection, id_field, name_field in REFERENCES[kind]:
+            pipeline = [{"$group": {"_id": {"id": f"${id_field}", "name": f"${name_field}"}}}]
+            pairs = []
+            async for row in self.db[collection].aggregate(pipeline, allowDiskUse=True):
+                pairs.append(row["_id"])
+                if len(pairs) >= self.batch_size:
+                    await self._find_stale(kind, pairs, stale)
+                    pairs = []
+            if pairs:
+                await self._find_stale(kind, pairs, stale)
+        for entity_id, name in stale.items():
+            await self.enqueue(kind, entity_id, name)
+        return len(stale)
+
+    async def _find_stale(self, kind: str, pairs: List[dict], stale: Dict[str, str]):
+        ids = list({pair["id"] for pair in pairs if pair.get("id") is not None})
+        cursor = self.db[SOURCES[kind]].find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "full_name": 1})
+        names = {doc["id"]: doc["full_name"] async for doc in cursor}
+        for pair in pairs:
+            entity_id = pair.get("id")
+            if entity_id in names and pair.get("name") != names[entity_id]:
+                stale[entity_id] = names[entity_id]
+
+    async def jobs(self, limit: int = 50) -> List[dict]:
+        cursor = self.db.name_propagation.find({}, {"_id": 0}).sort("queued_at", -1).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def stats(self) -> dict:
+        pending = await self.db.name_propagation.count_documents({"status": {"$in": ["pending", "running"]}})
+        return {"pending_jobs": pending, "jobs_done": self.jobs_done, "documents_updated": self.documents_updated}
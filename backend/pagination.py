@@ -0,0 +1,193 @@
+import base64
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+
+from metrics import phase
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class ListParams:
+    """Query parameters shared by every list endpoint.
+
+    `limit`/`after` page through results in keyset order; `stream=true` returns
+    NDJSON straight from the Mongo cursor instead of a buffered JSON list.
+    `fields=a,b` or `summary=true` narrow the Mongo projection for table views.
+    `created_from`/`created_to` filter on the native `created_at` timestamp.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        stream: bool = False,
+        fields: Optional[str] = None,
+        summary: bool = False,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ):
+        self.limit = limit
+        self.after = after
+        self.stream = stream
+        self.fields = fields
+        self.summary = summary
+        self.created_from = created_from
+        self.created_to = created_to
+
+    def created_range(self) -> dict:
+        bounds = {}
+        if self.created_from:
+            bounds["$gte"] = self.created_from
+        if self.created_to:
+            bounds["$lt"] = self.created_to
+        return {"created_at": bounds} if bounds else {}
+
+
+class ListView:
+    def __init__(self, projection: dict, model=None, full: bool = False):
+        self.projection = projection
+        self.model = model
+        self.full = full
+
+
+def select_view(params: ListParams, model, summary_model, sort_field: str, projection: dict) -> ListView:
+    # id and the sort field are always projected so the next cursor can be built
+    if params.fields:
+        requested = {name.strip() for name in params.fields.split(",") if name.strip()}
+        unknown = requested - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        requested |= {"id", sort_field}
+        return ListView({"_id": 0, **{name: 1 for name in requested}})
+    if params.summary:
+        return ListView({"_id": 0, **{name: 1 for name in summary_model.model_fields}}, summary_model)
+    return ListView(projection, model, full=True)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def render_view(view: ListView, docs: list, next_cursor: Optional[str], response: Response, fast: bool = False, headers: Optional[dict] = None):
+    """Builds the list response for a selected view.
+
+    With `fast`, rows are validated once through a cached TypeAdapter and
+    serialized straight to JSON bytes by pydantic-core (or orjson for ad-hoc
+    `fields` projections), bypassing the route's response_model. Otherwise full views return the documents for FastAPI to
+    validate against response_model. Every path renders datetimes the way
+    response_model does, with UTC as `Z`. `headers` go out with the page on every path.
+    """
+    headers = {**(headers or {}), **({NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {})} or None
+    if fast:
+        with phase("serialize"):
+            if view.model is not None:
+                adapter = list_adapter(view.model)
+                body = adapter.dump_json(adapter.validate_python(docs))
+            else:
+                body = orjson.dumps(docs, default=_json_default, option=orjson.OPT_UTC_Z)
+        return Response(body, media_type="application/json", headers=headers)
+    if view.full:
+        if headers:
+            response.headers.update(headers)
+        return docs
+    with phase("serialize"):
+        if view.model is not None:
+            content = [view.model.model_validate(doc).model_dump(mode="json") for doc in docs]
+        else:
+            content = jsonable_encoder(docs, custom_encoder={datetime: _isoformat})
+        return JSONResponse(content, headers=headers)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort_value, doc_id: str) -> str:
+    raw = json.dumps([_encode_value(sort_value), doc_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return _decode_value(sort_value), doc_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_query(query: dict, sort_field: str, after: Optional[str]) -> dict:
+    # Descending keyset on (sort_field, id): rows strictly after the cursor position
+    if not after:
+        return query
+    sort_value, doc_id = decode_cursor(after)
+    position = {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "id": {"$lt": doc_id}},
+        ]
+    }
+    return {"$and": [query, position]} if query else position
+
+
+def find_page(collection, query: dict, projection: dict, sort_field: str, params: ListParams, limit: Optional[int] = None):
+    range_query = params.created_range()
+    if range_query:
+        query = {"$and": [query, range_query]} if query else range_query
+    cursor = collection.find(keyset_query(query, sort_field, params.after), projection)
+    cursor = cursor.sort([(sort_field, -1), ("id", -1)])
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+async def fetch_page(collection, query: dict, projection: dict, sort_field: str, params: ListParams) -> Tuple[list, Optional[str]]:
+    limit = params.limit or DEFAULT_PAGE_SIZE
+    # Fetch one extra row to know whether another page exists
+    docs = await find_page(collection, query, projection, sort_field, params, limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["id"])
+    return docs, next_cursor
+
+
+def _isoformat(value: datetime) -> str:
+    # Same rendering as pydantic's JSON mode, which writes UTC as "Z"
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    return str(value)
+
+
+async def _ndjson_lines(cursor) -> AsyncIterator[bytes]:
+    async for doc in cursor:
+        yield json.dumps(doc, default=_json_default).encode("utf-8") + b"\n"
+
+
+def stream_ndjson(collection, query: dict, projection: dict, sort_field: str, params: ListParams) -> StreamingResponse:
+    cursor = find_page(collection, query, projection, sort_field, params, params.limit)
+    return StreamingResponse(_ndjson_lines(cursor), media_type="application/x-ndjson")
@@ -0,0 +1,38 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """bcrypt hashing on a dedicated thread pool.
+
+    bcrypt releases the GIL while it works, so running it on a small pool keeps
+    the event loop serving other requests during a burst of logins. The pool
+    size also caps how many hashes run at once.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 4):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        # The new hash is only set when the stored one uses outdated cost parameters
+        try:
+            return await self._run(self.context.verify_and_update, password, hashed)
+        except ValueError:
+            # Missing or malformed stored hash
+            return False, None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
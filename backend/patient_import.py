@@ -0,0 +1,160 @@
+import asyncio
+import csv
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from patient_search import search_fields
+from sequences import SEQUENCES, format_id
+
+FORMATS = ("csv", "ndjson")
+
+# Rows validated, numbered and written per insert_many
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict]]]:
+    # Yields (line number, row); rows that cannot be parsed come back as None
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            row.pop(None, None)
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_num, row if isinstance(row, dict) else None
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()]
+
+
+def _parse_created_at(value) -> datetime:
+    # Historical registrations keep their original date; naive values are taken as UTC
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed is None:
+        raise ValueError("created_at: expected an ISO 8601 timestamp")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.errors: List[dict] = []
+
+    def fail(self, row: int, messages: List[str]):
+        self.errors.append({"row": row, "errors": messages})
+
+    def to_dict(self) -> dict:
+        return {"total": self.total, "imported": self.imported, "failed": len(self.errors), "errors": self.errors}
+
+
+class PatientImporter:
+    """Loads patients in chunks from parsed CSV/NDJSON rows.
+
+    Each chunk is validated against `create_model` off the event loop, gets one
+    contiguous block of patient IDs from the sequence allocator and is written
+    with a single unordered `insert_many`. Rows that fail validation or the
+    insert are reported by line number and never stop the import. Parsing the
+    next chunk overlaps with writing the current one.
+    """
+
+    def __init__(self, db, sequences, create_model, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.sequences = sequences
+        self.create_model = create_model
+        self.chunk_size = chunk_size
+
+    def _prepare(self, rows: Iterator[Tuple[int, Optional[dict]]], created_by: str, report: ImportReport, stop: threading.Event):
+        # Runs in a worker thread: parse and validate the next chunk, unless the import was abandoned
+        chunk = []
+        while len(chunk) < self.chunk_size and not stop.is_set():
+            row = next(rows, None)
+            if row is None:
+                break
+            chunk.append(row)
+        if stop.is_set():
+            return [], []
+        now = datetime.now(timezone.utc)
+        prepared = []
+        for line_num, row in chunk:
+            report.total += 1
+            if row is None:
+                report.fail(line_num, ["row: could not be parsed"])
+                continue
+            # CSV has no nulls; blank cells mean "not provided"
+            row = {key: value for key, value in row.items() if value not in ("", None)}
+            try:
+                patient = self.create_model.model_validate(row)
+                created_at = _parse_created_at(row["created_at"]) if "created_at" in row else now
+            except ValidationError as e:
+                report.fail(line_num, _error_messages(e))
+                continue
+            except ValueError as e:
+                report.fail(line_num, [str(e)])
+                continue
+            doc = {"id": str(uuid.uuid4()), "patient_id": None, **patient.model_dump(), "created_at": created_at, "created_by": created_by}
+            doc.update(search_fields(patient.full_name, patient.phone))
+            prepared.append((line_num, doc))
+        return chunk, prepared
+
+    async def _write(self, prepared: List[Tuple[int, dict]], report: ImportReport):
+        prefix = SEQUENCES["patient"][0]
+        numbers = await self.sequences.reserve_block("patient", len(prepared))
+        docs = []
+        for (_, doc), number in zip(prepared, numbers):
+            doc["patient_id"] = format_id(prefix, number)
+            docs.append(doc)
+        try:
+            await self.db.patients.insert_many(docs, ordered=False)
+            report.imported += len(docs)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "write failed") for error in e.details.get("writeErrors", [])}
+            report.imported += len(docs) - len(failed)
+            for index, message in sorted(failed.items()):
+                report.fail(prepared[index][0], [message])
+
+    async def run(self, rows: Iterator[Tuple[int, Optional[dict]]], created_by: str) -> ImportReport:
+        report = ImportReport()
+        stop = threading.Event()
+        next_chunk = asyncio.ensure_future(asyncio.to_thread(self._prepare, rows, created_by, report, stop))
+        try:
+            while True:
+                # Shielded so a cancelled import still waits out the chunk being read below
+                chunk, prepared = await asyncio.shield(next_chunk)
+                if not chunk:
+                    break
+                next_chunk = asyncio.ensure_future(asyncio.to_thread(self._prepare, rows, created_by, report, stop))
+                if prepared:
+                    await self._write(prepared, report)
+        except BaseException:
+            # Callers close the upload stream once this returns, so the reader thread must be done with it
+            stop.set()
+            await asyncio.wait([next_chunk])
+            raise
+        report.errors.sort(key=lambda error: error["row"])
+        return report
@@ -0,0 +1,218 @@
+import asyncio
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from pagination import DEFAULT_PAGE_SIZE, ListParams, decode_cursor, encode_cursor
+
+# Denormalized lookup keys stored on every patient document and indexed in indexes.py
+SEARCH_FIELDS = ("name_tokens", "name_phonetic", "phone_keys")
+
+# Each clause fetches the hits needed up to the end of the requested page, plus this many
+# more so older but better-scoring matches can still rank onto it
+CANDIDATE_SLACK = 100
+
+# No clause reads further than this; deeper matches are not reachable and the response says so
+MAX_SEARCH_DEPTH = 2000
+
+# Sent as "true" when a clause had matches past MAX_SEARCH_DEPTH
+TRUNCATED_HEADER = "X-Search-Truncated"
+
+# Only inputs shaped like a patient number search patient_id; "p" or "pat" alone would match everyone
+_PATIENT_ID = re.compile(r"^PAT\d+$")
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def normalize_tokens(text: Optional[str]) -> List[str]:
+    # Lowercase, strip accents and split on anything that is not a letter or digit
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return [token for token in re.split(r"[^0-9a-z]+", stripped) if token]
+
+
+def soundex(token: str) -> str:
+    letters = [ch for ch in token.lower() if ch.isalpha()]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+        if ch not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def query_phonetic(term: str) -> Optional[str]:
+    # Very short prefixes collapse to codes like "S000" that match half the registry
+    if len(term) >= 3 and term.isalpha():
+        return soundex(term)
+    return None
+
+
+def phone_keys(phone: Optional[str]) -> List[str]:
+    # Full digit string plus the 10-digit national number, so "98765..." matches "+91 98765..."
+    digits = re.sub(r"\D", "", phone or "")
+    if not digits:
+        return []
+    keys = [digits]
+    if len(digits) > 10:
+        keys.append(digits[-10:])
+    return keys
+
+
+def search_fields(full_name: Optional[str], phone: Optional[str]) -> dict:
+    tokens = normalize_tokens(full_name)
+    return {
+        "name_tokens": tokens,
+        "name_phonetic": sorted({soundex(token) for token in tokens if soundex(token)}),
+        "phone_keys": phone_keys(phone),
+    }
+
+
+def build_clauses(search: str) -> List[dict]:
+    """Index-backed clauses for a search, most specific first.
+
+    Each is an equality or anchored-prefix match on one indexed key, so each
+    can be served from its index and capped on its own; a broad clause (a
+    common name prefix) cannot crowd out an exact hit from a narrow one.
+    """
+    search = search.strip()
+    clauses = []
+
+    upper = search.upper().replace(" ", "")
+    if _PATIENT_ID.match(upper):
+        # A patient number is never also a phone number or a name
+        return [{"patient_id": upper}, {"patient_id": {"$regex": "^" + re.escape(upper)}}]
+
+    digits = re.sub(r"\D", "", search)
+    if len(digits) >= 3:
+        clauses.append({"phone_keys": digits})
+        clauses.append({"phone_keys": {"$regex": "^" + digits}})
+
+    terms = [term for term in normalize_tokens(search) if not term.isdigit()]
+    if terms:
+        clauses.append(_all_terms([{"name_tokens": term} for term in terms]))
+        clauses.append(_all_terms([{"name_tokens": {"$regex": "^" + re.escape(term)}} for term in terms]))
+        if any(query_phonetic(term) for term in terms):
+            per_term = []
+            for term in terms:
+                options = [{"name_tokens": {"$regex": "^" + re.escape(term)}}]
+                if query_phonetic(term):
+                    options.append({"name_phonetic": query_phonetic(term)})
+                per_term.append({"$or": options} if len(options) > 1 else options[0])
+            clauses.append(_all_terms(per_term))
+
+    return clauses
+
+
+def _all_terms(conditions: List[dict]) -> dict:
+    return {"$and": conditions} if len(conditions) > 1 else conditions[0]
+
+
+def score(doc: dict, search: str) -> int:
+    search = search.strip()
+    patient_id = doc.get("patient_id", "")
+    upper = search.upper().replace(" ", "")
+    total = 0
+    if _PATIENT_ID.match(upper):
+        if patient_id == upper:
+            total += 100
+        elif patient_id.startswith(upper):
+            total += 80
+
+    digits = re.sub(r"\D", "", search)
+    if len(digits) >= 3 and any(key.startswith(digits) for key in doc.get("phone_keys", [])):
+        total += 60
+
+    tokens = doc.get("name_tokens", [])
+    phonetic = set(doc.get("name_phonetic", []))
+    for term in normalize_tokens(search):
+        if term in tokens:
+            total += 10
+        elif any(token.startswith(term) for token in tokens):
+            total += 6
+        elif query_phonetic(term) in phonetic:
+            total += 3
+    return total
+
+
+def _search_projection(projection: dict) -> Tuple[dict, set]:
+    # Ranking needs the search keys; returns the projection to query with and the keys to strip
+    if any(value == 1 for value in projection.values()):
+        needed = set(SEARCH_FIELDS) | {"patient_id", "created_at", "id"}
+        added = {name for name in needed if name not in projection}
+        return {**projection, **{name: 1 for name in added}}, added
+    trimmed = {name: value for name, value in projection.items() if name not in SEARCH_FIELDS}
+    return trimmed, set(SEARCH_FIELDS)
+
+
+async def search(collection, search: str, projection: dict, params: ListParams) -> Tuple[list, Optional[str], bool]:
+    """Ranked patient search.
+
+    Every clause from `build_clauses` runs separately, newest first, and
+    reads as many hits as the requested page reaches plus CANDIDATE_SLACK,
+    up to MAX_SEARCH_DEPTH; the union is ranked by `score` and paged by
+    offset, so later pages read deeper. Returns the page, the next cursor
+    and whether a clause stopped at MAX_SEARCH_DEPTH with matches left
+    unread.
+    """
+    query_projection, strip = _search_projection(projection)
+    # Ranked results page by offset; the cursor stays opaque to clients
+    offset = decode_cursor(params.after)[0] if params.after else 0
+    if not isinstance(offset, int) or offset < 0:
+        offset = 0
+    limit = params.limit or DEFAULT_PAGE_SIZE
+    # One past the depth tells a clause that stopped there from one that ran out
+    depth = min(offset + limit + CANDIDATE_SLACK, MAX_SEARCH_DEPTH + 1)
+
+    clauses = build_clauses(search)
+    batches = await asyncio.gather(*(
+        collection.find(clause, query_projection).sort("created_at", -1).limit(depth).to_list(depth)
+        for clause in clauses
+    ))
+    truncated = any(len(batch) > MAX_SEARCH_DEPTH for batch in batches)
+    candidates = {}
+    for batch in batches:
+        for doc in batch[:MAX_SEARCH_DEPTH]:
+            candidates.setdefault(doc["id"], doc)
+    ranked = list(candidates.values())
+
+    ranked.sort(key=lambda doc: (score(doc, search), str(doc.get("created_at", "")), doc["id"]), reverse=True)
+
+    page = ranked[offset:offset + limit]
+    next_cursor = encode_cursor(offset + limit, "") if len(ranked) > offset + limit else None
+
+    for doc in page:
+        for name in strip:
+            doc.pop(name, None)
+    return page, next_cursor, truncated
+
+
+async def backfill_search_fields(db, batch_size: int = 1000) -> int:
+    # Patients created before search keys existed; safe to re-run
+    updated = 0
+    query = {"name_tokens": {"$exists": False}}
+    while True:
+        batch = await db.patients.find(query, {"_id": 0, "id": 1, "full_name": 1, "phone": 1}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return updated
+        await db.patients.bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": search_fields(doc.get("full_name"), doc.get("phone"))})
+            for doc in batch
+        ], ordered=False)
+        updated += len(batch)
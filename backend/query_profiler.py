@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COLLECTION = "query_profile"
+
+# Commands worth profiling; each can be re-run under explain
+PROFILED_COMMANDS = ("find", "aggregate", "count", "distinct", "update", "delete", "findAndModify")
+
+# Session/transport fields that explain rejects or that would pin it to a stale session
+_TRANSPORT_FIELDS = {"lsid", "$db", "$clusterTime", "txnNumber", "$readPreference", "writeConcern", "startTransaction", "autocommit"}
+
+# Parts of each command that decide the plan; values are replaced by "?" so shapes carry no patient data
+_SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection", "limit", "skip"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+    "findAndModify": ("query", "sort", "update"),
+}
+
+SORT_FIELDS = ("total_ms", "max_ms", "count", "last_seen")
+
+
+def shape_of(value, key: Optional[str] = None):
+    if isinstance(value, dict):
+        if key in ("$sort", "$project"):
+            return value
+        return {k: shape_of(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists of any length share a shape; pipelines and statement lists keep their structure
+        if key in ("$in", "$nin", "$all"):
+            return ["?"]
+        return [shape_of(item) for item in value]
+    if isinstance(value, str) and value.startswith("$"):
+        # Field paths in pipelines are structure, not data
+        return value
+    return "?"
+
+
+def command_shape(name: str, command: dict) -> dict:
+    shape = {name: command[name]}
+    for field in _SHAPE_FIELDS[name]:
+        if field in command:
+            shape[field] = command[field] if field in ("sort", "projection", "key") else shape_of(command[field], field)
+    if name in ("update", "delete"):
+        # One shape per statement list; batches of the same statement collapse to one
+        shape[_SHAPE_FIELDS[name][0]] = shape[_SHAPE_FIELDS[name][0]][:1]
+    return shape
+
+
+def explainable(name: str, command: dict) -> dict:
+    command = {k: v for k, v in command.items() if k not in _TRANSPORT_FIELDS}
+    if name in ("update", "delete"):
+        # explain takes a single write statement
+        field = _SHAPE_FIELDS[name][0]
+        command[field] = command[field][:1]
+    return command
+
+
+def _find(doc, key):
+    if isinstance(doc, dict):
+        if key in doc:
+            return doc[key]
+        children = doc.values()
+    elif isinstance(doc, list):
+        children = doc
+    else:
+        return None
+    for child in children:
+        found = _find(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _stages(plan: dict, stages: List[str], indexes: List[str]):
+    plan = plan.get("queryPlan", plan)
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    if "indexName" in plan:
+        indexes.append(plan["indexName"])
+    for child in [plan.get("inputStage")] + list(plan.get("inputStages", [])):
+        if child:
+            _stages(child, stages, indexes)
+
+
+def summarize_plan(explain: dict) -> dict:
+    """The winning plan's stages and how much work it did, from explain(executionStats)."""
+    stages, indexes = [], []
+    winning = _find(explain, "winningPlan")
+    if winning:
+        _stages(winning, stages, indexes)
+    stats = _find(explain, "executionStats") or {}
+    return {
+        "stages": " > ".join(stages),
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "explain_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """Records MongoDB commands slower than `threshold_ms`, grouped by query shape.
+
+    Registered as a pymongo command listener, so it sees every find, count,
+    aggregate and write the driver sends. A slow command's shape (the
+    command with every literal replaced by "?") keys an aggregate of count,
+    total and max time. The first time a shape is seen, and again after
+    `explain_interval` seconds, the original command is re-run under
+    explain(executionStats) in the background to capture its winning plan.
+    Aggregates are merged into the `query_profile` collection every
+    `flush_interval` seconds, so the report covers every worker.
+    """
+
+    def __init__(self, threshold_ms: float = 100, explain_interval: float = 300, flush_interval: float = 30, max_explain_queue: int = 100):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.flush_interval = flush_interval
+        self.db = None
+        self._lock = threading.Lock()
+        self._started: Dict[int, tuple] = {}
+        self._pending: Dict[str, dict] = {}
+        self._explained: Dict[str, float] = {}
+        self._explain_queue: asyncio.Queue = asyncio.Queue(maxsize=max_explain_queue)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self.slow_commands = 0
+        self.explains = 0
+        self.explain_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.db is not None
+
+    def start(self, db):
+        if self._tasks:
+            return
+        self.db = db
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._explain_loop())]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.db is not None:
+            await self.flush()
+
+    # ---- listener callbacks (driver threads) ----
+
+    def started(self, event):
+        if self.db is None or event.command_name not in PROFILED_COMMANDS or event.database_name != self.db.name:
+            return
+        command = event.command
+        if command.get(event.command_name) == PROFILE_COLLECTION:
+            return
+        self._started[event.request_id] = (event.command_name, command)
+
+    def succeeded(self, event):
+        started = self._started.pop(event.request_id, None)
+        if started is not None and event.duration_micros >= self.threshold_ms * 1000:
+            self._record(started[0], started[1], event.duration_micros / 1000)
+
+    def failed(self, event):
+        self._started.pop(event.request_id, None)
+
+    def _record(self, name: str, command: dict, duration_ms: float):
+        try:
+            shape = json.dumps(command_shape(name, command), default=str)
+        except (KeyError, TypeError):
+            return
+        key = hashlib.sha1(shape.encode()).hexdigest()[:16]
+        now = time.monotonic()
+        with self._lock:
+            self.slow_commands += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = {"command": name, "collection": command[name], "shape": shape, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            explain = now - self._explained.get(key, -self.explain_interval) >= self.explain_interval
+            if explain:
+                self._explained[key] = now
+        if explain and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue_explain, key, name, command)
+
+    # ---- background work (event loop) ----
+
+    def _queue_explain(self, key: str, name: str, command: dict):
+        try:
+            self._explain_queue.put_nowait((key, name, command))
+        except asyncio.QueueFull:
+            self._explained.pop(key, None)
+
+    async def _explain_loop(self):
+        while True:
+            key, name, command = await self._explain_queue.get()
+            # Anything failing here (the explain, an odd plan, the write) costs one plan, never the loop
+            try:
+                await self._explain(key, name, command)
+            except PyMongoError as e:
+                self.explain_failures += 1
+                logger.warning("Could not explain slow %s on %s: %s", name, command.get(name), e)
+            except Exception:
+                self.explain_failures += 1
+                logger.exception("Could not explain slow %s on %s", name, command.get(name))
+
+    async def _explain(self, key: str, name: str, command: dict):
+        result = await self.db.command({"explain": explainable(name, command), "verbosity": "executionStats"})
+        await self.db[PROFILE_COLLECTION].update_one(
+            {"_id": key},
+            {"$set": {"plan": summarize_plan(result), "explained_at": datetime.now(timezone.utc)}, "$setOnInsert": {"first_seen": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self.explains += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except PyMongoError as e:
+                logger.error("Could not save query profile: %s", e)
+
+    async def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        now = datetime.now(timezone.utc)
+        for key, entry in pending.items():
+            await self.db[PROFILE_COLLECTION].update_one(
+                {"_id": key},
+                {
+                    "$set": {"command": entry["command"], "collection": entry["collection"], "shape": entry["shape"], "last_seen": now},
+                    "$setOnInsert": {"first_seen": now},
+                    "$inc": {"count": entry["count"], "total_ms": entry["total_ms"]},
+                    "$max": {"max_ms": entry["max_ms"]},
+                },
+                upsert=True,
+            )
+
+    async def report(self, sort: str = "total_ms", limit: int = 50) -> List[dict]:
+        await self.flush()
+        return await slow_query_report(self.db, sort, limit)
+
+    async def reset(self) -> int:
+        with self._lock:
+            self._pending.clear()
+            self._explained.clear()
+        result = await self.db[PROFILE_COLLECTION].delete_many({})
+        return result.deleted_count
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "slow_commands": self.slow_commands,
+            "explains": self.explains,
+            "explain_failures": self.explain_failures,
+        }
+
+
+async def slow_query_report(db, sort: str = "total_ms", limit: int = 50) -> List[dict]:
+    rows = await db[PROFILE_COLLECTION].find({"count": {"$gt": 0}}).sort(sort, -1).limit(limit).to_list(limit)
+    for row in rows:
+        row["shape_id"] = row.pop("_id")
+        row["shape"] = json.loads(row["shape"])
+        row["avg_ms"] = round(row["total_ms"] / row["count"], 2)
+    return rows
@@ -0,0 +1,189 @@
+from datetime import date, datetime, timezone, tzinfo
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+# Dimensions kept per day in `revenue_daily`; time groupings are derived from the day key
+DIMENSIONS = {
+    "payment_method": "by_payment_method",
+    "payment_status": "by_payment_status",
+    "doctor": "by_doctor",
+    "item_type": "by_item_type",
+}
+GROUPINGS = ("day", "week", "month") + tuple(DIMENSIONS)
+
+UNSPECIFIED = "unspecified"
+
+# Marker document; sorts after every YYYY-MM-DD key so range reads never see it
+SEEDED = "_seeded"
+
+
+def _key(value) -> str:
+    # Values become field names in the rollup document
+    text = str(value).strip() if value not in (None, "") else UNSPECIFIED
+    return text.replace(".", "_").replace("$", "_")
+
+
+def _item_type(item: dict) -> str:
+    return _key(item.get("item_type") or "other")
+
+
+def _timestamp(value) -> Optional[datetime]:
+    # Invoices written before native timestamps hold ISO strings; naive values are UTC
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _period(day: str, group_by: str) -> str:
+    if group_by == "week":
+        year, week, _ = date.fromisoformat(day).isocalendar()
+        return f"{year}-W{week:02d}"
+    if group_by == "month":
+        return day[:7]
+    return day
+
+
+def default_range(start: Optional[date], end: Optional[date], today: date):
+    # Month to date unless told otherwise
+    end = end or today
+    start = start or end.replace(day=1)
+    return start, end
+
+
+def _apply(entry: dict, inc: dict):
+    # Applies an $inc document from _increments to an in-memory day document
+    for path, amount in inc.items():
+        *parents, name = path.split(".")
+        target = entry
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = target.get(name, 0) + amount
+
+
+class RevenueRollups:
+    """Daily revenue totals kept in the `revenue_daily` collection.
+
+    `record` folds each new invoice into its day's document with one `$inc`
+    upsert, so a report over a date range reads one small document per day
+    no matter how many invoices there are. Days are calendar days in the
+    clinic's time zone. `rebuild` recomputes the rollups from the invoices
+    with aggregation pipelines.
+    """
+
+    def __init__(self, db, tz: tzinfo = timezone.utc):
+        self.db = db
+        self.tz = tz
+
+    def _day(self, value) -> Optional[str]:
+        timestamp = _timestamp(value)
+        return timestamp.astimezone(self.tz).date().isoformat() if timestamp else None
+
+    @staticmethod
+    def _increments(invoice: dict) -> dict:
+        total = invoice.get("total", 0)
+        inc = {
+            "invoices": 1,
+            "subtotal": invoice.get("subtotal", 0),
+            "tax": invoice.get("tax", 0),
+            "total": total,
+        }
+        for dimension, value in (
+            ("by_payment_method", invoice.get("payment_method")),
+            ("by_payment_status", invoice.get("payment_status")),
+            ("by_doctor", invoice.get("doctor_id")),
+        ):
+            inc[f"{dimension}.{_key(value)}.invoices"] = 1
+            inc[f"{dimension}.{_key(value)}.total"] = total
+        for item in invoice.get("items", []):
+            prefix = f"by_item_type.{_item_type(item)}"
+            inc[f"{prefix}.items"] = inc.get(f"{prefix}.items", 0) + 1
+            inc[f"{prefix}.total"] = inc.get(f"{prefix}.total", 0) + (item.get("amount") or 0)
+        return inc
+
+    async def record(self, invoice: dict):
+        await self.db.revenue_daily.update_one({"_id": self._day(invoice["created_at"])}, {"$inc": self._increments(invoice)}, upsert=True)
+
+    async def _grouped(self, key, unwind: bool = False) -> List[dict]:
+        # $dateToString fails on strings, so legacy string timestamps are folded separately
+        day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": str(self.tz)}}
+        pipeline = [{"$match": {"created_at": {"$type": "date"}}}]
+        if unwind:
+            pipeline.append({"$unwind": "$items"})
+        amount = "$items.amount" if unwind else "$total"
+        group = {"_id": {"day": day, "key": key}, "count": {"$sum": 1}, "total": {"$sum": {"$ifNull": [amount, 0]}}}
+        if key is None:
+            group.update(subtotal={"$sum": "$subtotal"}, tax={"$sum": "$tax"})
+        pipeline.append({"$group": group})
+        return await self.db.invoices.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    async def rebuild(self) -> int:
+        """Full recompute; only needed on first start or to repair drift.
+
+        Each day is replaced in place and only days with no invoices left are
+        removed, so reports never see an empty or half-written collection and
+        concurrent rebuilds write the same documents. Invoices recorded while
+        a rebuild runs can still be overwritten by it; rerun to repair.
+        """
+        days: Dict[str, dict] = {}
+
+        def doc(day: str) -> dict:
+            return days.setdefault(day, {"_id": day, "invoices": 0, "subtotal": 0, "tax": 0, "total": 0, **{name: {} for name in DIMENSIONS.values()}})
+
+        for row in await self._grouped(None):
+            entry = doc(row["_id"]["day"])
+            entry.update(invoices=row["count"], subtotal=row["subtotal"], tax=row["tax"], total=row["total"])
+        for dimension, field in (("by_payment_method", "$payment_method"), ("by_payment_status", "$payment_status"), ("by_doctor", "$doctor_id")):
+            for row in await self._grouped(field):
+                doc(row["_id"]["day"])[dimension][_key(row["_id"]["key"])] = {"invoices": row["count"], "total": row["total"]}
+        for row in await self._grouped("$items.item_type", unwind=True):
+            bucket = doc(row["_id"]["day"])["by_item_type"].setdefault(_key(row["_id"]["key"] or "other"), {"items": 0, "total": 0})
+            bucket["items"] += row["count"]
+            bucket["total"] += row["total"]
+        async for invoice in self.db.invoices.find({"created_at": {"$type": "string"}}, {"_id": 0}):
+            day = self._day(invoice["created_at"])
+            if day:
+                _apply(doc(day), self._increments(invoice))
+
+        if days:
+            await self.db.revenue_daily.bulk_write([ReplaceOne({"_id": day}, entry, upsert=True) for day, entry in days.items()], ordered=False)
+        await self.db.revenue_daily.delete_many({"_id": {"$nin": [*days, SEEDED]}})
+        await self.db.revenue_daily.update_one({"_id": SEEDED}, {"$set": {"rebuilt_at": datetime.now(timezone.utc)}}, upsert=True)
+        return len(days)
+
+    async def seed_if_missing(self):
+        if not await self.db.revenue_daily.find_one({"_id": SEEDED}):
+            await self.rebuild()
+
+    async def report(self, start: date, end: date, group_by: str) -> dict:
+        # start and end are inclusive days
+        rows: Dict[str, dict] = {}
+        totals = {"invoices": 0, "subtotal": 0.0, "tax": 0.0, "total": 0.0}
+        cursor = self.db.revenue_daily.find({"_id": {"$gte": start.isoformat(), "$lte": end.isoformat()}}).sort("_id", 1)
+        async for day in cursor:
+            for name in totals:
+                totals[name] += day.get(name, 0)
+            if group_by in DIMENSIONS:
+                for key, values in day.get(DIMENSIONS[group_by], {}).items():
+                    row = rows.setdefault(key, {"key": key})
+                    for name, value in values.items():
+                        row[name] = row.get(name, 0) + value
+            else:
+                row = rows.setdefault(_period(day["_id"], group_by), {"key": _period(day["_id"], group_by), "invoices": 0, "subtotal": 0, "tax": 0, "total": 0})
+                for name in ("invoices", "subtotal", "tax", "total"):
+                    row[name] += day.get(name, 0)
+
+        ordered = list(rows.values())
+        if group_by in DIMENSIONS:
+            ordered.sort(key=lambda row: row.get("total", 0), reverse=True)
+        for row in ordered + [totals]:
+            for name in ("subtotal", "tax", "total"):
+                if name in row:
+                    row[name] = round(row[name], 2)
+        return {"group_by": group_by, "from": start.isoformat(), "to": end.isoformat(), "totals": totals, "rows": ordered}
+
@@ -0,0 +1,190 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from pymongo.errors import DuplicateKeyError
+
+# Appointment states that hold a slot; anything else (cancelled, no-show) frees it
+ACTIVE_STATUSES = ("scheduled", "completed")
+
+
+def clinic_timezone() -> tzinfo:
+    # Appointment dates and times are entered as clinic wall-clock time
+    return ZoneInfo(os.environ.get('CLINIC_TIMEZONE', 'Asia/Kolkata'))
+
+
+def clinic_datetime(appointment_date: str, appointment_time: str, tz: tzinfo) -> Optional[datetime]:
+    # UTC instant of a clinic wall-clock date and time, or None if either is malformed
+    try:
+        local = datetime.fromisoformat(f"{appointment_date}T{appointment_time}")
+    except ValueError:
+        return None
+    if local.tzinfo is None:
+        local = local.replace(tzinfo=tz)
+    return local.astimezone(timezone.utc)
+
+
+def _minutes(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    hours, minutes = int(hours), int(minutes or 0)
+    # "10:75" would otherwise land in a later slot
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time: {value}")
+    return hours * 60 + minutes
+
+
+class SlotCalendar:
+    """Per-doctor day calendars stored as slot bitmaps.
+
+    The source of truth is one `doctor_calendars` document per doctor and day
+    holding the booked slot indexes. `book` adds a slot with a conditional
+    upsert, so two concurrent bookings of the same slot cannot both succeed,
+    even across workers. Each process keeps the calendars it has read as
+    integers (bit i = slot i booked) for `ttl` seconds to answer availability
+    queries without a round-trip per day. Days are dates in `tz`, the clinic
+    time zone.
+    """
+
+    def __init__(self, db, day_start: str = "08:00", day_end: str = "20:00", slot_minutes: int = 15, ttl: float = 10.0, tz: tzinfo = timezone.utc):
+        self.db = db
+        self.tz = tz
+        self.day_start = _minutes(day_start)
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = (_minutes(day_end) - self.day_start) // slot_minutes
+        self.full_mask = (1 << self.slots_per_day) - 1
+        self.ttl = ttl
+        self._bitmaps: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+    # ---- slot arithmetic ----
+
+    def slot_index(self, appointment_time: str) -> int:
+        try:
+            offset = _minutes(appointment_time) - self.day_start
+        except ValueError:
+            raise ValueError(f"Invalid appointment time: {appointment_time}")
+        # Times between slot boundaries occupy the slot they fall in
+        if offset < 0 or offset // self.slot_minutes >= self.slots_per_day:
+            raise ValueError(f"{appointment_time} is outside clinic hours")
+        return offset // self.slot_minutes
+
+    def slot_time(self, index: int) -> str:
+        minutes = self.day_start + index * self.slot_minutes
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    @staticmethod
+    def _key(doctor_id: str, day: str) -> str:
+        return f"{doctor_id}:{day}"
+
+    # ---- bitmap cache ----
+
+    def _remember(self, doctor_id: str, day: str, bitmap: int):
+        self._bitmaps[(doctor_id, day)] = (time.monotonic() + self.ttl, bitmap)
+
+    async def load(self, doctor_ids: Iterable[str], days: Iterable[str]) -> Dict[Tuple[str, str], int]:
+        now = time.monotonic()
+        wanted = [(doctor_id, day) for doctor_id in doctor_ids for day in days]
+        result, missing = {}, []
+        for pair in wanted:
+            cached = self._bitmaps.get(pair)
+            if cached and cached[0] > now:
+                result[pair] = cached[1]
+            else:
+                missing.append(pair)
+        if missing:
+            for pair in missing:
+                result[pair] = 0
+            keys = [self._key(*pair) for pair in missing]
+            async for doc in self.db.doctor_calendars.find({"_id": {"$in": keys}}):
+                bitmap = 0
+                for index in doc.get("slots", []):
+                    bitmap |= 1 << index
+                result[(doc["doctor_id"], doc["date"])] = bitmap
+            for pair in missing:
+                self._remember(*pair, result[pair])
+        return result
+
+    def invalidate(self, doctor_id: Optional[str] = None):
+        if doctor_id is None:
+            self._bitmaps.clear()
+        else:
+            for pair in [pair for pair in self._bitmaps if pair[0] == doctor_id]:
+                del self._bitmaps[pair]
+
+    # ---- booking ----
+
+    async def book(self, doctor_id: str, day: str, index: int) -> bool:
+        query = {"_id": self._key(doctor_id, day), "slots": {"$ne": index}}
+        update = {"$addToSet": {"slots": index}, "$setOnInsert": {"doctor_id": doctor_id, "date": day}}
+        try:
+            await self.db.doctor_calendars.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Either the slot is taken or another request created the calendar first
+            result = await self.db.doctor_calendars.update_one(query, update)
+            if result.matched_count == 0:
+                self._bitmaps.pop((doctor_id, day), None)
+                return False
+        cached = self._bitmaps.get((doctor_id, day))
+        if cached:
+            self._remember(doctor_id, day, cached[1] | (1 << index))
+        return True
+
+    async def release(self, doctor_id: str, day: str, index: int):
+        await self.db.doctor_calendars.update_one({"_id": self._key(doctor_id, day)}, {"$pull": {"slots": index}})
+        cached = self._bitmaps.get((doctor_id, day))
+        if cached:
+            self._remember(doctor_id, day, cached[1] & ~(1 << index))
+
+    # ---- availability ----
+
+    def _free_slots(self, bitmap: int, first_index: int = 0) -> Iterable[int]:
+        free = ~bitmap & self.full_mask & ~((1 << first_index) - 1)
+        while free:
+            lowest = free & -free
+            yield lowest.bit_length() - 1
+            free ^= lowest
+
+    async def next_free(self, doctor_ids: List[str], start: datetime, count: int = 5, horizon_days: int = 14) -> List[dict]:
+        if not doctor_ids:
+            return []
+        days = [(start.date() + timedelta(days=offset)).isoformat() for offset in range(horizon_days)]
+        bitmaps = await self.load(doctor_ids, days)
+
+        # Skip slots that already started today
+        elapsed = start.hour * 60 + start.minute - self.day_start
+        first_today = max(0, -(-elapsed // self.slot_minutes))
+
+        slots = []
+        for day in days:
+            first_index = first_today if day == days[0] else 0
+            day_slots = []
+            for doctor_id in doctor_ids:
+                # A single doctor never contributes more than `count` slots
+                free = self._free_slots(bitmaps[(doctor_id, day)], first_index)
+                day_slots.extend((index, doctor_id) for index in islice(free, count))
+            for index, doctor_id in sorted(day_slots)[:count - len(slots)]:
+                slots.append({"doctor_id": doctor_id, "appointment_date": day, "appointment_time": self.slot_time(index)})
+            if len(slots) >= count:
+                break
+        return slots
+
+    async def rebuild(self, from_day: Optional[str] = None, batch_size: int = 1000) -> int:
+        # Replays existing appointments into the calendars; $addToSet keeps it idempotent
+        from_day = from_day or datetime.now(self.tz).date().isoformat()
+        query = {"appointment_date": {"$gte": from_day}, "status": {"$in": list(ACTIVE_STATUSES)}}
+        booked = 0
+        async for appointment in self.db.appointments.find(query, {"_id": 0, "doctor_id": 1, "appointment_date": 1, "appointment_time": 1}).batch_size(batch_size):
+            try:
+                index = self.slot_index(appointment.get("appointment_time", ""))
+            except ValueError:
+                continue
+            await self.db.doctor_calendars.update_one(
+                {"_id": self._key(appointment["doctor_id"], appointment["appointment_date"])},
+                {"$addToSet": {"slots": index}, "$setOnInsert": {"doctor_id": appointment["doctor_id"], "date": appointment["appointment_date"]}},
+                upsert=True
+            )
+            booked += 1
+        self.invalidate()
+        return booked
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Dict, Tuple
+
+from pymongo import ReturnDocument
+
+# sequence name -> (prefix, collection, id field)
+SEQUENCES: Dict[str, Tuple[str, str, str]] = {
+    "patient": ("PAT", "patients", "patient_id"),
+    "appointment": ("APT", "appointments", "appointment_id"),
+    "encounter": ("ENC", "encounters", "encounter_id"),
+    "prescription": ("RX", "prescriptions", "prescription_id"),
+    "order": ("ORD", "orders", "order_id"),
+    "report": ("RPT", "reports", "report_id"),
+    "invoice": ("INV", "invoices", "invoice_id"),
+}
+
+ID_WIDTH = 6
+
+
+def format_id(prefix: str, value: int) -> str:
+    return f"{prefix}{str(value).zfill(ID_WIDTH)}"
+
+
+class SequenceAllocator:
+    """Hands out human-readable IDs (PAT000001, ...) from the `counters` collection.
+
+    Every allocation is an atomic `$inc` on the counter document, so concurrent
+    requests and workers never see the same value. With `block_size > 1` each
+    process reserves a block of values per round-trip and serves the rest from
+    memory; values left in a block when the process exits are skipped.
+    """
+
+    def __init__(self, db, block_size: int = 1):
+        self.db = db
+        self.block_size = max(1, block_size)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def _reserve(self, name: str, size: int) -> int:
+        # Returns the first value of a freshly reserved range of `size` values
+        doc = await self.db.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["value"] - size + 1
+
+    async def next_value(self, name: str) -> int:
+        if self.block_size == 1:
+            return await self._reserve(name, 1)
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            current, end = self._blocks.get(name, (1, 0))
+            if current > end:
+                current = await self._reserve(name, self.block_size)
+                end = current + self.block_size - 1
+            self._blocks[name] = (current + 1, end)
+            return current
+
+    async def reserve_block(self, name: str, size: int) -> range:
+        # Bypasses the in-memory block so bulk callers get one contiguous range
+        start = await self._reserve(name, size)
+        return range(start, start + size)
+
+    async def next_id(self, name: str) -> str:
+        prefix = SEQUENCES[name][0]
+        return format_id(prefix, await self.next_value(name))
+
+    async def seed_from_existing(self):
+        # Make sure counters start after IDs issued by the old count_documents scheme
+        for name, (prefix, collection, field) in SEQUENCES.items():
+            # Compared as numbers: once IDs outgrow ID_WIDTH, PAT999999 sorts above PAT1000000 as a string
+            rows = await self.db[collection].aggregate([
+                {"$match": {field: {"$regex": rf"^{prefix}\d+$"}}},
+                {"$group": {"_id": None, "highest": {"$max": {"$toLong": {"$substrCP": [f"${field}", len(prefix), 32]}}}}},
+            ]).to_list(None)
+            highest = rows[0]["highest"] if rows else 0
+            count = await self.db[collection].estimated_document_count()
+            await self.db.counters.update_one(
+                {"_id": name},
+                {"$max": {"value": max(highest, count)}},
+                upsert=True,
+            )
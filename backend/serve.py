@@ -0,0 +1,71 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger("serve")
+
+def available_cpus(cgroup: Path = Path("/sys/fs/cgroup")) -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup CPU quota.
+
+    os.cpu_count() reports every core on the host, so in a container limited
+    to a fraction of them it would start far more workers than can run.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quotas = (
+        (cgroup / "cpu.max", None),  # cgroup v2: "<quota> <period>" or "max <period>"
+        (cgroup / "cpu" / "cpu.cfs_quota_us", cgroup / "cpu" / "cpu.cfs_period_us"),  # cgroup v1, -1 is unlimited
+    )
+    for quota_file, period_file in quotas:
+        try:
+            if period_file is None:
+                quota, period = quota_file.read_text().split()
+            else:
+                quota, period = quota_file.read_text().strip(), period_file.read_text().strip()
+        except (OSError, ValueError):
+            continue
+        if quota not in ("max", "-1"):
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+        break
+    return cpus
+
+def default_workers() -> int:
+    # Each worker is a single event loop, so one per usable core keeps every core busy
+    return int(os.environ.get('WEB_CONCURRENCY') or available_cpus())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with one uvicorn worker process per core")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--workers", type=int, default=default_workers(), help="worker processes (default: WEB_CONCURRENCY or usable CPU count)")
+    parser.add_argument("--log-level", default=os.environ.get('LOG_LEVEL', 'info'))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.workers > 1:
+        if os.environ.get('DB_BACKEND', 'mongo') == 'memory':
+            parser.error("DB_BACKEND=memory keeps data per process; run it with --workers 1")
+        if os.environ.get('CHANGE_FEED_SOURCE', 'local') != 'changestream':
+            parser.error("the local change feed only reaches clients of the worker that made the change; "
+                         "set CHANGE_FEED_SOURCE=changestream (needs a replica set) or run with --workers 1")
+
+    logger.info("Starting %d worker(s) on %s:%d", args.workers, args.host, args.port)
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get('FORWARDED_ALLOW_IPS', '*'),
+    )
@@ -1,270 +1,166 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Response, Request, Query, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from memory_db import MemoryClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
-import uuid
-from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
+from datetime import date, datetime, timezone, timedelta
 import jwt
 import base64
+import asyncio
+import hashlib
+import hmac
+import io
+
+from sequences import SequenceAllocator
+from user_cache import UserCache, QueryCache
+from cache_bus import CacheBus
+from pagination import ListParams, fetch_page, stream_ndjson, select_view, render_view, NEXT_CURSOR_HEADER
+from indexes import ensure_indexes, verify_indexes
+from blob_store import BlobNotFound, content_disposition, create_blob_store, parse_range, upload_chunks
+from audit_writer import AuditWriter
+from passwords import PasswordHasher
+import patient_search
+import migrate_datetimes
+from exports import EXPORTS, FORMATS as EXPORT_FORMATS, MAX_BATCH_SIZE as MAX_EXPORT_BATCH_SIZE, export_batch_size, export_filename, parquet_available, stream_export
+from patient_import import PatientImporter, detect_format, read_rows, FORMATS as IMPORT_FORMATS
+from scheduling import SlotCalendar, ACTIVE_STATUSES, clinic_datetime, clinic_timezone
+from worklist import Worklist, LeaseConflict, PRIORITIES
+from name_sync import NamePropagator, REFERENCES as NAME_REFERENCES
+from startup_lock import StartupLock
+from change_feed import ChangeFeed, ChangeStreamSource, FEED_FIELDS, encode_event, sse_events
+from revenue import RevenueRollups, GROUPINGS as REVENUE_GROUPINGS, default_range as default_revenue_range
+from query_profiler import QueryProfiler, SORT_FIELDS as SLOW_QUERY_SORTS
+from metrics import CommandTimer, MetricsMiddleware, MetricsRegistry, TimedJSONResponse, TimedORJSONResponse
+from models import (
+    User, UserSummary, UserCreate, UserUpdate, UserLogin, TokenResponse,
+    Patient, PatientSummary, PatientCreate, Appointment, AppointmentSummary, AppointmentCreate,
+    Encounter, EncounterSummary, EncounterCreate, Prescription, PrescriptionSummary, PrescriptionCreate,
+    Order, OrderSummary, OrderCreate, Report, ReportSummary, ReportCreate,
+    Invoice, InvoiceSummary, InvoiceCreate, AppointmentRecord, EncounterRecord, PrescriptionRecord,
+    ReportRecord, PatientRecordSummary, AuditLog,
+)
+from dashboard_stats import DashboardCounters, PATIENTS, PENDING_ORDERS, PENDING_INVOICES, appointments_on
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Opt-in slow query capture with explain plans, reported at /api/system/slow-queries
+QUERY_PROFILER = os.environ.get('QUERY_PROFILER', 'false').lower() == 'true'
+query_profiler = QueryProfiler(
+    threshold_ms=float(os.environ.get('SLOW_QUERY_MS', '100')),
+    explain_interval=float(os.environ.get('SLOW_QUERY_EXPLAIN_SECONDS', '300'))
+)
+
+# MongoDB connection; DB_BACKEND=memory keeps everything in process (tests, benchmarks)
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mongo')
+if DB_BACKEND == 'memory':
+    client = MemoryClient()
+    db = client[os.environ.get('DB_NAME', 'gangosri_his')]
+else:
+    mongo_url = os.environ['MONGO_URL']
+    # Timestamps are stored as BSON dates; tz_aware returns them as UTC-aware datetimes
+    # CommandTimer charges each command's round-trip time to the request that issued it
+    listeners = [CommandTimer(), query_profiler] if QUERY_PROFILER else [CommandTimer()]
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=listeners)
+    db = client[os.environ['DB_NAME']]
+
+# Human-readable ID sequences (PAT/APT/ENC/RX/ORD/RPT/INV)
+sequences = SequenceAllocator(db, block_size=int(os.environ.get('SEQUENCE_BLOCK_SIZE', '1')))
+
+# Uploaded report files (GridFS by default, BLOB_STORE=local for a filesystem store)
+blob_store = create_blob_store(db, ROOT_DIR, default='local' if DB_BACKEND == 'memory' else 'gridfs')
+
+# Appointment dates/times (and revenue days) are clinic wall-clock time in this zone
+CLINIC_TZ = clinic_timezone()
+
+# Doctor day calendars used to reject double-booking and suggest free slots
+slot_calendar = SlotCalendar(
+    db,
+    day_start=os.environ.get('CLINIC_DAY_START', '08:00'),
+    day_end=os.environ.get('CLINIC_DAY_END', '20:00'),
+    slot_minutes=int(os.environ.get('APPOINTMENT_SLOT_MINUTES', '15')),
+    tz=CLINIC_TZ,
+)
+
+# Audit entries are batched and written by a background task
+audit_writer = AuditWriter(
+    db.audit_logs,
+    max_queue=int(os.environ.get('AUDIT_QUEUE_SIZE', '10000')),
+    batch_size=int(os.environ.get('AUDIT_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('AUDIT_FLUSH_SECONDS', '0.5'))
+)
+
+# Incrementally maintained dashboard counts, cached for a few seconds across users
+dashboard_counters = DashboardCounters(db, ttl=float(os.environ.get('DASHBOARD_CACHE_SECONDS', '5')))
+
+# Per-day revenue rollups behind the billing reports
+revenue_rollups = RevenueRollups(db, CLINIC_TZ)
+
+# Appointment/order change events pushed to connected clients.
+# CHANGE_FEED_SOURCE=changestream reads them from MongoDB so every worker sees every change.
+change_feed = ChangeFeed(max_queue=int(os.environ.get('CHANGE_FEED_QUEUE_SIZE', '256')))
+CHANGE_FEED_SOURCE = os.environ.get('CHANGE_FEED_SOURCE', 'local')
+
+# Lab/radiology worklist; claims hold an order for ORDER_LEASE_SECONDS
+worklist = Worklist(db, change_feed, lease_seconds=int(os.environ.get('ORDER_LEASE_SECONDS', '900')))
+
+# Renamed patients/users are copied into patient_name/doctor_name by a background job
+name_propagator = NamePropagator(db, batch_size=int(os.environ.get('NAME_PROPAGATION_BATCH_SIZE', '500')))
+
+# Startup rebuilds and backfills run on one worker; its lease lapses after STARTUP_LOCK_SECONDS if it dies
+startup_lock = StartupLock(db, lease_seconds=int(os.environ.get('STARTUP_LOCK_SECONDS', '120')))
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs on its own thread pool; changing BCRYPT_ROUNDS rehashes passwords on next login
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+)
 security = HTTPBearer()
 JWT_SECRET = os.environ.get('JWT_SECRET', 'gangosri-his-secret-key-change-in-production')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 8
 
+# Authenticated user lookups and the active doctor list, both warmed at startup
+user_cache = UserCache(
+    ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', '30')),
+    max_size=int(os.environ.get('USER_CACHE_MAX_SIZE', '1024'))
+)
+doctor_list = QueryCache(
+    lambda: db.users.find({"role": "DOCTOR", "is_active": True}, {"_id": 0, "password_hash": 0}).to_list(1000),
+    ttl=float(os.environ.get('DOCTOR_CACHE_TTL_SECONDS', '60'))
+)
+WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', '10'))
+
+# User changes invalidate both caches on every worker (TTLs cover a missed message)
+cache_bus = CacheBus(db, shared=DB_BACKEND != 'memory')
+cache_bus.register("users", user_cache.invalidate)
+cache_bus.register("users", doctor_list.invalidate)
+
+# Serialize list pages with cached TypeAdapters and every other response with orjson
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+# Per-route latency, DB time and payload metrics at /api/metrics; SERVER_TIMING also sends them per response
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+metrics = MetricsRegistry()
+
 # Create the main app
-app = FastAPI(title="Gangosri HIS API")
+app = FastAPI(title="Gangosri HIS API", default_response_class=TimedORJSONResponse if FAST_JSON_RESPONSES else TimedJSONResponse)
 api_router = APIRouter(prefix="/api")
 
-# ==================== MODELS ====================
-
-class UserRole(BaseModel):
-    ADMIN: str = "ADMIN"
-    DOCTOR: str = "DOCTOR"
-    NURSE: str = "NURSE"
-    RECEPTIONIST: str = "RECEPTIONIST"
-    LAB_TECHNICIAN: str = "LAB_TECHNICIAN"
-    ACCOUNTANT: str = "ACCOUNTANT"
-
-class User(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    email: EmailStr
-    full_name: str
-    role: str
-    employee_id: Optional[str] = None
-    specialization: Optional[str] = None
-    phone: Optional[str] = None
-    is_active: bool = True
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class UserCreate(BaseModel):
-    email: EmailStr
-    password: str
-    full_name: str
-    role: str
-    employee_id: Optional[str] = None
-    specialization: Optional[str] = None
-    phone: Optional[str] = None
-
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
-
-class TokenResponse(BaseModel):
-    access_token: str
-    token_type: str = "bearer"
-    user: User
-
-class Patient(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    patient_id: str
-    full_name: str
-    date_of_birth: str
-    gender: str
-    phone: str
-    email: Optional[EmailStr] = None
-    address: Optional[str] = None
-    blood_group: Optional[str] = None
-    emergency_contact: Optional[str] = None
-    insurance_info: Optional[str] = None
-    medical_history: Optional[str] = None
-    allergies: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class PatientCreate(BaseModel):
-    full_name: str
-    date_of_birth: str
-    gender: str
-    phone: str
-    email: Optional[EmailStr] = None
-    address: Optional[str] = None
-    blood_group: Optional[str] = None
-    emergency_contact: Optional[str] = None
-    insurance_info: Optional[str] = None
-    medical_history: Optional[str] = None
-    allergies: Optional[str] = None
-
-class Appointment(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    appointment_id: str
-    patient_id: str
-    patient_name: str
-    doctor_id: str
-    doctor_name: str
-    appointment_date: str
-    appointment_time: str
-    status: str  # scheduled, completed, cancelled, no-show
-    reason: Optional[str] = None
-    notes: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class AppointmentCreate(BaseModel):
-    patient_id: str
-    doctor_id: str
-    appointment_date: str
-    appointment_time: str
-    reason: Optional[str] = None
-    notes: Optional[str] = None
-
-class Encounter(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    encounter_id: str
-    patient_id: str
-    patient_name: str
-    doctor_id: str
-    doctor_name: str
-    appointment_id: Optional[str] = None
-    chief_complaint: str
-    vitals: Optional[dict] = None
-    diagnosis: Optional[str] = None
-    clinical_notes: Optional[str] = None
-    treatment_plan: Optional[str] = None
-    follow_up: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class EncounterCreate(BaseModel):
-    patient_id: str
-    appointment_id: Optional[str] = None
-    chief_complaint: str
-    vitals: Optional[dict] = None
-    diagnosis: Optional[str] = None
-    clinical_notes: Optional[str] = None
-    treatment_plan: Optional[str] = None
-    follow_up: Optional[str] = None
-
-class Prescription(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    prescription_id: str
-    patient_id: str
-    patient_name: str
-    doctor_id: str
-    doctor_name: str
-    encounter_id: Optional[str] = None
-    medications: List[dict]
-    instructions: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class PrescriptionCreate(BaseModel):
-    patient_id: str
-    encounter_id: Optional[str] = None
-    medications: List[dict]
-    instructions: Optional[str] = None
-
-class Order(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    order_id: str
-    patient_id: str
-    patient_name: str
-    doctor_id: str
-    doctor_name: str
-    order_type: str  # lab, radiology
-    test_name: str
-    status: str  # pending, in_progress, completed, cancelled
-    notes: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class OrderCreate(BaseModel):
-    patient_id: str
-    order_type: str
-    test_name: str
-    notes: Optional[str] = None
-
-class Report(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    report_id: str
-    patient_id: str
-    patient_name: str
-    order_id: Optional[str] = None
-    report_type: str
-    test_name: str
-    file_data: Optional[str] = None
-    file_name: Optional[str] = None
-    findings: Optional[str] = None
-    imaging_link: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    uploaded_by: str
-
-class ReportCreate(BaseModel):
-    patient_id: str
-    order_id: Optional[str] = None
-    report_type: str
-    test_name: str
-    findings: Optional[str] = None
-    imaging_link: Optional[str] = None
-
-class Invoice(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    invoice_id: str
-    patient_id: str
-    patient_name: str
-    items: List[dict]
-    subtotal: float
-    tax: float
-    total: float
-    payment_status: str  # pending, paid, partial
-    payment_method: Optional[str] = None
-    notes: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class InvoiceCreate(BaseModel):
-    patient_id: str
-    items: List[dict]
-    tax: float = 0.0
-    payment_method: Optional[str] = None
-    notes: Optional[str] = None
-
-class AuditLog(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
-    user_email: str
-    action: str
-    resource_type: str
-    resource_id: str
-    details: Optional[dict] = None
-    ip_address: Optional[str] = None
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
 # ==================== AUTH HELPERS ====================
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -273,22 +169,32 @@ def create_access_token(data: dict) -> str:
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    return await user_from_token(credentials.credentials)
+
+async def user_from_token(token: str) -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if not user_doc:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return user_doc
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except Exception as e:
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    user_id = payload.get("sub")
+    if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    user_doc = user_cache.get(user_id)
+    if user_doc is None:
+        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_cache.put(user_id, user_doc)
+    
+    # Deactivation takes effect on existing tokens, not just at the next login
+    if not user_doc.get("is_active", True):
+        raise HTTPException(status_code=403, detail="Account is inactive")
+    
+    return user_doc
 
 async def log_audit(user_id: str, user_email: str, action: str, resource_type: str, resource_id: str, details: dict = None):
     audit = AuditLog(
@@ -300,8 +206,7 @@ async def log_audit(user_id: str, user_email: str, action: str, resource_type: s
         details=details
     )
     doc = audit.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.audit_logs.insert_one(doc)
+    await audit_writer.submit(doc)
 
 # ==================== AUTH ROUTES ====================
 
@@ -317,25 +222,33 @@ async def register_user(input: UserCreate, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_pwd = hash_password(input.password)
+    hashed_pwd = await hash_password(input.password)
     
     # Create user
     user_dict = input.model_dump(exclude={"password"})
     user = User(**user_dict)
     doc = user.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     doc['password_hash'] = hashed_pwd
     
     await db.users.insert_one(doc)
+    await cache_bus.publish("users", user.id)
     return user
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login_user(input: UserLogin):
     # Find user
     user_doc = await db.users.find_one({"email": input.email}, {"_id": 0})
-    if not user_doc or not verify_password(input.password, user_doc.get("password_hash", "")):
+    if not user_doc:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    valid, new_hash = await password_hasher.verify_and_update(input.password, user_doc.get("password_hash", ""))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Upgrade hashes created with old cost parameters
+    if new_hash:
+        await db.users.update_one({"id": user_doc["id"]}, {"$set": {"password_hash": new_hash}})
+    
     if not user_doc.get("is_active", True):
         raise HTTPException(status_code=403, detail="Account is inactive")
     
@@ -344,9 +257,6 @@ async def login_user(input: UserLogin):
     
     # Remove password hash
     user_doc.pop("password_hash", None)
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     user = User(**user_doc)
     
     await log_audit(user.id, user.email, "LOGIN", "user", user.id)
@@ -355,45 +265,64 @@ async def login_user(input: UserLogin):
 
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
-    if isinstance(current_user['created_at'], str):
-        current_user['created_at'] = datetime.fromisoformat(current_user['created_at'])
     return User(**current_user)
 
 # ==================== PATIENT ROUTES ====================
 
+# Bulk loads validate against PatientCreate and take patient IDs in blocks
+patient_importer = PatientImporter(db, sequences, PatientCreate, chunk_size=int(os.environ.get('PATIENT_IMPORT_CHUNK_SIZE', '1000')))
+
 @api_router.post("/patients", response_model=Patient)
 async def create_patient(input: PatientCreate, current_user: dict = Depends(get_current_user)):
     # Generate patient ID
-    count = await db.patients.count_documents({})
-    patient_id = f"PAT{str(count + 1).zfill(6)}"
+    patient_id = await sequences.next_id("patient")
     
     patient_dict = input.model_dump()
     patient = Patient(**patient_dict, patient_id=patient_id, created_by=current_user["id"])
     doc = patient.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc.update(patient_search.search_fields(patient.full_name, patient.phone))
     
     await db.patients.insert_one(doc)
+    await dashboard_counters.incr(PATIENTS)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "patient", patient.id)
     
     return patient
 
+@api_router.post("/patients/import")
+async def import_patients(file: UploadFile = File(...), format: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    fmt = format or detect_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .ndjson file, or pass format=csv|ndjson")
+    
+    # The upload is already spooled to disk; rows are read from it chunk by chunk
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await patient_importer.run(read_rows(stream, fmt), current_user["id"])
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    
+    await dashboard_counters.incr(PATIENTS, report.imported)
+    await log_audit(current_user["id"], current_user["email"], "IMPORT", "patient", file.filename or "", {"total": report.total, "imported": report.imported, "failed": len(report.errors)})
+    return report.to_dict()
+
 @api_router.get("/patients", response_model=List[Patient])
-async def get_patients(search: Optional[str] = None, current_user: dict = Depends(get_current_user)):
-    query = {}
+async def get_patients(response: Response, search: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
+    view = select_view(page, Patient, PatientSummary, "created_at", {"_id": 0, **{f: 0 for f in patient_search.SEARCH_FIELDS}})
+    headers = None
     if search:
-        query = {
-            "$or": [
-                {"full_name": {"$regex": search, "$options": "i"}},
-                {"patient_id": {"$regex": search, "$options": "i"}},
-                {"phone": {"$regex": search, "$options": "i"}}
-            ]
-        }
-    
-    patients = await db.patients.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for p in patients:
-        if isinstance(p['created_at'], str):
-            p['created_at'] = datetime.fromisoformat(p['created_at'])
-    return patients
+        # Indexed prefix/phonetic lookup, ranked by relevance
+        patients, next_cursor, truncated = await patient_search.search(db.patients, search, view.projection, page)
+        if truncated:
+            headers = {patient_search.TRUNCATED_HEADER: "true"}
+    elif page.stream:
+        return stream_ndjson(db.patients, {}, view.projection, "created_at", page)
+    else:
+        patients, next_cursor = await fetch_page(db.patients, {}, view.projection, "created_at", page)
+    return render_view(view, patients, next_cursor, response, fast=FAST_JSON_RESPONSES, headers=headers)
 
 @api_router.get("/patients/{patient_id}", response_model=Patient)
 async def get_patient(patient_id: str, current_user: dict = Depends(get_current_user)):
@@ -401,12 +330,54 @@ async def get_patient(patient_id: str, current_user: dict = Depends(get_current_
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    if isinstance(patient['created_at'], str):
-        patient['created_at'] = datetime.fromisoformat(patient['created_at'])
-    
     await log_audit(current_user["id"], current_user["email"], "VIEW", "patient", patient_id)
     return Patient(**patient)
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match is "*" or a comma-separated list of tags, compared weakly (W/ prefix ignored)
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+@api_router.get("/patients/{patient_id}/summary", response_model=PatientRecordSummary)
+async def get_patient_summary(patient_id: str, request: Request, limit: int = Query(20, ge=1, le=200), current_user: dict = Depends(get_current_user)):
+    def section(collection, sort_field, model):
+        projection = {"_id": 0, **{name: 1 for name in model.model_fields}}
+        return db[collection].find({"patient_id": patient_id}, projection).sort([(sort_field, -1), ("id", -1)]).to_list(limit)
+    
+    # One round-trip per collection, all in flight at once
+    patient, appointments, encounters, prescriptions, reports, invoices = await asyncio.gather(
+        db.patients.find_one({"id": patient_id}, {"_id": 0, **{f: 0 for f in patient_search.SEARCH_FIELDS}}),
+        section("appointments", "appointment_date", AppointmentRecord),
+        section("encounters", "created_at", EncounterRecord),
+        section("prescriptions", "created_at", PrescriptionRecord),
+        section("reports", "created_at", ReportRecord),
+        section("invoices", "created_at", InvoiceSummary)
+    )
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    await log_audit(current_user["id"], current_user["email"], "VIEW", "patient", patient_id)
+    
+    body = PatientRecordSummary(
+        patient=patient,
+        appointments=appointments,
+        encounters=encounters,
+        prescriptions=prescriptions,
+        reports=reports,
+        invoices=invoices
+    ).model_dump_json()
+    etag = f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.put("/patients/{patient_id}", response_model=Patient)
 async def update_patient(patient_id: str, input: PatientCreate, current_user: dict = Depends(get_current_user)):
     existing = await db.patients.find_one({"id": patient_id}, {"_id": 0})
@@ -414,17 +385,25 @@ async def update_patient(patient_id: str, input: PatientCreate, current_user: di
         raise HTTPException(status_code=404, detail="Patient not found")
     
     update_data = input.model_dump()
+    update_data.update(patient_search.search_fields(input.full_name, input.phone))
     await db.patients.update_one({"id": patient_id}, {"$set": update_data})
+    if input.full_name != existing["full_name"]:
+        await name_propagator.enqueue("patient", patient_id, input.full_name)
     
     updated = await db.patients.find_one({"id": patient_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    
     await log_audit(current_user["id"], current_user["email"], "UPDATE", "patient", patient_id)
     return Patient(**updated)
 
 # ==================== APPOINTMENT ROUTES ====================
 
+def appointment_datetime(appointment_date: str, appointment_time: str) -> Optional[datetime]:
+    # Native copy of the clinic wall-clock date/time strings for range queries, stored as UTC
+    return clinic_datetime(appointment_date, appointment_time, CLINIC_TZ)
+
+def clinic_bound(value: datetime) -> datetime:
+    # Range bounds without an offset mean clinic wall-clock time, like the dates they filter
+    return value if value.tzinfo else value.replace(tzinfo=CLINIC_TZ)
+
 @api_router.post("/appointments", response_model=Appointment)
 async def create_appointment(input: AppointmentCreate, current_user: dict = Depends(get_current_user)):
     # Get patient and doctor details
@@ -436,28 +415,41 @@ async def create_appointment(input: AppointmentCreate, current_user: dict = Depe
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     
-    count = await db.appointments.count_documents({})
-    appointment_id = f"APT{str(count + 1).zfill(6)}"
-    
-    appointment_dict = input.model_dump()
-    appointment = Appointment(
-        **appointment_dict,
-        appointment_id=appointment_id,
-        patient_name=patient["full_name"],
-        doctor_name=doctor["full_name"],
-        status="scheduled",
-        created_by=current_user["id"]
-    )
-    doc = appointment.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    try:
+        slot = slot_calendar.slot_index(input.appointment_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not await slot_calendar.book(input.doctor_id, input.appointment_date, slot):
+        raise HTTPException(status_code=409, detail="Doctor is already booked for this slot")
     
-    await db.appointments.insert_one(doc)
+    try:
+        appointment_id = await sequences.next_id("appointment")
+        
+        appointment_dict = input.model_dump()
+        appointment = Appointment(
+            **appointment_dict,
+            appointment_id=appointment_id,
+            patient_name=patient["full_name"],
+            doctor_name=doctor["full_name"],
+            status="scheduled",
+            created_by=current_user["id"]
+        )
+        doc = appointment.model_dump()
+        doc['appointment_at'] = appointment_datetime(appointment.appointment_date, appointment.appointment_time)
+        
+        await db.appointments.insert_one(doc)
+    except BaseException:
+        # The slot was won above; without the appointment it would stay booked forever
+        await slot_calendar.release(input.doctor_id, input.appointment_date, slot)
+        raise
+    await dashboard_counters.incr(appointments_on(appointment.appointment_date))
+    change_feed.publish("appointments", "created", doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "appointment", appointment.id)
     
     return appointment
 
 @api_router.get("/appointments", response_model=List[Appointment])
-async def get_appointments(doctor_id: Optional[str] = None, patient_id: Optional[str] = None, date: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_appointments(response: Response, doctor_id: Optional[str] = None, patient_id: Optional[str] = None, date: Optional[str] = None, from_date: Optional[datetime] = None, to_date: Optional[datetime] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if doctor_id:
         query["doctor_id"] = doctor_id
@@ -465,12 +457,48 @@ async def get_appointments(doctor_id: Optional[str] = None, patient_id: Optional
         query["patient_id"] = patient_id
     if date:
         query["appointment_date"] = date
+    if from_date or to_date:
+        query["appointment_at"] = {}
+        if from_date:
+            query["appointment_at"]["$gte"] = clinic_bound(from_date)
+        if to_date:
+            query["appointment_at"]["$lt"] = clinic_bound(to_date)
+    
+    view = select_view(page, Appointment, AppointmentSummary, "appointment_date", {"_id": 0})
+    if page.stream:
+        return stream_ndjson(db.appointments, query, view.projection, "appointment_date", page)
+    
+    appointments, next_cursor = await fetch_page(db.appointments, query, view.projection, "appointment_date", page)
+    return render_view(view, appointments, next_cursor, response, fast=FAST_JSON_RESPONSES)
+
+@api_router.get("/appointments/availability")
+async def get_availability(doctor_id: Optional[str] = None, specialization: Optional[str] = None, date: Optional[str] = None, count: int = Query(5, ge=1, le=100), current_user: dict = Depends(get_current_user)):
+    query = {"role": "DOCTOR", "is_active": True}
+    if doctor_id:
+        query["id"] = doctor_id
+    elif specialization:
+        query["specialization"] = specialization
+    else:
+        raise HTTPException(status_code=400, detail="doctor_id or specialization is required")
+    
+    doctors = await db.users.find(query, {"_id": 0, "id": 1, "full_name": 1}).to_list(1000)
+    names = {d["id"]: d["full_name"] for d in doctors}
     
-    appointments = await db.appointments.find(query, {"_id": 0}).sort("appointment_date", -1).to_list(1000)
-    for a in appointments:
-        if isinstance(a['created_at'], str):
-            a['created_at'] = datetime.fromisoformat(a['created_at'])
-    return appointments
+    # Slots are clinic wall-clock times, so compare everything as naive clinic time
+    start = datetime.now(CLINIC_TZ).replace(tzinfo=None)
+    if date:
+        try:
+            requested = datetime.fromisoformat(date)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid date, expected YYYY-MM-DD or an ISO 8601 datetime")
+        if requested.tzinfo:
+            requested = requested.astimezone(CLINIC_TZ).replace(tzinfo=None)
+        start = max(start, requested)
+    
+    slots = await slot_calendar.next_free(list(names), start, count)
+    for slot in slots:
+        slot["doctor_name"] = names[slot["doctor_id"]]
+    return slots
 
 @api_router.get("/appointments/{appointment_id}", response_model=Appointment)
 async def get_appointment(appointment_id: str, current_user: dict = Depends(get_current_user)):
@@ -478,13 +506,27 @@ async def get_appointment(appointment_id: str, current_user: dict = Depends(get_
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    if isinstance(appointment['created_at'], str):
-        appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
     return Appointment(**appointment)
 
 @api_router.patch("/appointments/{appointment_id}/status")
 async def update_appointment_status(appointment_id: str, status: str, current_user: dict = Depends(get_current_user)):
+    appointment = await db.appointments.find_one({"id": appointment_id}, {"_id": 0, "doctor_id": 1, "appointment_date": 1, "appointment_time": 1, "status": 1})
+    if appointment and (appointment.get("status") in ACTIVE_STATUSES) != (status in ACTIVE_STATUSES):
+        # Cancelling frees the slot, reinstating has to win it back
+        try:
+            slot = slot_calendar.slot_index(appointment["appointment_time"])
+        except ValueError:
+            slot = None
+        if slot is not None:
+            if status in ACTIVE_STATUSES:
+                if not await slot_calendar.book(appointment["doctor_id"], appointment["appointment_date"], slot):
+                    raise HTTPException(status_code=409, detail="Doctor is already booked for this slot")
+            else:
+                await slot_calendar.release(appointment["doctor_id"], appointment["appointment_date"], slot)
+    
     await db.appointments.update_one({"id": appointment_id}, {"$set": {"status": status}})
+    if appointment:
+        change_feed.publish("appointments", "updated", {"id": appointment_id, "doctor_id": appointment["doctor_id"], "status": status})
     await log_audit(current_user["id"], current_user["email"], "UPDATE_STATUS", "appointment", appointment_id, {"status": status})
     return {"message": "Status updated"}
 
@@ -496,8 +538,7 @@ async def create_encounter(input: EncounterCreate, current_user: dict = Depends(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    count = await db.encounters.count_documents({})
-    encounter_id = f"ENC{str(count + 1).zfill(6)}"
+    encounter_id = await sequences.next_id("encounter")
     
     encounter_dict = input.model_dump()
     encounter = Encounter(
@@ -509,7 +550,6 @@ async def create_encounter(input: EncounterCreate, current_user: dict = Depends(
         created_by=current_user["id"]
     )
     doc = encounter.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.encounters.insert_one(doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "encounter", encounter.id)
@@ -521,16 +561,17 @@ async def create_encounter(input: EncounterCreate, current_user: dict = Depends(
     return encounter
 
 @api_router.get("/encounters", response_model=List[Encounter])
-async def get_encounters(patient_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_encounters(response: Response, patient_id: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if patient_id:
         query["patient_id"] = patient_id
     
-    encounters = await db.encounters.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for e in encounters:
-        if isinstance(e['created_at'], str):
-            e['created_at'] = datetime.fromisoformat(e['created_at'])
-    return encounters
+    view = select_view(page, Encounter, EncounterSummary, "created_at", {"_id": 0})
+    if page.stream:
+        return stream_ndjson(db.encounters, query, view.projection, "created_at", page)
+    
+    encounters, next_cursor = await fetch_page(db.encounters, query, view.projection, "created_at", page)
+    return render_view(view, encounters, next_cursor, response, fast=FAST_JSON_RESPONSES)
 
 @api_router.get("/encounters/{encounter_id}", response_model=Encounter)
 async def get_encounter(encounter_id: str, current_user: dict = Depends(get_current_user)):
@@ -538,9 +579,6 @@ async def get_encounter(encounter_id: str, current_user: dict = Depends(get_curr
     if not encounter:
         raise HTTPException(status_code=404, detail="Encounter not found")
     
-    if isinstance(encounter['created_at'], str):
-        encounter['created_at'] = datetime.fromisoformat(encounter['created_at'])
-    
     await log_audit(current_user["id"], current_user["email"], "VIEW", "encounter", encounter_id)
     return Encounter(**encounter)
 
@@ -552,8 +590,7 @@ async def create_prescription(input: PrescriptionCreate, current_user: dict = De
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    count = await db.prescriptions.count_documents({})
-    prescription_id = f"RX{str(count + 1).zfill(6)}"
+    prescription_id = await sequences.next_id("prescription")
     
     prescription_dict = input.model_dump()
     prescription = Prescription(
@@ -565,7 +602,6 @@ async def create_prescription(input: PrescriptionCreate, current_user: dict = De
         created_by=current_user["id"]
     )
     doc = prescription.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.prescriptions.insert_one(doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "prescription", prescription.id)
@@ -573,16 +609,17 @@ async def create_prescription(input: PrescriptionCreate, current_user: dict = De
     return prescription
 
 @api_router.get("/prescriptions", response_model=List[Prescription])
-async def get_prescriptions(patient_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_prescriptions(response: Response, patient_id: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if patient_id:
         query["patient_id"] = patient_id
     
-    prescriptions = await db.prescriptions.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for p in prescriptions:
-        if isinstance(p['created_at'], str):
-            p['created_at'] = datetime.fromisoformat(p['created_at'])
-    return prescriptions
+    view = select_view(page, Prescription, PrescriptionSummary, "created_at", {"_id": 0})
+    if page.stream:
+        return stream_ndjson(db.prescriptions, query, view.projection, "created_at", page)
+    
+    prescriptions, next_cursor = await fetch_page(db.prescriptions, query, view.projection, "created_at", page)
+    return render_view(view, prescriptions, next_cursor, response, fast=FAST_JSON_RESPONSES)
 
 @api_router.get("/prescriptions/{prescription_id}", response_model=Prescription)
 async def get_prescription(prescription_id: str, current_user: dict = Depends(get_current_user)):
@@ -590,22 +627,26 @@ async def get_prescription(prescription_id: str, current_user: dict = Depends(ge
     if not prescription:
         raise HTTPException(status_code=404, detail="Prescription not found")
     
-    if isinstance(prescription['created_at'], str):
-        prescription['created_at'] = datetime.fromisoformat(prescription['created_at'])
-    
     await log_audit(current_user["id"], current_user["email"], "VIEW", "prescription", prescription_id)
     return Prescription(**prescription)
 
 # ==================== ORDER ROUTES ====================
 
+async def set_order_status(order_id: str, status: str, user: dict, force: bool = False) -> bool:
+    # Raises LeaseConflict when another user holds the order; False when it does not exist
+    previous = await worklist.transition(order_id, status, user, force=force)
+    await dashboard_counters.order_status_changed(previous["status"] if previous else None, status)
+    return previous is not None
+
 @api_router.post("/orders", response_model=Order)
 async def create_order(input: OrderCreate, current_user: dict = Depends(get_current_user)):
     patient = await db.patients.find_one({"id": input.patient_id}, {"_id": 0})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
+    if input.priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Priority must be one of: {', '.join(PRIORITIES)}")
     
-    count = await db.orders.count_documents({})
-    order_id = f"ORD{str(count + 1).zfill(6)}"
+    order_id = await sequences.next_id("order")
     
     order_dict = input.model_dump()
     order = Order(
@@ -618,33 +659,171 @@ async def create_order(input: OrderCreate, current_user: dict = Depends(get_curr
         created_by=current_user["id"]
     )
     doc = order.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc["priority_rank"] = PRIORITIES[order.priority]
     
     await db.orders.insert_one(doc)
+    await dashboard_counters.incr(PENDING_ORDERS)
+    worklist.created(doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "order", order.id)
     
     return order
 
 @api_router.get("/orders", response_model=List[Order])
-async def get_orders(patient_id: Optional[str] = None, status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_orders(response: Response, patient_id: Optional[str] = None, status: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if patient_id:
         query["patient_id"] = patient_id
     if status:
         query["status"] = status
     
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for o in orders:
-        if isinstance(o['created_at'], str):
-            o['created_at'] = datetime.fromisoformat(o['created_at'])
-    return orders
+    view = select_view(page, Order, OrderSummary, "created_at", {"_id": 0})
+    if page.stream:
+        return stream_ndjson(db.orders, query, view.projection, "created_at", page)
+    
+    orders, next_cursor = await fetch_page(db.orders, query, view.projection, "created_at", page)
+    return render_view(view, orders, next_cursor, response, fast=FAST_JSON_RESPONSES)
 
 @api_router.patch("/orders/{order_id}/status")
 async def update_order_status(order_id: str, status: str, current_user: dict = Depends(get_current_user)):
-    await db.orders.update_one({"id": order_id}, {"$set": {"status": status}})
+    try:
+        found = await set_order_status(order_id, status, current_user, force=current_user["role"] == "ADMIN")
+    except LeaseConflict:
+        raise HTTPException(status_code=409, detail="Order is being processed by another user")
+    if not found:
+        raise HTTPException(status_code=404, detail="Order not found")
     await log_audit(current_user["id"], current_user["email"], "UPDATE_STATUS", "order", order_id, {"status": status})
     return {"message": "Status updated"}
 
+# ==================== WORKLIST ROUTES ====================
+
+# Staff who process lab and radiology orders
+WORKLIST_ROLES = ("ADMIN", "LAB_TECHNICIAN")
+
+def check_worklist_access(user: dict):
+    if user["role"] not in WORKLIST_ROLES:
+        raise HTTPException(status_code=403, detail="The worklist is restricted to laboratory staff and administrators")
+
+@api_router.get("/worklist")
+async def get_worklist(order_type: Optional[str] = None, limit: int = Query(50, ge=1, le=500), current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    return await worklist.queue(order_type, limit)
+
+@api_router.get("/worklist/events")
+async def worklist_events(order_type: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    return StreamingResponse(
+        sse_events(change_feed, change_feed.subscribe(["orders"], order_type=order_type)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/worklist/claim")
+async def claim_next_order(order_type: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    claimed = await worklist.claim_next(current_user, order_type)
+    if not claimed:
+        raise HTTPException(status_code=404, detail="No open orders")
+    await dashboard_counters.order_status_changed(claimed["previous_status"], "in_progress")
+    await log_audit(current_user["id"], current_user["email"], "CLAIM", "order", claimed["order"]["id"])
+    return Order(**claimed["order"])
+
+@api_router.post("/worklist/{order_id}/claim")
+async def claim_order(order_id: str, current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    try:
+        claimed = await worklist.claim(order_id, current_user)
+    except LeaseConflict:
+        raise HTTPException(status_code=409, detail="Order is not open for claiming")
+    if claimed is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    await dashboard_counters.order_status_changed(claimed["previous_status"], "in_progress")
+    await log_audit(current_user["id"], current_user["email"], "CLAIM", "order", order_id)
+    return Order(**claimed["order"])
+
+@api_router.post("/worklist/{order_id}/renew")
+async def renew_order_lease(order_id: str, current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    try:
+        order = await worklist.renew(order_id, current_user)
+    except LeaseConflict:
+        raise HTTPException(status_code=409, detail="You do not hold this order")
+    return {"lease_expires_at": order["lease_expires_at"]}
+
+@api_router.post("/worklist/{order_id}/release")
+async def release_order(order_id: str, current_user: dict = Depends(get_current_user)):
+    check_worklist_access(current_user)
+    try:
+        previous = await worklist.release(order_id, current_user, force=current_user["role"] == "ADMIN")
+    except LeaseConflict:
+        raise HTTPException(status_code=409, detail="Only an order in progress can be released, by the user who holds it")
+    if not previous:
+        raise HTTPException(status_code=404, detail="Order not found")
+    await dashboard_counters.order_status_changed(previous["status"], "pending")
+    await log_audit(current_user["id"], current_user["email"], "RELEASE", "order", order_id)
+    return {"message": "Order returned to the worklist"}
+
+# ==================== CHANGE FEED ====================
+
+async def change_filters(collections: Optional[str], doctor_id: Optional[str], specialization: Optional[str]) -> dict:
+    names = [name.strip() for name in (collections or ",".join(FEED_FIELDS)).split(",") if name.strip()]
+    unknown = set(names) - set(FEED_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown))}")
+    doctor_ids = None
+    if doctor_id:
+        doctor_ids = {doctor_id}
+    elif specialization:
+        # A department is followed as the set of its doctors at subscribe time
+        doctors = db.users.find({"role": "DOCTOR", "specialization": specialization}, {"_id": 0, "id": 1})
+        doctor_ids = {doc["id"] async for doc in doctors}
+    return {"collections": names, "doctor_ids": doctor_ids}
+
+@api_router.get("/changes/events")
+async def change_events(collections: Optional[str] = None, doctor_id: Optional[str] = None, specialization: Optional[str] = None, order_type: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    filters = await change_filters(collections, doctor_id, specialization)
+    return StreamingResponse(
+        sse_events(change_feed, change_feed.subscribe(order_type=order_type, **filters)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/changes/ws")
+async def change_socket(websocket: WebSocket, token: str = "", collections: Optional[str] = None, doctor_id: Optional[str] = None, specialization: Optional[str] = None, order_type: Optional[str] = None):
+    # Browsers cannot set headers on a WebSocket, so the JWT comes as ?token=
+    try:
+        await user_from_token(token)
+        filters = await change_filters(collections, doctor_id, specialization)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code)
+        return
+    
+    await websocket.accept()
+    subscription = change_feed.subscribe(order_type=order_type, **filters)
+    
+    async def send_events():
+        async for event in subscription.events(keepalive=30.0):
+            if event is not None:
+                await websocket.send_text(encode_event(event))
+    
+    async def wait_for_close():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(wait_for_close())
+    try:
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        change_feed.unsubscribe(subscription)
+        sender.cancel()
+        receiver.cancel()
+    if receiver not in done:
+        # The client fell behind and was dropped; it should reconnect and refetch
+        try:
+            await websocket.close(code=1013)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
 # ==================== REPORT ROUTES ====================
 
 @api_router.post("/reports", response_model=Report)
@@ -653,8 +832,7 @@ async def create_report(input: ReportCreate, current_user: dict = Depends(get_cu
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    count = await db.reports.count_documents({})
-    report_id = f"RPT{str(count + 1).zfill(6)}"
+    report_id = await sequences.next_id("report")
     
     report_dict = input.model_dump()
     report = Report(
@@ -664,66 +842,127 @@ async def create_report(input: ReportCreate, current_user: dict = Depends(get_cu
         uploaded_by=current_user["id"]
     )
     doc = report.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.reports.insert_one(doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "report", report.id)
     
     # Update order status if linked
     if input.order_id:
-        await db.orders.update_one({"id": input.order_id}, {"$set": {"status": "completed"}})
+        await set_order_status(input.order_id, "completed", current_user, force=True)
     
     return report
 
+async def discard_blob(ref: str):
+    # Local blobs are content-addressed and may be shared by another report with the same file
+    if await db.reports.find_one({"file_ref": ref}, {"_id": 1}):
+        return
+    try:
+        await blob_store.delete(ref)
+    except Exception:
+        logger.exception("Could not delete orphaned report file %s", ref)
+
 @api_router.post("/reports/upload")
 async def upload_report_file(file: UploadFile = File(...), patient_id: str = "", order_id: str = "", report_type: str = "", test_name: str = "", current_user: dict = Depends(get_current_user)):
     if not patient_id or not report_type or not test_name:
         raise HTTPException(status_code=400, detail="Missing required fields")
     
-    # Read file and encode to base64
-    contents = await file.read()
-    file_data = base64.b64encode(contents).decode('utf-8')
-    
     patient = await db.patients.find_one({"id": patient_id}, {"_id": 0})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    count = await db.reports.count_documents({})
-    report_id = f"RPT{str(count + 1).zfill(6)}"
+    # Stream the upload into the blob store in chunks
+    blob = await blob_store.put(upload_chunks(file), file.filename, file.content_type)
     
-    report = Report(
-        report_id=report_id,
-        patient_id=patient_id,
-        patient_name=patient["full_name"],
-        order_id=order_id if order_id else None,
-        report_type=report_type,
-        test_name=test_name,
-        file_data=file_data,
-        file_name=file.filename,
-        uploaded_by=current_user["id"]
-    )
-    doc = report.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.reports.insert_one(doc)
+    try:
+        report_id = await sequences.next_id("report")
+        
+        report = Report(
+            report_id=report_id,
+            patient_id=patient_id,
+            patient_name=patient["full_name"],
+            order_id=order_id if order_id else None,
+            report_type=report_type,
+            test_name=test_name,
+            file_name=file.filename,
+            file_ref=blob.ref,
+            file_size=blob.size,
+            content_type=file.content_type,
+            uploaded_by=current_user["id"]
+        )
+        doc = report.model_dump()
+        
+        await db.reports.insert_one(doc)
+    except BaseException:
+        # No report points at the blob, so it would never be served or cleaned up
+        await discard_blob(blob.ref)
+        raise
     await log_audit(current_user["id"], current_user["email"], "UPLOAD", "report", report.id)
     
     if order_id:
-        await db.orders.update_one({"id": order_id}, {"$set": {"status": "completed"}})
+        await set_order_status(order_id, "completed", current_user, force=True)
     
     return {"message": "Report uploaded", "report_id": report.id}
 
 @api_router.get("/reports", response_model=List[Report])
-async def get_reports(patient_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_reports(response: Response, patient_id: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if patient_id:
         query["patient_id"] = patient_id
     
-    reports = await db.reports.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for r in reports:
-        if isinstance(r['created_at'], str):
-            r['created_at'] = datetime.fromisoformat(r['created_at'])
-    return reports
+    # Report files are served by /reports/{report_id}/file, not inline in lists
+    view = select_view(page, Report, ReportSummary, "created_at", {"_id": 0, "file_data": 0})
+    if page.stream:
+        return stream_ndjson(db.reports, query, view.projection, "created_at", page)
+    
+    reports, next_cursor = await fetch_page(db.reports, query, view.projection, "created_at", page)
+    return render_view(view, reports, next_cursor, response, fast=FAST_JSON_RESPONSES)
+
+@api_router.get("/reports/{report_id}/file")
+async def download_report_file(report_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    report = await db.reports.find_one({"id": report_id}, {"_id": 0})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    media_type = report.get("content_type") or "application/octet-stream"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(report.get("file_name") or report["report_id"])
+    }
+    
+    if report.get("file_ref"):
+        try:
+            size = await blob_store.size(report["file_ref"])
+        except BlobNotFound:
+            raise HTTPException(status_code=404, detail="Report file not found")
+        
+        async def read_blob(start, end):
+            async for chunk in blob_store.read(report["file_ref"], start, end):
+                yield chunk
+    elif report.get("file_data"):
+        # Reports uploaded before the blob store, not yet migrated
+        contents = base64.b64decode(report["file_data"])
+        size = len(contents)
+        
+        async def read_blob(start, end):
+            yield contents[start:end + 1]
+    else:
+        raise HTTPException(status_code=404, detail="Report has no file")
+    
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{size}"})
+    
+    await log_audit(current_user["id"], current_user["email"], "DOWNLOAD", "report", report_id)
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_blob(0, size - 1), media_type=media_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(read_blob(start, end), status_code=206, media_type=media_type, headers=headers)
 
 # ==================== BILLING ROUTES ====================
 
@@ -732,9 +971,13 @@ async def create_invoice(input: InvoiceCreate, current_user: dict = Depends(get_
     patient = await db.patients.find_one({"id": input.patient_id}, {"_id": 0})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
+    doctor = None
+    if input.doctor_id:
+        doctor = await db.users.find_one({"id": input.doctor_id, "role": "DOCTOR"}, {"_id": 0})
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Doctor not found")
     
-    count = await db.invoices.count_documents({})
-    invoice_id = f"INV{str(count + 1).zfill(6)}"
+    invoice_id = await sequences.next_id("invoice")
     
     # Calculate totals
     subtotal = sum(item.get("amount", 0) for item in input.items)
@@ -745,30 +988,34 @@ async def create_invoice(input: InvoiceCreate, current_user: dict = Depends(get_
         **invoice_dict,
         invoice_id=invoice_id,
         patient_name=patient["full_name"],
+        doctor_name=doctor["full_name"] if doctor else None,
         subtotal=subtotal,
         total=total,
         payment_status="paid" if input.payment_method else "pending",
         created_by=current_user["id"]
     )
     doc = invoice.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.invoices.insert_one(doc)
+    if invoice.payment_status == "pending":
+        await dashboard_counters.incr(PENDING_INVOICES)
+    await revenue_rollups.record(doc)
     await log_audit(current_user["id"], current_user["email"], "CREATE", "invoice", invoice.id)
     
     return invoice
 
 @api_router.get("/invoices", response_model=List[Invoice])
-async def get_invoices(patient_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_invoices(response: Response, patient_id: Optional[str] = None, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     query = {}
     if patient_id:
         query["patient_id"] = patient_id
     
-    invoices = await db.invoices.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for i in invoices:
-        if isinstance(i['created_at'], str):
-            i['created_at'] = datetime.fromisoformat(i['created_at'])
-    return invoices
+    view = select_view(page, Invoice, InvoiceSummary, "created_at", {"_id": 0})
+    if page.stream:
+        return stream_ndjson(db.invoices, query, view.projection, "created_at", page)
+    
+    invoices, next_cursor = await fetch_page(db.invoices, query, view.projection, "created_at", page)
+    return render_view(view, invoices, next_cursor, response, fast=FAST_JSON_RESPONSES)
 
 @api_router.get("/invoices/{invoice_id}", response_model=Invoice)
 async def get_invoice(invoice_id: str, current_user: dict = Depends(get_current_user)):
@@ -776,23 +1023,44 @@ async def get_invoice(invoice_id: str, current_user: dict = Depends(get_current_
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
-    if isinstance(invoice['created_at'], str):
-        invoice['created_at'] = datetime.fromisoformat(invoice['created_at'])
-    
     await log_audit(current_user["id"], current_user["email"], "VIEW", "invoice", invoice_id)
     return Invoice(**invoice)
 
+@api_router.get("/billing/revenue")
+async def get_revenue_report(group_by: str = "day", start: Optional[date] = None, end: Optional[date] = None, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ("ADMIN", "ACCOUNTANT"):
+        raise HTTPException(status_code=403, detail="Billing reports are restricted to administrators and accountants")
+    if group_by not in REVENUE_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(REVENUE_GROUPINGS)}")
+    
+    start, end = default_revenue_range(start, end, datetime.now(CLINIC_TZ).date())
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    report = await revenue_rollups.report(start, end, group_by)
+    if group_by == "doctor":
+        doctor_ids = [row["key"] for row in report["rows"]]
+        names = {doc["id"]: doc["full_name"] async for doc in db.users.find({"id": {"$in": doctor_ids}}, {"_id": 0, "id": 1, "full_name": 1})}
+        for row in report["rows"]:
+            row["doctor_name"] = names.get(row["key"])
+    return report
+
+@api_router.post("/billing/revenue/rebuild")
+async def rebuild_revenue_rollups(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    days = await revenue_rollups.rebuild()
+    return {"message": f"Revenue rollups recomputed for {days} days"}
+
 # ==================== DASHBOARD ROUTES ====================
 
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    today = datetime.now(timezone.utc).date().isoformat()
+    # appointment_date and the per-day counters are clinic dates
+    today = datetime.now(CLINIC_TZ).date().isoformat()
     
     # Get counts
-    total_patients = await db.patients.count_documents({})
-    today_appointments = await db.appointments.count_documents({"appointment_date": today})
-    pending_orders = await db.orders.count_documents({"status": "pending"})
-    pending_invoices = await db.invoices.count_documents({"payment_status": "pending"})
+    stats = await dashboard_counters.snapshot(today)
     
     # Role-specific data
     if current_user["role"] == "DOCTOR":
@@ -800,43 +1068,64 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
             {"doctor_id": current_user["id"], "appointment_date": today},
             {"_id": 0}
         ).to_list(100)
-        for a in my_appointments:
-            if isinstance(a['created_at'], str):
-                a['created_at'] = datetime.fromisoformat(a['created_at'])
         
         return {
-            "total_patients": total_patients,
+            "total_patients": stats["total_patients"],
             "today_appointments": len(my_appointments),
             "appointments": my_appointments
         }
     
     return {
-        "total_patients": total_patients,
-        "today_appointments": today_appointments,
-        "pending_orders": pending_orders,
-        "pending_invoices": pending_invoices
+        "total_patients": stats["total_patients"],
+        "today_appointments": stats["today_appointments"],
+        "pending_orders": stats["pending_orders"],
+        "pending_invoices": stats["pending_invoices"]
     }
 
+@api_router.post("/dashboard/stats/reconcile")
+async def reconcile_dashboard_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    await dashboard_counters.reconcile()
+    return {"message": "Dashboard counters recomputed"}
+
 # ==================== USER MANAGEMENT ====================
 
 @api_router.get("/users", response_model=List[User])
-async def get_users(current_user: dict = Depends(get_current_user)):
+async def get_users(response: Response, page: ListParams = Depends(), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "ADMIN":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).sort("created_at", -1).to_list(1000)
-    for u in users:
-        if isinstance(u['created_at'], str):
-            u['created_at'] = datetime.fromisoformat(u['created_at'])
-    return users
+    view = select_view(page, User, UserSummary, "created_at", {"_id": 0, "password_hash": 0})
+    if page.stream:
+        return stream_ndjson(db.users, {}, view.projection, "created_at", page)
+    
+    users, next_cursor = await fetch_page(db.users, {}, view.projection, "created_at", page)
+    return render_view(view, users, next_cursor, response, fast=FAST_JSON_RESPONSES)
 
 @api_router.get("/users/doctors", response_model=List[User])
 async def get_doctors(current_user: dict = Depends(get_current_user)):
-    doctors = await db.users.find({"role": "DOCTOR", "is_active": True}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    for d in doctors:
-        if isinstance(d['created_at'], str):
-            d['created_at'] = datetime.fromisoformat(d['created_at'])
-    return doctors
+    return await doctor_list.get()
+
+@api_router.patch("/users/{user_id}", response_model=User)
+async def update_user(user_id: str, input: UserUpdate, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    existing = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    if not existing:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    update_data = input.model_dump(exclude_unset=True)
+    if update_data:
+        await db.users.update_one({"id": user_id}, {"$set": update_data})
+        await cache_bus.publish("users", user_id)
+    if update_data.get("full_name") and update_data["full_name"] != existing["full_name"]:
+        await name_propagator.enqueue("user", user_id, update_data["full_name"])
+    
+    await log_audit(current_user["id"], current_user["email"], "UPDATE", "user", user_id, update_data)
+    return User(**{**existing, **update_data})
 
 @api_router.patch("/users/{user_id}/status")
 async def update_user_status(user_id: str, status_update: dict, current_user: dict = Depends(get_current_user)):
@@ -855,9 +1144,114 @@ async def update_user_status(user_id: str, status_update: dict, current_user: di
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await cache_bus.publish("users", user_id)
     await log_audit(current_user["id"], current_user["email"], "UPDATE_STATUS", "user", user_id, update_data)
     return {"message": "User status updated successfully"}
 
+# ==================== EXPORTS ====================
+
+EXPORT_BATCH_SIZE = export_batch_size()
+
+@api_router.get("/exports/{collection}")
+async def export_collection(collection: str, format: str = "csv", start: Optional[datetime] = None, end: Optional[datetime] = None, batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    spec = EXPORTS.get(collection)
+    if not spec:
+        raise HTTPException(status_code=404, detail=f"No export for {collection}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    
+    await log_audit(current_user["id"], current_user["email"], "EXPORT", collection, format, {"start": start.isoformat() if start else None, "end": end.isoformat() if end else None})
+    filename = export_filename(collection, format, start, end)
+    return StreamingResponse(
+        stream_export(db[collection], spec, format, start, end, batch_size),
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": content_disposition(filename)}
+    )
+
+# ==================== SYSTEM ====================
+
+@api_router.get("/system/stats")
+async def get_system_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "user_cache": user_cache.stats(),
+        "cache_bus": cache_bus.stats(),
+        "audit_queue": audit_writer.stats(),
+        "change_feed": change_feed.stats(),
+        "name_propagation": await name_propagator.stats(),
+        "query_profiler": query_profiler.stats()
+    }
+
+@api_router.get("/system/indexes")
+async def get_index_report(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await verify_indexes(db)
+
+@api_router.get("/system/name-propagation")
+async def get_name_propagation_jobs(limit: int = Query(50, ge=1, le=500), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await name_propagator.jobs(limit)
+
+@api_router.post("/system/name-propagation/reconcile")
+async def reconcile_names(kind: str, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in NAME_REFERENCES:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(NAME_REFERENCES)}")
+    
+    queued = await name_propagator.reconcile(kind)
+    await log_audit(current_user["id"], current_user["email"], "RECONCILE", "names", kind, {"queued": queued})
+    return {"queued": queued}
+
+@api_router.get("/system/slow-queries")
+async def get_slow_queries(sort: str = "total_ms", limit: int = Query(50, ge=1, le=500), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if not query_profiler.enabled:
+        raise HTTPException(status_code=400, detail="Query profiling is off; set QUERY_PROFILER=true with the Mongo backend")
+    if sort not in SLOW_QUERY_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SLOW_QUERY_SORTS)}")
+    
+    return await query_profiler.report(sort, limit)
+
+@api_router.delete("/system/slow-queries")
+async def reset_slow_queries(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if not query_profiler.enabled:
+        raise HTTPException(status_code=400, detail="Query profiling is off; set QUERY_PROFILER=true with the Mongo backend")
+    
+    deleted = await query_profiler.reset()
+    await log_audit(current_user["id"], current_user["email"], "RESET", "slow_queries", "all", {"deleted": deleted})
+    return {"deleted": deleted}
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    # Scrapers send METRICS_TOKEN; anyone else needs an admin session
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not (METRICS_TOKEN and hmac.compare_digest(token, METRICS_TOKEN)):
+        if not token:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        current_user = await user_from_token(token)
+        if current_user["role"] != "ADMIN":
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+metrics.gauge("user_cache_entries", "Users held in the authentication cache.", lambda: user_cache.stats()["size"])
+metrics.gauge("audit_queue_depth", "Audit entries waiting to be written.", lambda: audit_writer.stats()["queue_depth"])
+metrics.gauge("change_feed_subscribers", "Connected change feed subscribers.", lambda: change_feed.stats()["subscribers"])
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -902,14 +1296,100 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, patient_search.TRUNCATED_HEADER, "Server-Timing"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics, server_timing=SERVER_TIMING)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+background_tasks = set()
+
+@app.on_event("startup")
+async def start_audit_writer():
+    audit_writer.start()
+
+@app.on_event("startup")
+async def warm_up():
+    # Open pooled connections and load hot reference data before the first request
+    if DB_BACKEND != 'memory':
+        await asyncio.gather(*(db.command("ping") for _ in range(WARMUP_CONNECTIONS)))
+    await doctor_list.get()
+    async for user_doc in db.users.find({"is_active": True}, {"_id": 0, "password_hash": 0}).limit(user_cache.max_size):
+        user_cache.put(user_doc["id"], user_doc)
+
+@app.on_event("startup")
+async def start_cache_bus():
+    await cache_bus.start()
+
+@app.on_event("startup")
+async def init_sequences():
+    await sequences.seed_from_existing()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    task.add_done_callback(log_background_failure)
+
+def log_background_failure(task: asyncio.Task):
+    # Startup jobs run unattended; without this their errors only surface at garbage collection
+    if not task.cancelled() and task.exception():
+        logger.error("Background task %s failed", task.get_coro().__qualname__, exc_info=task.exception())
+
+async def migrate_legacy_datetimes():
+    # Keyset pages compare native dates and skip rows that still hold ISO strings
+    todo = await migrate_datetimes.pending(db)
+    if not todo:
+        # Nothing written before native dates, so later boots can skip the probes
+        await migrate_datetimes.mark_complete(db)
+        return
+    logger.warning("Converting legacy timestamps (%s); list pages can miss those rows until it finishes", ", ".join(todo))
+    await migrate_datetimes.migrate(db, 1000, CLINIC_TZ, log=logger.info)
+
+# Idempotent, but each rewrites shared documents, so only the worker holding startup_lock runs them
+STARTUP_JOBS = (
+    ("indexes", lambda: ensure_indexes(db)),
+    ("dashboard_counters", dashboard_counters.seed_if_missing),
+    ("datetime_migration", migrate_legacy_datetimes),
+    ("slot_calendar", slot_calendar.rebuild),
+    ("patient_search", lambda: patient_search.backfill_search_fields(db)),
+    ("revenue_rollups", revenue_rollups.seed_if_missing),
+    ("worklist", worklist.backfill_priority),
+)
+
+@app.on_event("startup")
+async def run_startup_jobs():
+    # In the background so a large first-time build or migration does not hold up startup
+    run_in_background(startup_lock.run(STARTUP_JOBS))
+
+@app.on_event("startup")
+async def start_name_propagator():
+    name_propagator.start()
+
+@app.on_event("startup")
+async def start_query_profiler():
+    if QUERY_PROFILER and DB_BACKEND != 'memory':
+        query_profiler.start(db)
+
+@app.on_event("startup")
+async def init_change_feed():
+    if CHANGE_FEED_SOURCE == "changestream":
+        run_in_background(ChangeStreamSource(db, change_feed).run())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in list(background_tasks):
+        task.cancel()
+    await name_propagator.close()
+    await query_profiler.close()
+    await cache_bus.close()
+    # Flush queued audit entries while the connection is still open
+    await audit_writer.close()
+    password_hasher.shutdown()
     client.close()
\ No newline at end of file
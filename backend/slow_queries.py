@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from query_profiler import PROFILE_COLLECTION, SORT_FIELDS, slow_query_report
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def slow_queries(sort: str, limit: int, as_json: bool, reset: bool):
+    # MongoDB connection
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    if reset:
+        result = await db[PROFILE_COLLECTION].delete_many({})
+        print(f"Cleared {result.deleted_count} query shapes.")
+        client.close()
+        return
+
+    rows = await slow_query_report(db, sort, limit)
+    if as_json:
+        print(json.dumps(rows, indent=2, default=str))
+        rows = []
+    elif not rows:
+        print("No slow queries recorded. Is the server running with QUERY_PROFILER=true?")
+    for row in rows:
+        plan = row.get("plan") or {}
+        print(f"{row['command']} {row['collection']}  count={row['count']} avg={row['avg_ms']}ms max={row['max_ms']:.1f}ms total={row['total_ms']:.0f}ms")
+        if plan:
+            flag = "  COLLSCAN" if plan["collscan"] else ""
+            print(f"    plan: {plan['stages']} {plan['indexes']}  examined docs={plan['docs_examined']} keys={plan['keys_examined']} returned={plan['returned']}{flag}")
+        print(f"    shape: {json.dumps(row['shape'])}")
+
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show slow MongoDB query shapes captured by the query profiler")
+    parser.add_argument("--sort", choices=SORT_FIELDS, default="total_ms")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    parser.add_argument("--reset", action="store_true", help="clear the recorded shapes")
+    args = parser.parse_args()
+    asyncio.run(slow_queries(args.sort, args.limit, args.json, args.reset))
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Sequence, Tuple
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class StartupLock:
+    """Lets one worker of a deployment run the startup maintenance jobs.
+
+    Every uvicorn worker (and every instance) runs the same startup hooks,
+    so rebuilds, backfills and migrations would otherwise run once per
+    worker, racing each other over the same documents. `run` takes a lease
+    on a document in `startup_locks`; the worker that gets it runs the jobs
+    and renews the lease until they finish, then releases it. The others
+    skip the jobs. A lease left behind by a crashed worker lapses after
+    `lease_seconds`, so the next start runs the jobs again.
+    """
+
+    def __init__(self, db, name: str = "startup", lease_seconds: int = 120):
+        self.db = db
+        self.name = name
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner = str(uuid.uuid4())
+
+    async def acquire(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # A held lease does not match, so the upsert collides on _id instead
+            await self.db.startup_locks.update_one(
+                {"_id": self.name, "expires_at": {"$lte": now}},
+                {"$set": {"owner": self.owner, "acquired_at": now, "expires_at": now + self.lease}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def renew(self) -> bool:
+        result = await self.db.startup_locks.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.now(timezone.utc) + self.lease}},
+        )
+        return result.matched_count == 1
+
+    async def release(self):
+        await self.db.startup_locks.delete_one({"_id": self.name, "owner": self.owner})
+
+    async def _keep_alive(self):
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                if not await self.renew():
+                    logger.warning("Lost the %s lock while its jobs were still running", self.name)
+                    return
+            except PyMongoError as e:
+                logger.warning("Could not renew the %s lock: %s", self.name, e)
+
+    async def run(self, jobs: Sequence[Tuple[str, Callable[[], Awaitable]]]) -> bool:
+        """Runs `jobs` concurrently if this worker gets the lock; False if another worker has it."""
+        if not await self.acquire():
+            logger.info("Another worker holds the %s lock; skipping its jobs", self.name)
+            return False
+        keep_alive = asyncio.create_task(self._keep_alive())
+        try:
+            results = await asyncio.gather(*(job() for _, job in jobs), return_exceptions=True)
+            for (name, _), result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    logger.error("Startup job %s failed", name, exc_info=result)
+        finally:
+            keep_alive.cancel()
+            await asyncio.gather(keep_alive, return_exceptions=True)
+        await self.release()
+        return True
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+
+class UserCache:
+    """In-process TTL/LRU cache of user documents keyed by user id.
+
+    Entries expire after `ttl` seconds. Changes call `invalidate` and take
+    effect immediately here; other workers hear of them through the cache
+    bus, with the TTL as the bound if a message is missed.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user_doc = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Routes mutate current_user in place, so never hand out the cached dict
+        return dict(user_doc)
+
+    def put(self, user_id: str, user_doc: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, dict(user_doc))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        self.invalidations += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class QueryCache:
+    """Holds one query's result (e.g. the active doctor list) for `ttl` seconds."""
+
+    def __init__(self, load: Callable[[], Awaitable[List[dict]]], ttl: float = 60.0):
+        self._load = load
+        self.ttl = ttl
+        self._value: Optional[List[dict]] = None
+        self._expires_at = 0.0
+        self.loads = 0
+
+    async def get(self) -> List[dict]:
+        if self._value is None or self._expires_at < time.monotonic():
+            self._value = await self._load()
+            self._expires_at = time.monotonic() + self.ttl
+            self.loads += 1
+        return [dict(doc) for doc in self._value]
+
+    def invalidate(self, key: Optional[str] = None):
+        self._value = None
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+# Lower rank is served first; stored as priority_rank so the queue sorts on an index
+PRIORITIES = {"stat": 0, "urgent": 1, "routine": 2}
+DEFAULT_PRIORITY = "routine"
+
+LEASE_FIELDS = ("assigned_to", "assigned_name", "lease_expires_at")
+
+QUEUE_PROJECTION = {
+    "_id": 0, "id": 1, "order_id": 1, "patient_id": 1, "patient_name": 1, "doctor_name": 1,
+    "order_type": 1, "test_name": 1, "priority": 1, "status": 1, "created_at": 1,
+}
+
+
+class LeaseConflict(Exception):
+    """The order is leased to someone else or is no longer open."""
+
+
+class Worklist:
+    """Lab/radiology work queue over the `orders` collection.
+
+    Claiming is a single find-and-modify that moves the highest-priority,
+    oldest open order to in_progress with an assignee and a lease expiry, so
+    two technicians can never receive the same order. An in_progress order
+    whose lease has lapsed is open again and can be claimed by anyone.
+    """
+
+    def __init__(self, db, feed, lease_seconds: int = 900):
+        self.db = db
+        self.feed = feed
+        self.lease = timedelta(seconds=lease_seconds)
+
+    @staticmethod
+    def _open(now: datetime) -> dict:
+        return {"$or": [
+            {"status": "pending"},
+            {"status": "in_progress", "lease_expires_at": {"$lt": now}},
+        ]}
+
+    def _publish(self, op: str, order: dict):
+        self.feed.publish("orders", op, order)
+
+    async def _lease(self, query: dict, user: dict) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        lease = {
+            "status": "in_progress",
+            "assigned_to": user["id"],
+            "assigned_name": user["full_name"],
+            "lease_expires_at": now + self.lease,
+        }
+        previous = await self.db.orders.find_one_and_update(
+            query,
+            {"$set": lease},
+            {"_id": 0},
+            sort=[("priority_rank", 1), ("created_at", 1)],
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return None
+        order = {**previous, **lease}
+        self._publish("claimed", order)
+        return {"previous_status": previous.get("status"), "order": order}
+
+    async def claim_next(self, user: dict, order_type: Optional[str] = None) -> Optional[dict]:
+        query = self._open(datetime.now(timezone.utc))
+        if order_type:
+            query = {"$and": [query, {"order_type": order_type}]}
+        return await self._lease(query, user)
+
+    async def claim(self, order_id: str, user: dict) -> Optional[dict]:
+        # Claiming an order you already hold just renews the lease; None when the order does not exist
+        now = datetime.now(timezone.utc)
+        query = {"$and": [{"id": order_id}, {"$or": [
+            self._open(now),
+            {"status": "in_progress", "assigned_to": user["id"]},
+        ]}]}
+        claimed = await self._lease(query, user)
+        if claimed is None:
+            if await self.db.orders.find_one({"id": order_id}, {"_id": 1}):
+                raise LeaseConflict(order_id)
+            return None
+        return claimed
+
+    async def renew(self, order_id: str, user: dict) -> dict:
+        expires = datetime.now(timezone.utc) + self.lease
+        order = await self.db.orders.find_one_and_update(
+            {"id": order_id, "status": "in_progress", "assigned_to": user["id"]},
+            {"$set": {"lease_expires_at": expires}},
+            {"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if order is None:
+            raise LeaseConflict(order_id)
+        self._publish("updated", order)
+        return order
+
+    async def release(self, order_id: str, user: dict, force: bool = False) -> Optional[dict]:
+        """Returns an in_progress order held by `user` to pending.
+
+        Only the lease holder can release, or anyone with `force`
+        (administrators); orders that are pending, completed or cancelled are
+        refused. Returns the order as it was before, or None when it does not
+        exist.
+        """
+        query = {"id": order_id, "status": "in_progress"}
+        if not force:
+            query["assigned_to"] = user["id"]
+        update = {"$set": {"status": "pending"}, "$unset": {name: "" for name in LEASE_FIELDS}}
+        previous = await self.db.orders.find_one_and_update(query, update, {"_id": 0}, return_document=ReturnDocument.BEFORE)
+        if previous is None:
+            if await self.db.orders.find_one({"id": order_id}, {"_id": 1}):
+                raise LeaseConflict(order_id)
+            return None
+        # Cleared lease fields go out as None, as the change stream source sends them
+        order = {**previous, "status": "pending", **dict.fromkeys(LEASE_FIELDS)}
+        self._publish("released", order)
+        return previous
+
+    async def transition(self, order_id: str, status: str, user: dict, force: bool = False) -> Optional[dict]:
+        """Moves an order to `status`, releasing any lease.
+
+        Orders leased to another user are refused unless `force` is set
+        (administrators). Returns the order as it was before the change, or
+        None when it does not exist.
+        """
+        query = {"id": order_id}
+        if not force:
+            query["$or"] = [
+                {"status": {"$ne": "in_progress"}},
+                {"assigned_to": {"$in": [None, user["id"]]}},
+                {"lease_expires_at": {"$lt": datetime.now(timezone.utc)}},
+            ]
+        update = {"$set": {"status": status}}
+        if status == "in_progress":
+            update["$set"].update(assigned_to=user["id"], assigned_name=user["full_name"], lease_expires_at=datetime.now(timezone.utc) + self.lease)
+        else:
+            update["$unset"] = {name: "" for name in LEASE_FIELDS}
+        previous = await self.db.orders.find_one_and_update(query, update, {"_id": 0}, return_document=ReturnDocument.BEFORE)
+        if previous is None:
+            if await self.db.orders.find_one({"id": order_id}, {"_id": 1}):
+                raise LeaseConflict(order_id)
+            return None
+        order = {**previous, **update["$set"], **dict.fromkeys(update.get("$unset", ()))}
+        self._publish({"pending": "released", "in_progress": "claimed"}.get(status, "updated"), order)
+        return previous
+
+    def created(self, order: dict):
+        self._publish("created", order)
+
+    async def queue(self, order_type: Optional[str] = None, limit: int = 50) -> List[dict]:
+        query = self._open(datetime.now(timezone.utc))
+        if order_type:
+            query = {"$and": [query, {"order_type": order_type}]}
+        cursor = self.db.orders.find(query, QUEUE_PROJECTION).sort([("priority_rank", 1), ("created_at", 1)]).limit(limit)
+        return await cursor.to_list(limit)
+
+    async def backfill_priority(self) -> int:
+        # Orders created before priorities existed are routine
+        result = await self.db.orders.update_many(
+            {"priority_rank": {"$exists": False}},
+            {"$set": {"priority": DEFAULT_PRIORITY, "priority_rank": PRIORITIES[DEFAULT_PRIORITY]}},
+        )
+        return result.modified_count
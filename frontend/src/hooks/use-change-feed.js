@@ -0,0 +1,50 @@
+import { useEffect, useRef } from "react";
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const WS_URL = `${BACKEND_URL.replace(/^http/, "ws")}/api/changes/ws`;
+
+// Calls onChange (debounced) whenever an appointment or order the user can see changes.
+// Reconnects with backoff; a dropped connection triggers a refetch since events may be missed.
+export function useChangeFeed(collections, onChange, { debounceMs = 300 } = {}) {
+  const callback = useRef(onChange);
+  callback.current = onChange;
+
+  useEffect(() => {
+    let socket = null;
+    let closed = false;
+    let retryDelay = 1000;
+    let retryTimer = null;
+    let debounceTimer = null;
+
+    const notify = () => {
+      clearTimeout(debounceTimer);
+      debounceTimer = setTimeout(() => callback.current(), debounceMs);
+    };
+
+    const connect = () => {
+      const token = localStorage.getItem("token");
+      if (!token) return;
+      const params = new URLSearchParams({ token, collections: collections.join(",") });
+      socket = new WebSocket(`${WS_URL}?${params}`);
+      socket.onopen = () => {
+        if (retryDelay > 1000) notify();
+        retryDelay = 1000;
+      };
+      socket.onmessage = notify;
+      socket.onclose = (event) => {
+        // 44xx: rejected by the server (bad token or filters), retrying will not help
+        if (closed || (event.code >= 4400 && event.code < 4500)) return;
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      clearTimeout(debounceTimer);
+      if (socket) socket.close();
+    };
+  }, [collections.join(","), debounceMs]);
+}
@@ -9,6 +9,7 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { Textarea } from "@/components/ui/textarea";
 import { toast } from "sonner";
+import { useChangeFeed } from "@/hooks/use-change-feed";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -37,13 +38,15 @@ export default function Appointments({ user, onLogout }) {
     fetchAppointments();
   }, [filterDate]);
 
+  useChangeFeed(["appointments"], () => fetchAppointments());
+
   const fetchInitialData = async () => {
     try {
       const token = localStorage.getItem("token");
       const headers = { Authorization: `Bearer ${token}` };
       
       const [patientsRes, doctorsRes] = await Promise.all([
-        axios.get(`${API}/patients`, { headers }),
+        axios.get(`${API}/patients?summary=true`, { headers }),
         axios.get(`${API}/users/doctors`, { headers })
       ]);
       
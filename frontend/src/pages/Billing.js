@@ -37,7 +37,7 @@ export default function Billing({ user, onLogout }) {
       
       const [invoicesRes, patientsRes] = await Promise.all([
         axios.get(`${API}/invoices`, { headers }),
-        axios.get(`${API}/patients`, { headers })
+        axios.get(`${API}/patients?summary=true`, { headers })
       ]);
       
       setInvoices(invoicesRes.data);
@@ -46,7 +46,7 @@ export default function Consultation({ user, onLogout }) {
       
       const [encountersRes, patientsRes] = await Promise.all([
         axios.get(`${API}/encounters`, { headers }),
-        axios.get(`${API}/patients`, { headers })
+        axios.get(`${API}/patients?summary=true`, { headers })
       ]);
       
       setEncounters(encountersRes.data);
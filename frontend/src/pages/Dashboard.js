@@ -3,6 +3,7 @@ import axios from "axios";
 import Layout from "@/components/Layout";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { toast } from "sonner";
+import { useChangeFeed } from "@/hooks/use-change-feed";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -15,6 +16,8 @@ export default function Dashboard({ user, onLogout }) {
     fetchStats();
   }, []);
 
+  useChangeFeed(["appointments", "orders"], () => fetchStats(), { debounceMs: 2000 });
+
   const fetchStats = async () => {
     try {
       const token = localStorage.getItem("token");
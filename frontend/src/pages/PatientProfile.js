@@ -28,17 +28,12 @@ export default function PatientProfile({ user, onLogout }) {
       const token = localStorage.getItem("token");
       const headers = { Authorization: `Bearer ${token}` };
       
-      const [patientRes, encountersRes, prescriptionsRes, reportsRes] = await Promise.all([
-        axios.get(`${API}/patients/${patientId}`, { headers }),
-        axios.get(`${API}/encounters?patient_id=${patientId}`, { headers }),
-        axios.get(`${API}/prescriptions?patient_id=${patientId}`, { headers }),
-        axios.get(`${API}/reports?patient_id=${patientId}`, { headers })
-      ]);
+      const response = await axios.get(`${API}/patients/${patientId}/summary?limit=200`, { headers });
       
-      setPatient(patientRes.data);
-      setEncounters(encountersRes.data);
-      setPrescriptions(prescriptionsRes.data);
-      setReports(reportsRes.data);
+      setPatient(response.data.patient);
+      setEncounters(response.data.encounters);
+      setPrescriptions(response.data.prescriptions);
+      setReports(response.data.reports);
     } catch (error) {
       toast.error("Failed to fetch patient data");
     }
@@ -35,7 +35,7 @@ export default function Prescriptions({ user, onLogout }) {
       
       const [prescriptionsRes, patientsRes] = await Promise.all([
         axios.get(`${API}/prescriptions`, { headers }),
-        axios.get(`${API}/patients`, { headers })
+        axios.get(`${API}/patients?summary=true`, { headers })
       ]);
       
       setPrescriptions(prescriptionsRes.data);
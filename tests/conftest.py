@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The app reads its configuration at import, so pin a self-contained setup first
+os.environ["DB_BACKEND"] = "memory"
+os.environ["DB_NAME"] = "gangosri_his_test"
+os.environ["BLOB_STORE"] = "local"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp(prefix="his-test-uploads-")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from memory_db import MemoryClient  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def memory_db():
+    return MemoryClient()[f"test_{uuid.uuid4().hex[:8]}"]
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as server_module
+    return server_module
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    # One app lifespan for the session: shutdown closes thread pools that startup cannot reopen
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(server, client):
+    """Inserts a user with the given role and returns (user, auth headers)."""
+    def make(role: str = "ADMIN", **fields):
+        user = {
+            "id": str(uuid.uuid4()),
+            "email": f"{role.lower()}-{uuid.uuid4().hex[:8]}@test.gangoshrihis.com",
+            "full_name": fields.pop("full_name", f"Test {role.title()}"),
+            "role": role,
+            "is_active": True,
+            "created_at": datetime.now(timezone.utc),
+            **fields,
+        }
+        client.portal.call(server.db.users.insert_one, dict(user))
+        token = server.create_access_token({"sub": user["id"], "email": user["email"], "role": role})
+        return user, {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def make_patient(client, make_user):
+    def make(headers=None, **fields):
+        if headers is None:
+            _, headers = make_user("RECEPTIONIST")
+        body = {"full_name": "Test Patient", "date_of_birth": "1990-01-01", "gender": "F", "phone": "9876500000", **fields}
+        response = client.post("/api/patients", json=body, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
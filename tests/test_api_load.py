@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from pymongo import ASCENDING, IndexModel
+
+from benchmarks.api_load import parse_users, report
+
+from .conftest import BACKEND_DIR
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_indexed_sorts_match_a_full_sort(memory_db):
+    rows = [{"id": str(n), "doctor_id": f"d{n % 3}", "created_at": n % 7, "status": "open" if n % 2 else "closed"} for n in range(60)]
+    await memory_db.plain.insert_many([dict(row) for row in rows])
+    await memory_db.indexed.insert_many([dict(row) for row in rows])
+    await memory_db.indexed.create_indexes([IndexModel([("created_at", ASCENDING)], name="created_at")])
+
+    async def both(query, sort, skip=0, limit=0):
+        found = []
+        for collection in (memory_db.plain, memory_db.indexed):
+            cursor = collection.find(query, {"_id": 0, "id": 1}).sort(sort).skip(skip).limit(limit)
+            found.append([row["id"] for row in await cursor.to_list(None)])
+        return found
+
+    for sort in ([("created_at", -1)], [("created_at", 1), ("id", -1)], [("created_at", -1), ("id", 1)]):
+        plain, indexed = await both({"status": "open"}, sort, skip=3, limit=5)
+        assert plain == indexed
+    # The ordered index follows later writes
+    await memory_db.plain.update_many({"created_at": 6}, {"$set": {"created_at": -1}})
+    await memory_db.indexed.update_many({"created_at": 6}, {"$set": {"created_at": -1}})
+    await memory_db.plain.delete_many({"created_at": 0})
+    await memory_db.indexed.delete_many({"created_at": 0})
+    plain, indexed = await both({}, [("created_at", 1), ("id", 1)], limit=12)
+    assert plain == indexed
+
+
+def test_report_flags_p95_regressions_past_the_threshold(capsys):
+    endpoints = {
+        "GET /api/patients": {"count": 10, "errors": 0, "rps": 5.0, "p50": 1.0, "p95": 2.5, "p99": 3.0},
+        "POST /api/orders": {"count": 10, "errors": 0, "rps": 5.0, "p50": 1.0, "p95": 2.05, "p99": 3.0},
+    }
+    baseline = {"GET /api/patients": {"p95": 2.0}, "POST /api/orders": {"p95": 2.0}}
+    assert report(endpoints, baseline, 0.10) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert parse_users("doctor=2,lab=1") == {"doctor": 2, "lab": 1}
+
+
+def test_a_short_in_process_run_has_no_errors(tmp_path):
+    output = tmp_path / "baseline.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.api_load", "--patients", "30", "--doctors", "2", "--warmup", "0", "--duration", "0.3",
+         "--users", "reception=1,doctor=1,lab=1,accountant=1", "--output", str(output)],
+        cwd=BACKEND_DIR, env={**os.environ, "DB_BACKEND": "memory"}, check=True, capture_output=True, timeout=120,
+    )
+    endpoints = json.loads(output.read_text())["endpoints"]
+    assert endpoints and all(result["errors"] == 0 for result in endpoints.values())
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from audit_writer import AuditWriter
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyCollection:
+    """Fails the first insert with a non-driver error, like an unencodable document."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        if self.calls == 1:
+            raise TypeError("cannot encode object")
+        return await self.collection.insert_many(docs, ordered=ordered)
+
+
+async def test_batches_are_written_and_drained_on_close(memory_db):
+    writer = AuditWriter(memory_db.audit_logs, batch_size=3, flush_interval=0.01)
+    writer.start()
+    for n in range(7):
+        await writer.submit({"n": n})
+    await writer.close()
+    assert await memory_db.audit_logs.count_documents({}) == 7
+    assert writer.stats()["written"] == 7
+
+
+async def test_unexpected_write_errors_drop_the_batch_and_keep_going(memory_db):
+    writer = AuditWriter(FlakyCollection(memory_db.audit_logs), flush_interval=0.01)
+    writer.start()
+    await writer.submit({"n": 1})
+    await asyncio.wait_for(writer.queue.join(), 1)
+    await writer.submit({"n": 2})
+    await writer.close()
+    assert [doc["n"] async for doc in memory_db.audit_logs.find({})] == [2]
+    assert writer.failures == 1
+
+
+async def test_a_crashed_writer_task_is_restarted(memory_db):
+    writer = AuditWriter(memory_db.audit_logs, flush_interval=0.01)
+    flush = writer._flush
+    crashes = []
+
+    async def crash_once(batch):
+        if not crashes:
+            crashes.append(batch)
+            raise RuntimeError("boom")
+        await flush(batch)
+
+    writer._flush = crash_once
+    writer.start()
+    await writer.submit({"n": 1})
+    await asyncio.sleep(0.1)
+    await writer.submit({"n": 2})
+    await writer.close()
+    assert crashes and await memory_db.audit_logs.count_documents({"n": 2}) == 1
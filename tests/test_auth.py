@@ -0,0 +1,41 @@
+def test_deactivation_revokes_existing_tokens(client, make_user):
+    _, admin = make_user("ADMIN")
+    doctor, headers = make_user("DOCTOR")
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    response = client.patch(f"/api/users/{doctor['id']}/status", json={"is_active": False}, headers=admin)
+    assert response.status_code == 200
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Account is inactive"
+
+
+def test_reactivation_restores_access(client, make_user):
+    _, admin = make_user("ADMIN")
+    doctor, headers = make_user("DOCTOR", is_active=False)
+    assert client.get("/api/auth/me", headers=headers).status_code == 403
+
+    client.patch(f"/api/users/{doctor['id']}/status", json={"is_active": True}, headers=admin)
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+
+def test_unknown_user_is_reported_as_such(client, server):
+    token = server.create_access_token({"sub": "no-such-user", "email": "x@test.gangoshrihis.com", "role": "ADMIN"})
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+
+def test_malformed_token_is_rejected(client):
+    response = client.get("/api/auth/me", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid token"
+
+
+def test_repeat_requests_are_served_from_the_user_cache(client, server, make_user):
+    _, headers = make_user("DOCTOR")
+    client.get("/api/auth/me", headers=headers)
+    hits = server.user_cache.hits
+    client.get("/api/auth/me", headers=headers)
+    assert server.user_cache.hits == hits + 1
@@ -0,0 +1,123 @@
+import hashlib
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from blob_store import BlobNotFound, BlobStore, GridFSBlobStore, LocalBlobStore, content_disposition, parse_range
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def read_all(store, ref, start=0, end=None):
+    return b"".join([chunk async for chunk in store.read(ref, start, end)])
+
+
+def test_blob_store_cannot_be_used_without_the_backend_methods():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+async def test_local_store_round_trips_ranges_and_deduplicates(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    blob = await store.put(chunks(b"hello ", b"world"), "a.txt")
+    again = await store.put(chunks(b"hello world"), "b.txt")
+    assert blob.ref == again.ref and blob.size == 11
+    assert await store.size(blob.ref) == 11
+    assert await read_all(store, blob.ref) == b"hello world"
+    assert await read_all(store, blob.ref, 6, 10) == b"world"
+
+
+async def test_missing_or_foreign_refs_are_not_found(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    with pytest.raises(BlobNotFound):
+        await store.size("local:" + "0" * 64)
+    with pytest.raises(BlobNotFound):
+        await store.size("gridfs:abc")
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("bytes=0-4", (0, 4)),
+    ("bytes=5-", (5, 9)),
+    ("bytes=-3", (7, 9)),
+    ("bytes=8-100", (8, 9)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 10) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,3-4", "items=0-1", "bytes=20-30"])
+def test_parse_range_rejects_unsatisfiable_headers(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 10)
+
+
+def test_content_disposition_escapes_quotes_and_encodes_unicode():
+    header = content_disposition('scan "final"\r\n é.pdf')
+    assert header == ("attachment; filename=\"scan _final___ _.pdf\"; "
+                      "filename*=UTF-8''scan%20%22final%22%0D%0A%20%C3%A9.pdf")
+
+
+def test_report_download_streams_ranges_with_safe_headers(client, make_user, make_patient):
+    _, headers = make_user("LAB_TECHNICIAN")
+    patient = make_patient()
+    response = client.post(
+        "/api/reports/upload",
+        params={"patient_id": patient["id"], "report_type": "lab", "test_name": "CBC"},
+        files={"file": ("cbc é.txt", b"0123456789", "text/plain")},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    report_id = response.json()["report_id"]
+
+    response = client.get(f"/api/reports/{report_id}/file", headers={**headers, "Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
+    assert response.headers["content-disposition"] == "attachment; filename=\"cbc _.txt\"; filename*=UTF-8''cbc%20%C3%A9.txt"
+
+
+def test_failed_report_upload_leaves_no_orphaned_file(client, server, make_user, make_patient, monkeypatch):
+    _, headers = make_user("LAB_TECHNICIAN")
+    patient = make_patient()
+
+    def upload(content):
+        return client.post(
+            "/api/reports/upload",
+            params={"patient_id": patient["id"], "report_type": "lab", "test_name": "CBC"},
+            files={"file": ("scan.txt", content, "text/plain")},
+            headers=headers,
+        )
+    kept = b"shared %d" % id(monkeypatch)
+    assert upload(kept).status_code == 200
+
+    async def no_ids(name):
+        raise RuntimeError("sequence unavailable")
+    monkeypatch.setattr(server.sequences, "next_id", no_ids)
+    orphan = b"orphan %d" % id(monkeypatch)
+    for content in (orphan, kept):
+        with pytest.raises(RuntimeError):
+            upload(content)
+
+    def stored(content):
+        try:
+            return client.portal.call(server.blob_store.size, "local:" + hashlib.sha256(content).hexdigest())
+        except BlobNotFound:
+            return None
+    assert stored(orphan) is None
+    # The same bytes still back the earlier report
+    assert stored(kept) == len(kept)
+
+
+async def test_gridfs_delete_rejects_malformed_ids_as_not_found():
+    client = AsyncIOMotorClient("mongodb://127.0.0.1:1", serverSelectionTimeoutMS=100)
+    try:
+        with pytest.raises(BlobNotFound):
+            await GridFSBlobStore(client["his"]).delete("gridfs:not-an-object-id")
+    finally:
+        client.close()
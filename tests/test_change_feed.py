@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from change_feed import ChangeFeed, ChangeStreamSource, sse_events
+
+pytestmark = pytest.mark.anyio
+
+
+def appointment(doctor_id, **fields):
+    return {"id": "a1", "doctor_id": doctor_id, "patient_name": "Asha", "status": "scheduled", "reason": "private", **fields}
+
+
+def test_events_reach_only_matching_subscribers():
+    feed = ChangeFeed()
+    everyone = feed.subscribe(["appointments", "orders"])
+    followers = feed.subscribe(["appointments"], doctor_ids=["doc-1"])
+    radiology = feed.subscribe(["orders"], order_type="radiology")
+
+    feed.publish("appointments", "created", appointment("doc-2"))
+    feed.publish("orders", "created", {"id": "o1", "order_type": "lab"})
+
+    assert everyone.queue.qsize() == 2
+    assert followers.queue.empty() and radiology.queue.empty()
+    feed.publish("appointments", "updated", appointment("doc-1"))
+    assert followers.queue.qsize() == 1
+
+
+def test_events_carry_only_feed_fields():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(["appointments"])
+    feed.publish("appointments", "created", appointment("doc-1"))
+    event = subscription.queue.get_nowait()
+    assert event["id"] == "a1" and "reason" not in event["data"]
+
+
+def test_slow_subscribers_are_dropped_not_blocking():
+    feed = ChangeFeed(max_queue=1)
+    slow = feed.subscribe(["appointments"])
+    feed.publish("appointments", "created", appointment("doc-1"))
+    feed.publish("appointments", "updated", appointment("doc-1"))
+    assert slow.closed and feed.stats()["dropped_subscribers"] == 1 and feed.stats()["subscribers"] == 0
+
+
+def test_change_stream_source_silences_local_publishing():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(["orders"])
+    feed.source = "changestream"
+    feed.publish("orders", "created", {"id": "o1"})
+    assert subscription.queue.empty()
+    feed.dispatch("orders", "created", {"id": "o1"})
+    assert subscription.queue.qsize() == 1
+
+
+async def test_sse_stream_formats_events_and_unsubscribes():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(["orders"])
+    feed.publish("orders", "claimed", {"id": "o1", "status": "in_progress"})
+    stream = sse_events(feed, subscription, keepalive=0.01)
+    assert await stream.__anext__() == "retry: 3000\n\n"
+    event, data = (await stream.__anext__()).strip().split("\n")
+    assert event == "event: claimed"
+    assert json.loads(data[len("data: "):])["data"] == {"id": "o1", "status": "in_progress"}
+    assert await stream.__anext__() == ": keepalive\n\n"
+    await stream.aclose()
+    assert subscription.closed and feed.stats()["subscribers"] == 0
+
+
+def order_change(updated, removed, **doc):
+    # Shaped like a MongoDB update event read with full_document="updateLookup"
+    return {
+        "_id": {"_data": "8265"}, "operationType": "update", "ns": {"db": "his", "coll": "orders"},
+        "documentKey": {"_id": "665f"}, "updateDescription": {"updatedFields": updated, "removedFields": removed, "truncatedArrays": []},
+        "fullDocument": {"_id": "665f", "id": "o1", "order_type": "lab", "doctor_id": "doc-1", "test_name": "CBC", **doc},
+    }
+
+
+def test_change_stream_events_carry_worklist_ops_and_cleared_fields():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(["orders"])
+    source = ChangeStreamSource(None, feed)
+
+    source._dispatch(order_change(
+        {"status": "in_progress", "assigned_to": "u1", "assigned_name": "Alice"}, [],
+        status="in_progress", assigned_to="u1", assigned_name="Alice",
+    ))
+    source._dispatch(order_change({"status": "pending"}, ["assigned_to", "assigned_name", "lease_expires_at"], status="pending"))
+    source._dispatch(order_change({"status": "completed"}, ["assigned_to", "assigned_name", "lease_expires_at"], status="completed"))
+
+    claimed, released, completed = (subscription.queue.get_nowait() for _ in range(3))
+    assert claimed["op"] == "claimed" and claimed["data"]["assigned_name"] == "Alice"
+    assert released["op"] == "released"
+    assert released["data"] == {"id": "o1", "doctor_id": "doc-1", "order_type": "lab", "status": "pending",
+                                "assigned_name": None, "lease_expires_at": None}
+    assert completed["op"] == "updated" and completed["data"]["assigned_name"] is None
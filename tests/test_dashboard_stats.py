@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from dashboard_stats import PATIENTS, DashboardCounters, appointments_on
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reconcile_counts_every_source(memory_db):
+    await memory_db.patients.insert_many([{"id": str(n)} for n in range(3)])
+    await memory_db.orders.insert_many([{"status": "pending"}, {"status": "completed"}])
+    await memory_db.invoices.insert_many([{"payment_status": "pending"}, {"payment_status": "paid"}])
+    await memory_db.appointments.insert_many([{"appointment_date": "2030-01-01"} for _ in range(2)])
+
+    counters = DashboardCounters(memory_db, ttl=0)
+    await counters.seed_if_missing()
+    assert await counters.snapshot("2030-01-01") == {
+        "total_patients": 3, "today_appointments": 2, "pending_orders": 1, "pending_invoices": 1,
+    }
+
+
+async def test_order_transitions_move_the_pending_count(memory_db):
+    counters = DashboardCounters(memory_db, ttl=0)
+    await counters.order_status_changed(None, "pending")
+    await counters.incr("orders:pending")
+    await counters.order_status_changed("pending", "in_progress")
+    await counters.order_status_changed("in_progress", "pending")
+    await counters.order_status_changed("pending", "pending")
+    assert (await counters.snapshot("2030-01-01"))["pending_orders"] == 1
+
+
+async def test_snapshots_are_cached_per_day(memory_db):
+    counters = DashboardCounters(memory_db, ttl=60)
+    await counters.incr(appointments_on("2030-01-01"))
+    assert (await counters.snapshot("2030-01-01"))["today_appointments"] == 1
+    await counters.incr(PATIENTS)
+    assert (await counters.snapshot("2030-01-01"))["total_patients"] == 0
+    assert (await counters.snapshot("2030-01-02"))["total_patients"] == 1
+
+
+# Between them, one of these is always on a different date from UTC
+@pytest.mark.parametrize("zone", ["Pacific/Kiritimati", "Pacific/Pago_Pago"])
+def test_dashboard_today_is_the_clinic_date(client, server, make_user, monkeypatch, zone):
+    clinic = ZoneInfo(zone)
+    monkeypatch.setattr(server, "CLINIC_TZ", clinic)
+    doctor, headers = make_user("DOCTOR")
+    today = datetime.now(clinic).date().isoformat()
+    client.portal.call(server.db.appointments.insert_one, {"id": str(uuid.uuid4()), "doctor_id": doctor["id"], "appointment_date": today})
+    stats = client.get("/api/dashboard/stats", headers=headers).json()
+    assert stats["today_appointments"] == 1
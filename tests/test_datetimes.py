@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from migrate_datetimes import COMPLETED_MARKER, migrate, pending
+from scheduling import clinic_datetime
+
+pytestmark = pytest.mark.anyio
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+
+
+def test_clinic_wall_clock_is_stored_as_utc():
+    assert clinic_datetime("2030-01-01", "10:00", KOLKATA) == datetime(2030, 1, 1, 4, 30, tzinfo=timezone.utc)
+    assert clinic_datetime("2030-01-01", "not a time", KOLKATA) is None
+
+
+async def test_migration_converts_strings_and_recomputes_appointment_at_once(memory_db):
+    await memory_db.patients.insert_one({"id": "p1", "created_at": "2030-01-01T10:00:00"})
+    await memory_db.appointments.insert_one({
+        "id": "a1", "appointment_date": "2030-01-02", "appointment_time": "09:00",
+        "created_at": datetime(2030, 1, 1, tzinfo=timezone.utc),
+        # Written by earlier builds: wall-clock time labelled as UTC
+        "appointment_at": datetime(2030, 1, 2, 9, 0, tzinfo=timezone.utc),
+    })
+    assert await pending(memory_db) == ["patients.created_at", "appointments.appointment_at"]
+
+    await migrate(memory_db, 10, KOLKATA, log=lambda message: None)
+
+    assert await pending(memory_db) == []
+    patient = await memory_db.patients.find_one({"id": "p1"})
+    assert patient["created_at"] == datetime(2030, 1, 1, 10, 0, tzinfo=timezone.utc)
+    appointment = await memory_db.appointments.find_one({"id": "a1"})
+    assert appointment["appointment_at"] == datetime(2030, 1, 2, 3, 30, tzinfo=timezone.utc)
+
+
+async def test_later_runs_only_fill_missing_appointment_at(memory_db):
+    await migrate(memory_db, 10, KOLKATA, log=lambda message: None)
+    kept = datetime(2031, 1, 1, tzinfo=timezone.utc)
+    await memory_db.appointments.insert_many([
+        {"id": "a1", "appointment_date": "2030-01-02", "appointment_time": "09:00", "appointment_at": kept},
+        {"id": "a2", "appointment_date": "2030-01-02", "appointment_time": "09:00"},
+    ])
+    await migrate(memory_db, 10, KOLKATA, log=lambda message: None)
+    assert (await memory_db.appointments.find_one({"id": "a1"}))["appointment_at"] == kept
+    assert (await memory_db.appointments.find_one({"id": "a2"}))["appointment_at"] == datetime(2030, 1, 2, 3, 30, tzinfo=timezone.utc)
+
+
+async def test_a_finished_migration_stops_the_startup_probes(memory_db, monkeypatch):
+    await memory_db.patients.insert_one({"id": "p1", "created_at": "2030-01-01T10:00:00"})
+    await migrate(memory_db, 10, KOLKATA, log=lambda message: None)
+    assert await memory_db.migrations.find_one({"_id": COMPLETED_MARKER})
+
+    probes = []
+    find_one = memory_db.invoices.find_one
+
+    async def counting(*args, **kwargs):
+        probes.append(args)
+        return await find_one(*args, **kwargs)
+    monkeypatch.setattr(memory_db.invoices, "find_one", counting)
+    assert await pending(memory_db) == [] and probes == []
+
+
+def test_startup_records_a_clean_database_as_migrated(client, server):
+    client.portal.call(server.db.migrations.delete_many, {})
+    client.portal.call(server.migrate_legacy_datetimes)
+    assert client.portal.call(server.db.migrations.find_one, {"_id": COMPLETED_MARKER})
+
+
+def test_appointment_range_filters_use_clinic_time(client, server, make_user, make_patient, monkeypatch):
+    monkeypatch.setattr(server, "CLINIC_TZ", KOLKATA)
+    _, headers = make_user("RECEPTIONIST")
+    doctor, _ = make_user("DOCTOR")
+    patient = make_patient(headers)
+    body = {"patient_id": patient["id"], "doctor_id": doctor["id"], "appointment_date": "2031-03-01", "appointment_time": "09:00"}
+    created = client.post("/api/appointments", json=body, headers=headers).json()
+
+    stored = client.portal.call(server.db.appointments.find_one, {"id": created["id"]})
+    assert stored["appointment_at"] == datetime(2031, 3, 1, 3, 30, tzinfo=timezone.utc)
+
+    def listed(**bounds):
+        rows = client.get("/api/appointments", params={"doctor_id": doctor["id"], **bounds}, headers=headers).json()
+        return [row["id"] for row in rows]
+    assert listed(from_date="2031-03-01T09:00:00", to_date="2031-03-01T09:15:00") == [created["id"]]
+    assert listed(from_date="2031-03-01T09:00:00Z") == []
@@ -0,0 +1,52 @@
+import io
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+from exports import EXPORTS, stream_export
+
+from .conftest import BACKEND_DIR
+
+pytestmark = pytest.mark.anyio
+
+
+async def export(collection, spec, fmt):
+    return b"".join([chunk async for chunk in stream_export(collection, spec, fmt, batch_size=2)])
+
+
+def invoice(n, **fields):
+    return {
+        "id": f"inv-{n}", "invoice_id": f"INV{n:06d}", "patient_id": "p1", "patient_name": "A", "items": [{"amount": 10}],
+        "subtotal": 10.0, "tax": 0.0, "total": 10.0, "payment_status": "paid", "created_by": "u1",
+        "created_at": datetime(2030, 1, n, tzinfo=timezone.utc), **fields,
+    }
+
+
+async def test_parquet_coerces_legacy_cells_instead_of_failing_mid_stream(memory_db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    await memory_db.invoices.insert_many([
+        invoice(1),
+        invoice(2, created_at="2030-01-02T09:30:00", total="12.5"),
+        invoice(3, created_at="not a date", total="n/a"),
+    ])
+    table = pq.read_table(io.BytesIO(await export(memory_db.invoices, EXPORTS["invoices"], "parquet"))).to_pylist()
+    by_id = {row["id"]: row for row in table}
+    assert by_id["inv-2"]["created_at"] == datetime(2030, 1, 2, 9, 30, tzinfo=timezone.utc)
+    assert by_id["inv-2"]["total"] == 12.5
+    assert by_id["inv-3"]["created_at"] is None and by_id["inv-3"]["total"] is None
+    assert by_id["inv-1"]["items"] == '[{"amount": 10}]'
+
+
+async def test_csv_exports_declared_columns_only(memory_db):
+    await memory_db.invoices.insert_one(invoice(1, secret="x"))
+    header, row = (await export(memory_db.invoices, EXPORTS["invoices"], "csv")).decode().splitlines()
+    assert header.split(",") == EXPORTS["invoices"].columns
+    assert "secret" not in header and "INV000001" in row
+
+
+def test_command_line_export_does_not_load_the_server():
+    code = "import sys, export_data; sys.exit('server' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,21 @@
+import pytest
+
+from indexes import INDEXES, ensure_indexes, verify_indexes
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_every_declared_index_is_built_and_rebuilding_is_a_no_op(memory_db):
+    assert await ensure_indexes(memory_db) == {}
+    assert await ensure_indexes(memory_db) == {}
+    report = await verify_indexes(memory_db)
+    assert set(report) == set(INDEXES)
+    assert all(not entry["missing"] and not entry["undeclared"] for entry in report.values())
+
+
+async def test_a_failed_build_is_reported_without_stopping_the_rest(memory_db):
+    await memory_db.users.insert_many([{"id": "u1", "email": "a@x.com"}, {"id": "u2", "email": "a@x.com"}])
+    assert await ensure_indexes(memory_db) == {"users": ["email_unique"]}
+    report = await verify_indexes(memory_db)
+    assert report["users"]["missing"] == ["email_unique"]
+    assert not report["orders"]["missing"]
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+
+def test_fields_projection_keeps_the_cursor_fields(client, make_user, make_patient):
+    _, headers = make_user("RECEPTIONIST")
+    make_patient(headers)
+    rows = client.get("/api/patients", params={"fields": "full_name", "limit": 1}, headers=headers).json()
+    assert set(rows[0]) == {"id", "created_at", "full_name"}
+
+
+def test_summary_view_returns_only_summary_fields(client, make_user, make_patient):
+    _, headers = make_user("RECEPTIONIST")
+    make_patient(headers, address="12 Hidden Lane")
+    rows = client.get("/api/patients", params={"summary": "true", "limit": 1}, headers=headers).json()
+    assert set(rows[0]) == {"id", "patient_id", "full_name", "gender", "phone", "created_at"}
+
+
+def test_unknown_fields_are_rejected(client, make_user):
+    _, headers = make_user("RECEPTIONIST")
+    response = client.get("/api/patients", params={"fields": "full_name,password_hash"}, headers=headers)
+    assert response.status_code == 400
+    assert "password_hash" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("params", [{}, {"summary": "true"}, {"fields": "full_name,created_at"}])
+def test_fast_json_path_renders_the_same_body(client, server, make_user, make_patient, monkeypatch, params):
+    _, headers = make_user("RECEPTIONIST")
+    make_patient(headers, full_name="Zoë Fast")
+    query = {"limit": 5, **params}
+    default = client.get("/api/patients", params=query, headers=headers).json()
+    monkeypatch.setattr(server, "FAST_JSON_RESPONSES", True)
+    fast = client.get("/api/patients", params=query, headers=headers).json()
+    assert fast == default
+    assert default[0]["created_at"].endswith("Z")
+
+
+def test_streamed_rows_render_datetimes_like_the_list(client, make_user, make_patient):
+    _, headers = make_user("RECEPTIONIST")
+    make_patient(headers)
+    listed = client.get("/api/patients", params={"limit": 1}, headers=headers).json()[0]
+    streamed = json.loads(client.get("/api/patients", params={"limit": 1, "stream": "true"}, headers=headers).text.splitlines()[0])
+    assert streamed["created_at"] == listed["created_at"]
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_queries_projections_and_sorting(memory_db):
+    await memory_db.people.insert_many([
+        {"id": "1", "name": "Asha", "age": 30, "tags": ["a", "b"]},
+        {"id": "2", "name": "Ravi", "age": 40, "tags": ["b"]},
+        {"id": "3", "name": "Meena", "age": 30},
+    ])
+    rows = await memory_db.people.find({"age": {"$gte": 30}, "tags": "b"}, {"_id": 0, "id": 1}).sort([("age", -1), ("id", 1)]).to_list(None)
+    assert rows == [{"id": "2"}, {"id": "1"}]
+    assert await memory_db.people.count_documents({"$or": [{"name": {"$regex": "^me", "$options": "i"}}, {"tags": {"$size": 2}}]}) == 2
+    assert await memory_db.people.find_one({"tags": {"$exists": False}}, {"_id": 0, "name": 1}) == {"name": "Meena"}
+
+
+async def test_stored_documents_are_isolated_from_callers(memory_db):
+    doc = {"id": "1", "nested": {"value": 1}}
+    await memory_db.things.insert_one(doc)
+    doc["nested"]["value"] = 2
+    found = await memory_db.things.find_one({"id": "1"})
+    found["nested"]["value"] = 3
+    assert (await memory_db.things.find_one({"id": "1"}))["nested"]["value"] == 1
+
+
+async def test_unique_indexes_are_enforced(memory_db):
+    await memory_db.users.create_indexes([IndexModel([("email", ASCENDING)], name="email", unique=True)])
+    await memory_db.users.insert_one({"email": "a@x.com"})
+    with pytest.raises(DuplicateKeyError):
+        await memory_db.users.insert_one({"email": "a@x.com"})
+    with pytest.raises(BulkWriteError) as error:
+        await memory_db.users.insert_many([{"email": "b@x.com"}, {"email": "a@x.com"}, {"email": "c@x.com"}], ordered=False)
+    assert error.value.details["nInserted"] == 2
+
+
+async def test_updates_upserts_and_find_and_modify(memory_db):
+    await memory_db.counters.update_one({"_id": "patient"}, {"$inc": {"value": 5}, "$setOnInsert": {"created": True}}, upsert=True)
+    after = await memory_db.counters.find_one_and_update({"_id": "patient"}, {"$inc": {"value": 1}}, return_document=ReturnDocument.AFTER)
+    assert after == {"_id": "patient", "value": 6, "created": True}
+    result = await memory_db.counters.bulk_write([UpdateOne({"_id": "patient"}, {"$set": {"value": 0}}), UpdateOne({"_id": "x"}, {"$set": {"value": 1}})])
+    assert (result.matched_count, result.upserted_count) == (1, 0)
+    await memory_db.counters.update_one({"_id": "patient"}, {"$addToSet": {"slots": 3}, "$unset": {"created": ""}})
+    assert await memory_db.counters.find_one({"_id": "patient"}) == {"_id": "patient", "value": 0, "slots": [3]}
+
+
+async def test_aggregation_groups_and_formats_dates(memory_db):
+    await memory_db.invoices.insert_many([
+        {"total": 10, "method": "cash", "created_at": datetime(2030, 1, 1, 20, tzinfo=timezone.utc)},
+        {"total": 5, "method": "cash", "created_at": datetime(2030, 1, 1, 10, tzinfo=timezone.utc)},
+        {"total": 7, "method": "card", "created_at": datetime(2030, 1, 2, 10, tzinfo=timezone.utc)},
+    ])
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": "Asia/Kolkata"}}
+    rows = await memory_db.invoices.aggregate([
+        {"$group": {"_id": day, "total": {"$sum": "$total"}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]).to_list(None)
+    assert rows == [{"_id": "2030-01-01", "total": 5, "count": 1}, {"_id": "2030-01-02", "total": 17, "count": 2}]
+
+
+async def test_date_operators_reject_strings_like_mongodb(memory_db):
+    await memory_db.invoices.insert_one({"created_at": "2030-01-01T00:00:00"})
+    with pytest.raises(OperationFailure):
+        await memory_db.invoices.aggregate([{"$group": {"_id": {"$dateToString": {"format": "%Y", "date": "$created_at"}}}}]).to_list(None)
+
+
+async def test_unknown_operators_fail_loudly(memory_db):
+    await memory_db.people.insert_one({"age": 1})
+    with pytest.raises(OperationFailure):
+        await memory_db.people.find({"age": {"$near": 1}}).to_list(None)
+
+
+async def test_index_information_lists_declared_indexes(memory_db):
+    await memory_db.patients.create_indexes([IndexModel([("name_tokens", ASCENDING), ("created_at", DESCENDING)], name="name_tokens_created")])
+    info = await memory_db.patients.index_information()
+    assert info["name_tokens_created"]["key"] == [("name_tokens", ASCENDING), ("created_at", DESCENDING)]
+
+
+async def test_unique_index_builds_fail_over_existing_duplicates(memory_db):
+    await memory_db.users.insert_many([{"email": "a@x.com"}, {"email": "a@x.com"}, {"phone": "1"}, {"phone": "2"}])
+    with pytest.raises(DuplicateKeyError):
+        await memory_db.users.create_indexes([IndexModel([("email", ASCENDING)], name="email", unique=True)])
+    assert "email" not in await memory_db.users.index_information()
+    # Sparse indexes skip documents without the field
+    await memory_db.users.create_indexes([IndexModel([("phone", ASCENDING)], name="phone", unique=True, sparse=True)])
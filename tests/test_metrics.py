@@ -0,0 +1,47 @@
+import fastapi.routing
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import MetricsMiddleware, MetricsRegistry, TimedJSONResponse, current
+
+
+def make_app(registry, server_timing=False):
+    app = FastAPI(default_response_class=TimedJSONResponse)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        current().db_calls += 2
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware, registry=registry, server_timing=server_timing)
+    return app
+
+
+def test_requests_are_recorded_per_route_template():
+    registry = MetricsRegistry()
+    client = TestClient(make_app(registry))
+    for item_id in ("a", "b"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/nowhere")
+    rendered = registry.render()
+    assert 'his_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in rendered
+    assert 'his_http_db_commands_total{method="GET",route="/items/{item_id}"} 4' in rendered
+    assert 'route="unmatched",status="404"' in rendered and 'route="/items/a"' not in rendered
+
+
+def test_server_timing_reports_db_and_serialize_phases():
+    response = TestClient(make_app(MetricsRegistry(), server_timing=True)).get("/items/a")
+    names = [part.split(";")[0].strip() for part in response.headers["server-timing"].split(",")]
+    assert names == ["db", "serialize", "total"]
+
+
+def test_fastapi_internals_are_left_alone(server):
+    assert fastapi.routing.serialize_response.__module__ == "fastapi.routing"
+
+
+def test_metrics_endpoint_needs_an_admin(client, make_user):
+    _, doctor = make_user("DOCTOR")
+    _, admin = make_user("ADMIN")
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers=doctor).status_code == 403
+    assert "his_http_request_duration_seconds_bucket" in client.get("/api/metrics", headers=admin).text
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from name_sync import NamePropagator
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def db(memory_db):
+    await memory_db.patients.insert_one({"id": "p1", "full_name": "Asha Rao"})
+    await memory_db.appointments.insert_many([{"id": f"a{n}", "patient_id": "p1", "patient_name": "Asha Rao"} for n in range(5)])
+    await memory_db.invoices.insert_one({"id": "i1", "patient_id": "p1", "patient_name": "Asha Rao"})
+    return memory_db
+
+
+async def names(db):
+    rows = await db.appointments.find({}).to_list(None) + await db.invoices.find({}).to_list(None)
+    return {row["patient_name"] for row in rows}
+
+
+async def test_jobs_rewrite_every_reference(db):
+    propagator = NamePropagator(db, batch_size=2)
+    await propagator.enqueue("patient", "p1", "Asha Menon")
+    assert await propagator.drain() == 1
+    assert await names(db) == {"Asha Menon"}
+    assert (await db.name_propagation.find_one({"_id": "patient:p1"}))["status"] == "done"
+
+
+async def test_rename_during_a_run_waits_and_then_wins(db):
+    propagator = NamePropagator(db, batch_size=2)
+    await propagator.enqueue("patient", "p1", "Asha Menon")
+    job = await propagator._claim()
+
+    await propagator.enqueue("patient", "p1", "Asha Pillai")
+    # Still running, so no second worker can pick it up with the newer name
+    assert await propagator._claim() is None
+
+    await propagator.process(job)
+    assert (await db.name_propagation.find_one({"_id": "patient:p1"}))["status"] == "pending"
+    await propagator.drain()
+    assert await names(db) == {"Asha Pillai"}
+
+
+async def test_a_runner_that_lost_its_lease_stops(db):
+    propagator = NamePropagator(db, batch_size=2)
+    await propagator.enqueue("patient", "p1", "Asha Menon")
+    stale_job = await propagator._claim()
+    await db.name_propagation.update_one({"_id": "patient:p1"}, {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert await propagator._claim() is not None
+
+    await propagator.process(stale_job)
+    # One batch was written before the failed renewal stopped it
+    assert await db.appointments.count_documents({"patient_name": "Asha Menon"}) == 2
+    assert (await db.name_propagation.find_one({"_id": "patient:p1"}))["status"] == "running"
+
+
+async def test_worker_survives_unexpected_errors(db, monkeypatch):
+    propagator = NamePropagator(db, poll_interval=0.01)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return 0
+    monkeypatch.setattr(propagator, "drain", flaky)
+    propagator.start()
+    await asyncio.sleep(0.05)
+    assert len(calls) > 1 and not propagator._task.done()
+    await propagator.close()
+
+
+async def test_reconcile_queues_only_drifted_entities(db):
+    await db.patients.insert_one({"id": "p2", "full_name": "Ravi Kumar"})
+    await db.appointments.insert_one({"id": "a9", "patient_id": "p2", "patient_name": "Ravi Kumar"})
+    await db.invoices.update_one({"id": "i1"}, {"$set": {"patient_name": "Asha R."}})
+    propagator = NamePropagator(db, batch_size=1)
+    assert await propagator.reconcile("patient") == 1
+    job = await db.name_propagation.find_one({"_id": "patient:p1"})
+    assert (job["name"], job["status"]) == ("Asha Rao", "pending")
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import ListParams, decode_cursor, encode_cursor, fetch_page
+
+pytestmark = pytest.mark.anyio
+
+
+def params(**values):
+    return ListParams(**{"limit": None, "after": None, "stream": False, "fields": None, "summary": False,
+                         "created_from": None, "created_to": None, **values})
+
+
+def test_cursor_round_trips_datetimes_and_plain_values():
+    moment = datetime(2030, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(moment, "abc")) == (moment, "abc")
+    assert decode_cursor(encode_cursor("PAT000010", "xyz")) == ("PAT000010", "xyz")
+
+
+def tampered(date_value) -> str:
+    raw = json.dumps([{"$date": date_value}, "abc"]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", encode_cursor("a", "b")[:-4], tampered("yesterday"), tampered(5)])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+async def test_pages_cover_every_row_once_in_descending_order(memory_db):
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    # Pairs of rows share a timestamp so the id tie-breaker is exercised
+    docs = [{"id": f"id-{n:03d}", "created_at": start + timedelta(minutes=n // 2)} for n in range(25)]
+    await memory_db.patients.insert_many([dict(doc) for doc in docs])
+
+    seen, after = [], None
+    while True:
+        page, after = await fetch_page(memory_db.patients, {}, {"_id": 0}, "created_at", params(limit=4, after=after))
+        seen.extend(doc["id"] for doc in page)
+        if after is None:
+            break
+    expected = [doc["id"] for doc in sorted(docs, key=lambda doc: (doc["created_at"], doc["id"]), reverse=True)]
+    assert seen == expected
+
+
+async def test_created_range_filters_before_paging(memory_db):
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    await memory_db.orders.insert_many([{"id": str(n), "created_at": start + timedelta(days=n)} for n in range(10)])
+    page, after = await fetch_page(memory_db.orders, {}, {"_id": 0}, "created_at",
+                                   params(created_from=start + timedelta(days=3), created_to=start + timedelta(days=6)))
+    assert [doc["id"] for doc in page] == ["5", "4", "3"]
+    assert after is None
+
+
+def test_list_routes_reject_a_tampered_cursor(client, make_user):
+    _, headers = make_user("RECEPTIONIST")
+    response = client.get("/api/patients", params={"limit": 5, "after": tampered("2030-13-45")}, headers=headers)
+    assert response.status_code == 400
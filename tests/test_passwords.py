@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from passwords import PasswordHasher
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=2)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("Secret@123")
+    assert await hasher.verify("Secret@123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+
+
+async def test_outdated_cost_is_rehashed_on_verify(hasher):
+    old = PasswordHasher(rounds=5, workers=1)
+    try:
+        hashed = await old.hash("Secret@123")
+    finally:
+        old.shutdown()
+    valid, new_hash = await hasher.verify_and_update("Secret@123", hashed)
+    assert valid and new_hash and new_hash.startswith("$2b$04$")
+    assert await hasher.verify_and_update("Secret@123", new_hash) == (True, None)
+
+
+@pytest.mark.parametrize("stored", ["", "not-a-hash"])
+async def test_malformed_stored_hash_fails_verification(hasher, stored):
+    assert await hasher.verify_and_update("Secret@123", stored) == (False, None)
+
+
+def test_login_rejects_wrong_password_and_accepts_right_one(client, server):
+    hashed = client.portal.call(server.hash_password, "Login@123")
+    email = "login-check@test.gangoshrihis.com"
+    client.portal.call(server.db.users.insert_one, {"id": "login-check", "email": email, "full_name": "Login Check",
+                                                    "role": "DOCTOR", "is_active": True, "password_hash": hashed,
+                                                    "created_at": datetime.now(timezone.utc)})
+    assert client.post("/api/auth/login", json={"email": email, "password": "nope"}).status_code == 401
+    assert client.post("/api/auth/login", json={"email": email, "password": "Login@123"}).status_code == 200
@@ -0,0 +1,60 @@
+import asyncio
+import io
+import subprocess
+import sys
+import time
+
+import pytest
+
+from models import PatientCreate
+from patient_import import PatientImporter, read_rows
+from sequences import SequenceAllocator
+
+from .conftest import BACKEND_DIR
+
+pytestmark = pytest.mark.anyio
+
+CSV = """full_name,date_of_birth,gender,phone,created_at
+Asha Rao,1990-01-01,F,9876500001,
+Missing Phone,1990-01-01,M,,
+Old Record,1980-05-05,M,9876500002,2015-06-01T10:00:00
+Bad Date,1980-05-05,M,9876500003,yesterday
+"""
+
+
+async def test_valid_rows_are_numbered_and_bad_rows_reported(memory_db):
+    importer = PatientImporter(memory_db, SequenceAllocator(memory_db), PatientCreate, chunk_size=2)
+    report = await importer.run(read_rows(io.StringIO(CSV), "csv"), "importer")
+
+    assert (report.total, report.imported) == (4, 2)
+    assert [error["row"] for error in report.errors] == [3, 5]
+    ids = sorted(doc["patient_id"] for doc in await memory_db.patients.find({}).to_list(None))
+    assert ids == ["PAT000001", "PAT000002"]
+    old = await memory_db.patients.find_one({"full_name": "Old Record"})
+    assert old["created_at"].year == 2015 and old["name_tokens"] == ["old", "record"]
+
+
+def test_command_line_import_does_not_load_the_server():
+    code = "import sys, import_patients; sys.exit('server' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+async def test_a_failed_write_stops_the_reader_before_returning(memory_db, monkeypatch):
+    importer = PatientImporter(memory_db, SequenceAllocator(memory_db), PatientCreate, chunk_size=2)
+    reads = []
+
+    def rows():
+        for n in range(1000):
+            reads.append(n)
+            time.sleep(0.001)
+            yield n + 2, {"full_name": f"Patient {n}", "date_of_birth": "1990-01-01", "gender": "F", "phone": f"98765{n:05d}"}
+
+    async def failing_write(prepared, report):
+        raise RuntimeError("database down")
+    monkeypatch.setattr(importer, "_write", failing_write)
+    with pytest.raises(RuntimeError):
+        await importer.run(rows(), "importer")
+    read = len(reads)
+    await asyncio.sleep(0.05)
+    assert len(reads) == read <= 4
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import patient_search
+from pagination import ListParams
+from patient_search import build_clauses, search, search_fields
+
+pytestmark = pytest.mark.anyio
+
+PROJECTION = {"_id": 0, "name_tokens": 0, "name_phonetic": 0, "phone_keys": 0}
+
+
+def params(limit=None, after=None):
+    return ListParams(limit=limit, after=after, stream=False, fields=None, summary=False, created_from=None, created_to=None)
+
+
+def patient(n, full_name, phone, patient_id=None):
+    return {
+        "id": f"id-{n}",
+        "patient_id": patient_id or f"PAT{n:06d}",
+        "full_name": full_name,
+        "phone": phone,
+        "created_at": datetime(2030, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=n),
+        **search_fields(full_name, phone),
+    }
+
+
+@pytest.fixture
+async def patients(memory_db):
+    docs = [
+        patient(1, "Ramesh Kumar", "+91 9876500001"),
+        patient(2, "Rameshwar Singh", "+91 9876500002"),
+        patient(3, "Suresh Kumar", "+91 9123400003"),
+        patient(4, "Priya Sharma", "+91 9000000004"),
+        patient(5, "Paul Patel", "+91 9000000005"),
+    ]
+    await memory_db.patients.insert_many(docs)
+    return memory_db.patients
+
+
+@pytest.mark.parametrize("term", ["p", "pat", "PAT", "Pa"])
+def test_short_prefixes_never_search_patient_id(term):
+    assert not any("patient_id" in str(clause) for clause in build_clauses(term))
+
+
+async def test_bare_pat_prefix_does_not_match_everyone(patients):
+    page, _, _ = await search(patients, "pat", PROJECTION, params())
+    assert [doc["full_name"] for doc in page] == ["Paul Patel"]
+
+
+async def test_patient_number_ranks_exact_hit_first(patients):
+    page, _, _ = await search(patients, "pat 000003", PROJECTION, params())
+    assert page[0]["patient_id"] == "PAT000003"
+    assert "name_tokens" not in page[0]
+
+
+async def test_phone_prefix_matches_national_number(patients):
+    page, _, _ = await search(patients, "98765", PROJECTION, params())
+    assert {doc["id"] for doc in page} == {"id-1", "id-2"}
+
+
+async def test_exact_name_outranks_prefix_and_phonetic(patients):
+    page, _, _ = await search(patients, "ramesh", PROJECTION, params())
+    assert [doc["id"] for doc in page][:2] == ["id-1", "id-2"]
+
+
+async def test_misspelt_name_falls_back_to_phonetic(patients):
+    page, _, _ = await search(patients, "Sursh", PROJECTION, params())
+    assert [doc["id"] for doc in page] == ["id-3"]
+
+
+async def test_ranked_results_page_by_offset(patients):
+    first, after, _ = await search(patients, "kumar", PROJECTION, params(limit=1))
+    second, after, _ = await search(patients, "kumar", PROJECTION, params(limit=1, after=after))
+    assert after is None
+    assert {first[0]["id"], second[0]["id"]} == {"id-1", "id-3"}
+
+
+async def test_each_clause_reads_its_own_candidates(memory_db, monkeypatch):
+    monkeypatch.setattr(patient_search, "CANDIDATE_SLACK", 2)
+    # Newer prefix matches would fill a shared budget before the older exact hit
+    await memory_db.patients.insert_many([patient(n, f"Anitha Rao{n}", f"8{n:09d}") for n in range(10, 20)])
+    await memory_db.patients.insert_one(patient(1, "Anita Rao", "+91 7000000001"))
+    page, _, _ = await search(memory_db.patients, "anita", PROJECTION, params(limit=1))
+    assert page[0]["id"] == "id-1"
+
+
+async def test_broad_searches_page_past_every_match(memory_db):
+    await memory_db.patients.insert_many([patient(n, f"Kiran Sharma {n}", f"8{n:09d}") for n in range(250)])
+    seen, after, pages = [], None, 0
+    while True:
+        page, after, truncated = await search(memory_db.patients, "sharma", PROJECTION, params(limit=40, after=after))
+        seen.extend(doc["id"] for doc in page)
+        pages += 1
+        assert not truncated
+        if after is None:
+            break
+    assert pages == 7 and len(seen) == len(set(seen)) == 250
+
+
+async def test_matches_past_the_depth_limit_are_flagged(memory_db, monkeypatch):
+    monkeypatch.setattr(patient_search, "MAX_SEARCH_DEPTH", 30)
+    await memory_db.patients.insert_many([patient(n, f"Kiran Sharma {n}", f"8{n:09d}") for n in range(50)])
+    page, after, truncated = await search(memory_db.patients, "sharma", PROJECTION, params(limit=20, after=None))
+    assert truncated and after is not None
+    page, after, truncated = await search(memory_db.patients, "sharma", PROJECTION, params(limit=20, after=after))
+    assert truncated and after is None and len(page) == 10
+
+
+def test_patient_search_api_does_not_list_everyone_for_p(client, make_user, make_patient):
+    _, headers = make_user("RECEPTIONIST")
+    make_patient(full_name="Zebedee Quill", phone="7000000099")
+    response = client.get("/api/patients", params={"search": "p"}, headers=headers)
+    assert response.status_code == 200
+    assert all("p" in patient["full_name"].lower() for patient in response.json())
+    assert patient_search.TRUNCATED_HEADER not in response.headers
+
+
+def test_patient_search_api_reports_truncation(client, make_user, make_patient, monkeypatch):
+    _, headers = make_user("RECEPTIONIST")
+    for n in range(3):
+        make_patient(full_name=f"Truncata Quillon {n}", phone=f"70000001{n:02d}")
+    monkeypatch.setattr(patient_search, "MAX_SEARCH_DEPTH", 2)
+    response = client.get("/api/patients", params={"search": "quillon", "limit": 1}, headers=headers)
+    assert response.headers[patient_search.TRUNCATED_HEADER] == "true"
+    assert response.headers["X-Next-Cursor"]
@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def summary(client, server, make_user, make_patient):
+    _, headers = make_user("DOCTOR")
+    patient = make_patient()
+    client.portal.call(server.db.reports.insert_one, {
+        "id": str(uuid.uuid4()), "report_id": "REP000001", "patient_id": patient["id"], "patient_name": patient["full_name"],
+        "report_type": "lab", "test_name": "CBC", "file_data": "QUJD" * 1000, "findings": "Normal",
+        "created_at": datetime.now(timezone.utc), "uploaded_by": "someone",
+    })
+
+    def get(**request_headers):
+        return client.get(f"/api/patients/{patient['id']}/summary", headers={**headers, **request_headers})
+    return get
+
+
+def test_sections_are_trimmed_to_the_record_fields(summary):
+    body = summary().json()
+    report = body["reports"][0]
+    assert report["findings"] == "Normal"
+    assert "file_data" not in report and "uploaded_by" not in report
+    assert "name_tokens" not in body["patient"]
+
+
+def test_matching_etag_is_a_304(summary):
+    etag = summary().headers["etag"]
+    assert summary(**{"If-None-Match": etag}).status_code == 304
+    assert summary(**{"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert summary(**{"If-None-Match": "*"}).status_code == 304
+
+
+def test_partial_or_different_etag_is_a_full_response(summary):
+    etag = summary().headers["etag"]
+    # A substring of the header is not a match, nor is a tag containing ours
+    assert summary(**{"If-None-Match": etag[:-3] + '"'}).status_code == 200
+    assert summary(**{"If-None-Match": f'{etag}x'}).status_code == 200
+    assert summary(**{"If-None-Match": f"{etag[:-1]}x{etag[-1]}"}).status_code == 200
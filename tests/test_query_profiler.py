@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from query_profiler import PROFILE_COLLECTION, QueryProfiler, command_shape, summarize_plan
+
+pytestmark = pytest.mark.anyio
+
+EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "patient_id"}}},
+    "executionStats": {"totalDocsExamined": 3, "totalKeysExamined": 3, "nReturned": 3, "executionTimeMillis": 1},
+}
+
+
+def test_shapes_drop_literals_but_keep_structure():
+    one = command_shape("find", {"find": "patients", "filter": {"phone": "98450", "id": {"$in": ["a", "b"]}}, "sort": {"created_at": -1}, "lsid": {}})
+    other = command_shape("find", {"find": "patients", "filter": {"phone": "11111", "id": {"$in": ["c"]}}, "sort": {"created_at": -1}})
+    assert one == other == {"find": "patients", "filter": {"phone": "?", "id": {"$in": ["?"]}}, "sort": {"created_at": -1}}
+    pipeline = command_shape("aggregate", {"aggregate": "invoices", "pipeline": [{"$group": {"_id": "$doctor_id", "n": {"$sum": 1}}}]})
+    assert pipeline["pipeline"] == [{"$group": {"_id": "$doctor_id", "n": {"$sum": "?"}}}]
+
+
+def test_plan_summary_names_stages_and_indexes():
+    summary = summarize_plan(EXPLAIN)
+    assert (summary["stages"], summary["indexes"], summary["collscan"], summary["docs_examined"]) == ("FETCH > IXSCAN", ["patient_id"], False, 3)
+
+
+async def test_explain_loop_outlives_failed_explains_and_writes(memory_db, monkeypatch):
+    replies = [RuntimeError("driver bug"), OperationFailure("not allowed"), EXPLAIN, EXPLAIN]
+    profile = memory_db[PROFILE_COLLECTION]
+    update_one = profile.update_one
+    writes = []
+
+    async def command(spec, **kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    async def failing_first_write(*args, **kwargs):
+        writes.append(args)
+        if len(writes) == 1:
+            raise OperationFailure("write failed")
+        return await update_one(*args, **kwargs)
+    monkeypatch.setattr(memory_db, "command", command)
+    monkeypatch.setattr(profile, "update_one", failing_first_write)
+    profiler = QueryProfiler(flush_interval=60)
+    profiler.start(memory_db)
+    try:
+        for n in range(4):
+            profiler._queue_explain(f"k{n}", "find", {"find": "patients", "filter": {}})
+        for _ in range(100):
+            if len(replies) == 0 and len(writes) == 2:
+                break
+            await asyncio.sleep(0.01)
+        stats = profiler.stats()
+        assert (stats["explains"], stats["explain_failures"]) == (1, 3)
+        assert await profile.find_one({"_id": "k2"}) is None
+        assert (await profile.find_one({"_id": "k3"}))["plan"]["stages"] == "FETCH > IXSCAN"
+    finally:
+        await profiler.close()
+
+
+async def test_slow_commands_are_aggregated_by_shape(memory_db):
+    profiler = QueryProfiler(threshold_ms=0, explain_interval=3600)
+    profiler.db = memory_db
+    for phone, ms in (("1", 10.0), ("2", 30.0)):
+        profiler._record("find", {"find": "patients", "filter": {"phone": phone}}, ms)
+    [row] = await profiler.report()
+    assert (row["count"], row["total_ms"], row["max_ms"], row["avg_ms"]) == (2, 40.0, 30.0, 20.0)
+    assert row["shape"] == json.loads(json.dumps({"find": "patients", "filter": {"phone": "?"}}))
@@ -0,0 +1,78 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from revenue import SEEDED, RevenueRollups
+
+pytestmark = pytest.mark.anyio
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+
+
+def invoice(n, created_at, total=100.0, **fields):
+    return {
+        "id": f"inv-{n}", "subtotal": total, "tax": 0.0, "total": total, "payment_status": "paid", "payment_method": "cash",
+        "doctor_id": "doc-1", "items": [{"amount": total, "item_type": "consultation"}], "created_at": created_at, **fields,
+    }
+
+
+async def stored(db):
+    return {doc["_id"]: doc async for doc in db.revenue_daily.find({"_id": {"$ne": SEEDED}})}
+
+
+async def test_days_follow_the_clinic_time_zone(memory_db):
+    rollups = RevenueRollups(memory_db, KOLKATA)
+    # 20:00 UTC on the 1st is already the 2nd in the clinic
+    await rollups.record(invoice(1, datetime(2030, 1, 1, 20, 0, tzinfo=timezone.utc)))
+    assert list(await stored(memory_db)) == ["2030-01-02"]
+
+
+async def test_rebuild_matches_recorded_rollups(memory_db):
+    rollups = RevenueRollups(memory_db, KOLKATA)
+    invoices = [
+        invoice(1, datetime(2030, 1, 1, 3, 0, tzinfo=timezone.utc)),
+        invoice(2, datetime(2030, 1, 1, 20, 0, tzinfo=timezone.utc), total=50.0, payment_method="card"),
+        invoice(3, datetime(2030, 1, 2, 4, 0, tzinfo=timezone.utc), total=25.0, payment_status="pending"),
+    ]
+    await memory_db.invoices.insert_many([dict(doc) for doc in invoices])
+    for doc in invoices:
+        await rollups.record(doc)
+    recorded = await stored(memory_db)
+
+    assert await rollups.rebuild() == 2
+    assert await stored(memory_db) == recorded
+
+
+async def test_rebuild_folds_legacy_string_timestamps(memory_db):
+    rollups = RevenueRollups(memory_db, KOLKATA)
+    await memory_db.invoices.insert_many([
+        invoice(1, datetime(2030, 1, 1, 3, 0, tzinfo=timezone.utc)),
+        invoice(2, "2030-01-01T05:00:00", total=40.0),
+    ])
+    await rollups.rebuild()
+    day = (await stored(memory_db))["2030-01-01"]
+    assert (day["invoices"], day["total"]) == (2, 140.0)
+    assert day["by_item_type"]["consultation"] == {"items": 2, "total": 140.0}
+
+
+async def test_rebuild_replaces_days_in_place_and_drops_empty_ones(memory_db):
+    rollups = RevenueRollups(memory_db, KOLKATA)
+    await memory_db.revenue_daily.insert_many([{"_id": "2029-12-31", "invoices": 9, "total": 9}, {"_id": "2030-01-01", "invoices": 9, "total": 9}])
+    await memory_db.invoices.insert_one(invoice(1, datetime(2030, 1, 1, 3, 0, tzinfo=timezone.utc)))
+    await rollups.rebuild()
+    days = await stored(memory_db)
+    assert list(days) == ["2030-01-01"]
+    assert days["2030-01-01"]["invoices"] == 1
+    assert await memory_db.revenue_daily.find_one({"_id": SEEDED})
+
+
+async def test_report_groups_days_by_week_and_dimension(memory_db):
+    rollups = RevenueRollups(memory_db)
+    for n, day in enumerate((1, 2, 8), 1):
+        await rollups.record(invoice(n, datetime(2030, 1, day, 12, tzinfo=timezone.utc), payment_method="card" if day == 8 else "cash"))
+    weekly = await rollups.report(date(2030, 1, 1), date(2030, 1, 31), "week")
+    assert [(row["key"], row["invoices"]) for row in weekly["rows"]] == [("2030-W01", 2), ("2030-W02", 1)]
+    methods = await rollups.report(date(2030, 1, 1), date(2030, 1, 31), "payment_method")
+    assert [(row["key"], row["total"]) for row in methods["rows"]] == [("cash", 200.0), ("card", 100.0)]
+    assert methods["totals"]["total"] == 300.0
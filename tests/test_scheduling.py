@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from scheduling import SlotCalendar
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_bookings_of_one_slot_have_one_winner(memory_db):
+    calendar = SlotCalendar(memory_db)
+    results = await asyncio.gather(*(calendar.book("doc-1", "2030-01-01", 4) for _ in range(5)))
+    assert results.count(True) == 1
+    assert await calendar.book("doc-1", "2030-01-01", 5)
+    assert await calendar.book("doc-2", "2030-01-01", 4)
+
+
+async def test_released_slot_can_be_booked_again(memory_db):
+    calendar = SlotCalendar(memory_db)
+    assert await calendar.book("doc-1", "2030-01-01", 0)
+    await calendar.release("doc-1", "2030-01-01", 0)
+    assert await calendar.book("doc-1", "2030-01-01", 0)
+
+
+async def test_next_free_skips_booked_and_elapsed_slots(memory_db):
+    calendar = SlotCalendar(memory_db, day_start="08:00", day_end="09:00", slot_minutes=15)
+    await calendar.book("doc-1", "2030-01-01", 2)
+    slots = await calendar.next_free(["doc-1"], datetime(2030, 1, 1, 8, 10), count=3)
+    assert [(slot["appointment_date"], slot["appointment_time"]) for slot in slots] == [
+        ("2030-01-01", "08:15"), ("2030-01-01", "08:45"), ("2030-01-02", "08:00"),
+    ]
+
+
+@pytest.mark.parametrize("value", ["08:07", "19:59"])
+def test_times_inside_a_slot_map_to_it(memory_db, value):
+    calendar = SlotCalendar(memory_db)
+    assert calendar.slot_time(calendar.slot_index(value)) == value[:3] + f"{int(value[3:]) // 15 * 15:02d}"
+
+
+@pytest.mark.parametrize("value", ["07:59", "20:00", "noon"])
+def test_times_outside_clinic_hours_are_rejected(memory_db, value):
+    with pytest.raises(ValueError):
+        SlotCalendar(memory_db).slot_index(value)
+
+
+@pytest.fixture
+def booking(client, make_user, make_patient):
+    _, headers = make_user("RECEPTIONIST")
+    doctor, _ = make_user("DOCTOR")
+    patient = make_patient(headers)
+
+    def book(appointment_time="10:00", appointment_date="2030-01-01"):
+        body = {"patient_id": patient["id"], "doctor_id": doctor["id"], "appointment_date": appointment_date, "appointment_time": appointment_time}
+        return client.post("/api/appointments", json=body, headers=headers)
+    book.doctor, book.headers = doctor, headers
+    return book
+
+
+def test_double_booking_is_a_409(booking):
+    assert booking("10:00").status_code == 200
+    response = booking("10:05")
+    assert response.status_code == 409
+
+
+def test_failed_insert_releases_the_slot(booking, server, monkeypatch):
+    async def broken(name):
+        raise RuntimeError("sequence store unavailable")
+    monkeypatch.setattr(server.sequences, "next_id", broken)
+    with pytest.raises(RuntimeError):
+        booking("11:00")
+    monkeypatch.undo()
+    assert booking("11:00").status_code == 200
+
+
+@pytest.mark.parametrize("value", ["2030-01-01", "2030-01-01T10:00:00", "2030-01-01T10:00:00+05:30"])
+def test_availability_accepts_dates_and_datetimes(client, booking, value):
+    response = client.get("/api/appointments/availability", params={"doctor_id": booking.doctor["id"], "date": value}, headers=booking.headers)
+    assert response.status_code == 200, response.text
+    assert response.json()[0]["appointment_date"] >= "2030-01-01"
+
+
+def test_availability_rejects_malformed_dates(client, booking):
+    response = client.get("/api/appointments/availability", params={"doctor_id": booking.doctor["id"], "date": "next tuesday"}, headers=booking.headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("value", ["10:75", "24:00", "9:60", "-1:00", "ten"])
+def test_out_of_range_times_are_invalid(memory_db, value):
+    with pytest.raises(ValueError, match="Invalid appointment time"):
+        SlotCalendar(memory_db, day_start="00:00", day_end="23:45").slot_index(value)
+
+
+# Between them, one of these is always on a different date from UTC
+@pytest.mark.parametrize("zone", ["Pacific/Kiritimati", "Pacific/Pago_Pago"])
+async def test_rebuild_starts_from_the_clinic_date(memory_db, zone):
+    clinic = ZoneInfo(zone)
+    today = datetime.now(clinic).date()
+    await memory_db.appointments.insert_many([
+        {"doctor_id": "doc-1", "appointment_date": (today + timedelta(days=offset)).isoformat(), "appointment_time": "08:00", "status": "scheduled"}
+        for offset in (-1, 0)
+    ])
+    assert await SlotCalendar(memory_db, tz=clinic).rebuild() == 1
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from sequences import SequenceAllocator, format_id
+
+pytestmark = pytest.mark.anyio
+
+
+def test_format_id_pads_to_width():
+    assert format_id("PAT", 7) == "PAT000007"
+    assert format_id("RX", 1234567) == "RX1234567"
+
+
+async def test_concurrent_allocations_are_unique_and_contiguous(memory_db):
+    sequences = SequenceAllocator(memory_db)
+    ids = await asyncio.gather(*(sequences.next_id("patient") for _ in range(50)))
+    assert sorted(ids) == [format_id("PAT", n) for n in range(1, 51)]
+
+
+async def test_block_allocation_reserves_one_block_per_round_trip(memory_db):
+    sequences = SequenceAllocator(memory_db, block_size=10)
+    values = [await sequences.next_value("order") for _ in range(12)]
+    assert values == list(range(1, 13))
+    counter = await memory_db.counters.find_one({"_id": "order"})
+    assert counter["value"] == 20
+
+
+async def test_separate_allocators_never_share_values(memory_db):
+    first, second = SequenceAllocator(memory_db, block_size=5), SequenceAllocator(memory_db, block_size=5)
+    values = [await allocator.next_value("invoice") for allocator in (first, second) * 6]
+    assert len(set(values)) == len(values)
+
+
+async def test_reserve_block_is_contiguous_after_single_values(memory_db):
+    sequences = SequenceAllocator(memory_db)
+    await sequences.next_value("patient")
+    assert list(await sequences.reserve_block("patient", 3)) == [2, 3, 4]
+
+
+async def test_seed_from_existing_starts_after_highest_legacy_id(memory_db):
+    await memory_db.patients.insert_many([{"patient_id": "PAT000041"}, {"patient_id": "PAT000007"}])
+    sequences = SequenceAllocator(memory_db)
+    await sequences.seed_from_existing()
+    assert await sequences.next_id("patient") == "PAT000042"
+    # Re-seeding never moves a counter backwards
+    await sequences.seed_from_existing()
+    assert await sequences.next_id("patient") == "PAT000043"
+
+
+async def test_seed_from_existing_compares_ids_past_the_padding_as_numbers(memory_db):
+    await memory_db.patients.insert_many([{"patient_id": "PAT999999"}, {"patient_id": "PAT1000000"}, {"patient_id": "PATIENT-X"}])
+    sequences = SequenceAllocator(memory_db)
+    await sequences.seed_from_existing()
+    assert await sequences.next_id("patient") == "PAT1000001"
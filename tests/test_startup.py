@@ -0,0 +1,76 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from serve import available_cpus
+from startup_lock import StartupLock
+
+from .conftest import BACKEND_DIR
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_one_worker_runs_the_startup_jobs(memory_db):
+    ran = []
+
+    async def job(name):
+        ran.append(name)
+        await asyncio.sleep(0.01)
+
+    def jobs(worker):
+        return [(name, lambda name=name: job(f"{worker}:{name}")) for name in ("slots", "search")]
+
+    first, second = StartupLock(memory_db), StartupLock(memory_db)
+    results = await asyncio.gather(first.run(jobs("first")), second.run(jobs("second")))
+    assert results == [True, False]
+    assert sorted(ran) == ["first:search", "first:slots"]
+    # Released once done, so the next start runs them again
+    assert await memory_db.startup_locks.find_one({}) is None
+
+
+async def test_a_lapsed_lease_can_be_taken_over(memory_db):
+    crashed, next_start = StartupLock(memory_db), StartupLock(memory_db)
+    assert await crashed.acquire()
+    assert not await next_start.acquire()
+    await memory_db.startup_locks.update_one({"_id": "startup"}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert await next_start.acquire()
+    assert not await crashed.renew()
+
+
+async def test_a_failing_job_does_not_stop_the_others(memory_db):
+    ran = []
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def fine():
+        ran.append("fine")
+    assert await StartupLock(memory_db).run([("broken", broken), ("fine", fine)])
+    assert ran == ["fine"]
+    assert await memory_db.startup_locks.find_one({}) is None
+
+
+@pytest.mark.parametrize("files, expected", [
+    ({"cpu.max": "200000 100000\n"}, 2),
+    ({"cpu.max": "50000 100000\n"}, 1),
+    ({"cpu.max": "max 100000\n"}, None),
+    ({"cpu/cpu.cfs_quota_us": "300000\n", "cpu/cpu.cfs_period_us": "100000\n"}, 3),
+    ({"cpu/cpu.cfs_quota_us": "-1\n", "cpu/cpu.cfs_period_us": "100000\n"}, None),
+])
+def test_worker_count_respects_cgroup_quotas(tmp_path, monkeypatch, files, expected):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(content)
+    assert available_cpus(tmp_path) == (expected or 8)
+
+
+def test_launcher_refuses_several_workers_with_the_local_change_feed():
+    env = {**os.environ, "DB_BACKEND": "mongo", "CHANGE_FEED_SOURCE": "local"}
+    result = subprocess.run([sys.executable, "serve.py", "--workers", "2"], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 2
+    assert "CHANGE_FEED_SOURCE=changestream" in result.stderr
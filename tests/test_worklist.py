@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from change_feed import ChangeFeed
+from worklist import PRIORITIES, LeaseConflict, Worklist
+
+pytestmark = pytest.mark.anyio
+
+ALICE = {"id": "u-alice", "full_name": "Alice"}
+BOB = {"id": "u-bob", "full_name": "Bob"}
+
+
+def order(n, priority="routine", status="pending", **fields):
+    return {
+        "id": f"o-{n}", "order_type": "lab", "priority": priority, "priority_rank": PRIORITIES[priority], "status": status,
+        "created_at": datetime(2030, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=n), **fields,
+    }
+
+
+@pytest.fixture
+async def worklist(memory_db):
+    await memory_db.orders.insert_many([order(1), order(2, "stat"), order(3, "urgent"), order(4, status="completed")])
+    return Worklist(memory_db, ChangeFeed(), lease_seconds=60)
+
+
+async def test_claims_follow_priority_then_age_and_never_overlap(worklist):
+    claims = await asyncio.gather(*(worklist.claim_next(user) for user in (ALICE, BOB, ALICE, BOB)))
+    assert [claim["order"]["id"] if claim else None for claim in claims] == ["o-2", "o-3", "o-1", None]
+
+
+async def test_lapsed_lease_is_open_again(worklist, memory_db):
+    await worklist.claim("o-1", ALICE)
+    with pytest.raises(LeaseConflict):
+        await worklist.claim("o-1", BOB)
+    await memory_db.orders.update_one({"id": "o-1"}, {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert (await worklist.claim("o-1", BOB))["order"]["assigned_to"] == BOB["id"]
+
+
+async def test_claiming_an_unknown_order_is_not_a_conflict(worklist):
+    assert await worklist.claim("missing", ALICE) is None
+
+
+async def test_only_the_holder_renews(worklist):
+    await worklist.claim("o-1", ALICE)
+    assert (await worklist.renew("o-1", ALICE))["assigned_to"] == ALICE["id"]
+    with pytest.raises(LeaseConflict):
+        await worklist.renew("o-1", BOB)
+
+
+async def test_release_returns_the_order_to_the_queue(worklist, memory_db):
+    await worklist.claim("o-1", ALICE)
+    previous = await worklist.release("o-1", ALICE)
+    assert previous["status"] == "in_progress"
+    stored = await memory_db.orders.find_one({"id": "o-1"})
+    assert stored["status"] == "pending" and "assigned_to" not in stored
+
+
+async def test_release_refuses_other_holders_and_closed_orders(worklist):
+    await worklist.claim("o-1", ALICE)
+    with pytest.raises(LeaseConflict):
+        await worklist.release("o-1", BOB)
+    for order_id in ("o-4", "o-2"):
+        # Completed and pending orders are not "in progress", whoever asks
+        with pytest.raises(LeaseConflict):
+            await worklist.release(order_id, ALICE)
+        with pytest.raises(LeaseConflict):
+            await worklist.release(order_id, ALICE, force=True)
+    assert await worklist.release("missing", ALICE) is None
+    assert (await worklist.release("o-1", BOB, force=True))["assigned_to"] == ALICE["id"]
+
+
+async def test_transition_respects_leases_unless_forced(worklist):
+    await worklist.claim("o-1", ALICE)
+    with pytest.raises(LeaseConflict):
+        await worklist.transition("o-1", "completed", BOB)
+    assert (await worklist.transition("o-1", "completed", BOB, force=True))["status"] == "in_progress"
+
+
+def test_worklist_routes_are_for_laboratory_staff(client, make_user):
+    _, doctor = make_user("DOCTOR")
+    _, technician = make_user("LAB_TECHNICIAN")
+    assert client.get("/api/worklist", headers=doctor).status_code == 403
+    assert client.post("/api/worklist/claim", headers=doctor).status_code == 403
+    assert client.get("/api/worklist", headers=technician).status_code == 200
+    assert client.post("/api/worklist/missing/claim", headers=technician).status_code == 404
+
+
+def test_releasing_a_completed_order_is_a_409_and_keeps_the_counters(client, server, make_user, make_patient):
+    _, doctor = make_user("DOCTOR")
+    _, technician = make_user("LAB_TECHNICIAN")
+    _, admin = make_user("ADMIN")
+    patient = make_patient()
+    created = client.post("/api/orders", json={"patient_id": patient["id"], "order_type": "lab", "test_name": "CBC"}, headers=doctor).json()
+    assert client.post(f"/api/worklist/{created['id']}/claim", headers=technician).status_code == 200
+    assert client.patch(f"/api/orders/{created['id']}/status", params={"status": "completed"}, headers=technician).status_code == 200
+
+    def pending_orders():
+        return client.portal.call(server.db.dashboard_counters.find_one, {"_id": "orders:pending"})["value"]
+    pending = pending_orders()
+
+    response = client.post(f"/api/worklist/{created['id']}/release", headers=admin)
+    assert response.status_code == 409
+    assert client.portal.call(server.db.orders.find_one, {"id": created["id"]})["status"] == "completed"
+    assert pending_orders() == pending
+
+
+async def test_local_events_match_what_the_change_stream_sends(memory_db):
+    await memory_db.orders.insert_one(order(1))
+    feed = ChangeFeed()
+    subscription = feed.subscribe(["orders"])
+    worklist = Worklist(memory_db, feed)
+    await worklist.claim("o-1", ALICE)
+    await worklist.release("o-1", ALICE)
+    await worklist.transition("o-1", "in_progress", BOB)
+    ops = [subscription.queue.get_nowait() for _ in range(3)]
+    assert [event["op"] for event in ops] == ["claimed", "released", "claimed"]
+    assert ops[1]["data"]["assigned_name"] is None and ops[1]["data"]["lease_expires_at"] is None